@@ -1,13 +1,23 @@
 import logging
 
-from flask import Flask, Response
+from flask import Flask, Response, request
 from flask_cors import CORS
 
 from app.blueprints.api import api_blueprint
 from app.blueprints.root import root_blueprint
-from app.commands import cache_cli, check_cli, importer_cli
+from app.commands import cache_cli, check_cli, importer_cli, pss_cli, record_cli
 from app.config import DefaultConfig
-from app.ext import cache, db, migrate
+from app.ext import (
+    api_metrics,
+    cache,
+    dataset_cache,
+    db,
+    device_pool,
+    http_session,
+    migrate,
+    rate_limiter,
+    redis_client,
+)
 
 
 def init_configuration(app: Flask, test_config: dict | None = None) -> None:
@@ -42,6 +52,17 @@ def init_headers(app: Flask) -> None:
         if not app.config["DEV_MODE"]:
             response.cache_control.max_age = 300
 
+        # Strong ETag from the payload of JSON responses not having one yet, clients already having it get a 304
+        if (
+            request.method in ("GET", "HEAD")
+            and response.status_code == 200
+            and response.mimetype == "application/json"
+            and not response.direct_passthrough
+            and response.get_etag() == (None, None)
+        ):
+            response.add_etag()
+            response.make_conditional(request)
+
         return response
 
 
@@ -104,6 +125,24 @@ def create_app(test_config: dict | None = None) -> Flask:
     # Initialize the cache
     cache.init_app(app)
 
+    # Initialize the pooled HTTP transport
+    http_session.init_app(app)
+
+    # Initialize the Redis connection shared with the cache
+    redis_client.init_app(app)
+
+    # Initialize the services datasets cache
+    dataset_cache.init_app(app)
+
+    # Initialize the PSS API rate limiter
+    rate_limiter.init_app(app)
+
+    # Initialize the PSS API metrics
+    api_metrics.init_app(app)
+
+    # Initialize the devices pool
+    device_pool.init_app(app)
+
     # Initialize default headers
     init_headers(app)
 
@@ -115,6 +154,8 @@ def create_app(test_config: dict | None = None) -> Flask:
     app.cli.add_command(check_cli)
     app.cli.add_command(importer_cli)
     app.cli.add_command(cache_cli)
+    app.cli.add_command(pss_cli)
+    app.cli.add_command(record_cli)
 
     # Enable CORS
     init_cors(app)
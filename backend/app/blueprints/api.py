@@ -1,3 +1,4 @@
+import datetime
 import time
 
 import flask
@@ -7,26 +8,46 @@ from markupsafe import escape
 from app.ext import cache
 from app.security import enforce_source
 from app.services.achievement import AchievementService
+from app.services.catalog import CatalogService
 from app.services.changes import ChangesService
 from app.services.character import CharacterService
 from app.services.collection import CollectionService
-from app.services.craft import CraftService
 from app.services.daily_offer import DailyOfferService
 from app.services.item import ItemService
 from app.services.market import MarketService
-from app.services.missile import MissileService
 from app.services.pixyship import PixyShipService
 from app.services.player import PlayerService
 from app.services.prestige import PrestigeService
 from app.services.research import ResearchService
-from app.services.room import RoomService
-from app.services.ship import ShipService
-from app.services.skin import SkinService
 from app.utils.pss import get_type_enum_from_string
 
 api_blueprint = Blueprint("api", __name__)
 
 
+def catalog_response(name: str) -> Response:
+    """Serve the response of a catalog endpoint serialized when the cache was updated, compressed if accepted.
+
+    Clients already having it get an empty 304 response.
+    """
+    catalog = CatalogService().get_response(name)
+
+    encodings = [encoding for encoding in current_app.config["CATALOG_ENCODINGS"] if encoding in catalog["bodies"]]
+    encoding = request.accept_encodings.best_match(encodings)
+
+    response = Response(catalog["bodies"][encoding or "identity"], mimetype="application/json")
+    response.last_modified = datetime.datetime.fromtimestamp(catalog["last_modified"], tz=datetime.UTC)
+    response.vary.add("Accept-Encoding")
+
+    # each encoding is a different representation, with its own strong ETag
+    if encoding:
+        response.content_encoding = encoding
+        response.set_etag(f"{catalog['etag']}-{encoding}")
+    else:
+        response.set_etag(catalog["etag"])
+
+    return response.make_conditional(request)
+
+
 def make_players_search_key() -> str:
     """Make the cache key for the players search."""
     search = request.args.get("search") or ""
@@ -106,35 +127,9 @@ def api_changes() -> Response:
 
 @api_blueprint.route("/collections")
 @enforce_source
-@cache.cached()
 def api_collections() -> Response:
     """Return the collections."""
-    collection_service = CollectionService()
-    collections = collection_service.collections
-    character_service = CharacterService()
-    characters = character_service.characters
-
-    collections_to_remove = []
-    for collection_id, collection in collections.items():
-        collection_characters = [
-            character for character in characters.values() if character["collection"] == collection_id
-        ]
-        if collection_characters:
-            collection["chars"] = collection_characters
-        else:
-            collections_to_remove.append(collection_id)
-
-    # Remove collections without characters
-    for collection_id in collections_to_remove:
-        collections.pop(collection_id)
-
-    return jsonify(
-        {
-            "data": collections,
-            "status": "success",
-            "current_time": time.time(),
-        },
-    )
+    return catalog_response("collections")
 
 
 @api_blueprint.route("/achievements")
@@ -172,16 +167,18 @@ def api_research() -> Response:
 @cache.cached()
 def api_prestige(char_id: int) -> Response:
     """Return the prestiges of a character."""
-    try:
-        character_service = CharacterService()
-        character = character_service.characters[char_id]
-    except KeyError:
+    character_service = CharacterService()
+    character = character_service.get_character(char_id)
+    if character is None:
         flask.abort(404)
 
     collection_service = CollectionService()
     if character["collection"]:
-        character["collection_sprite"] = collection_service.collections[character["collection"]]["icon_sprite"]
-        character["collection_name"] = collection_service.collections[character["collection"]]["name"]
+        character = {
+            **character,
+            "collection_sprite": collection_service.collections[character["collection"]]["icon_sprite"],
+            "collection_name": collection_service.collections[character["collection"]]["name"],
+        }
 
     prestige_service = PrestigeService()
     return jsonify(
@@ -196,41 +193,16 @@ def api_prestige(char_id: int) -> Response:
 
 @api_blueprint.route("/crew")
 @enforce_source
-@cache.cached()
 def api_crew() -> Response:
     """Return all crew."""
-    character_service = CharacterService()
-    characters = character_service.characters
-    collection_service = CollectionService()
-    collections = collection_service.collections
-
-    for character in characters.values():
-        if character["collection"]:
-            character["collection_sprite"] = collections[character["collection"]]["icon_sprite"]
-            character["collection_name"] = collections[character["collection"]]["name"]
-
-    return jsonify(
-        {
-            "data": characters,
-            "status": "success",
-            "current_time": time.time(),
-        },
-    )
+    return catalog_response("crew")
 
 
 @api_blueprint.route("/items")
 @enforce_source
-@cache.cached()
 def api_items() -> Response:
     """Return all items."""
-    item_service = ItemService()
-    return jsonify(
-        {
-            "data": item_service.items,
-            "status": "success",
-            "current_time": time.time(),
-        },
-    )
+    return catalog_response("items")
 
 
 @api_blueprint.route("/item/<int:item_id>/prices")
@@ -238,10 +210,9 @@ def api_items() -> Response:
 @cache.cached()
 def api_item_prices(item_id: int) -> Response:
     """Return the item prices."""
-    try:
-        item_service = ItemService()
-        item = item_service.items[item_id]
-    except KeyError:
+    item_service = ItemService()
+    item = item_service.get_item(item_id)
+    if item is None:
         flask.abort(404)
 
     market_service = MarketService()
@@ -260,9 +231,8 @@ def api_item_prices(item_id: int) -> Response:
 def api_item_detail(item_id: int) -> Response:
     """Return the item details."""
     item_service = ItemService()
-    try:
-        item = item_service.items[item_id]
-    except KeyError:
+    item = item_service.get_item(item_id)
+    if item is None:
         flask.abort(404)
 
     market_service = MarketService()
@@ -297,57 +267,23 @@ def api_tournament() -> Response:
 
 @api_blueprint.route("/rooms")
 @enforce_source
-@cache.cached()
 def api_rooms() -> Response:
     """Return all rooms."""
-    room_service = RoomService()
-    return jsonify(
-        {
-            "data": room_service.rooms,
-            "status": "success",
-            "current_time": time.time(),
-        },
-    )
+    return catalog_response("rooms")
 
 
 @api_blueprint.route("/skins")
 @enforce_source
-@cache.cached()
 def api_skins() -> Response:
     """Return all skins."""
-    skin_service = SkinService()
-    skins = skin_service.skins
-
-    # Remove duplicate skins with the same name
-    skins_filtered = {}
-    known_names = set()
-    for skin_id, skin in skins.items():
-        if skin["name"] not in known_names:
-            skins_filtered[skin_id] = skin
-            known_names.add(skin["name"])
-
-    return jsonify(
-        {
-            "data": skins_filtered,
-            "status": "success",
-            "current_time": time.time(),
-        },
-    )
+    return catalog_response("skins")
 
 
 @api_blueprint.route("/ships")
 @enforce_source
-@cache.cached()
 def api_ships() -> Response:
     """Return all ships."""
-    ship_service = ShipService()
-    return jsonify(
-        {
-            "data": ship_service.ships,
-            "status": "success",
-            "current_time": time.time(),
-        },
-    )
+    return catalog_response("ships")
 
 
 @api_blueprint.route("/lastsales/<path:sale_type>/<int:sale_type_id>")
@@ -386,32 +322,16 @@ def api_last_sales_by_type(sale_from: str) -> Response:
 
 @api_blueprint.route("/crafts")
 @enforce_source
-@cache.cached()
 def api_crafts() -> Response:
     """Return all crafts."""
-    craft_service = CraftService()
-    return jsonify(
-        {
-            "data": craft_service.crafts,
-            "status": "success",
-            "current_time": time.time(),
-        },
-    )
+    return catalog_response("crafts")
 
 
 @api_blueprint.route("/missiles")
 @enforce_source
-@cache.cached()
 def api_missiles() -> Response:
     """Return all missiles."""
-    missile_service = MissileService()
-    return jsonify(
-        {
-            "data": missile_service.missiles,
-            "status": "success",
-            "current_time": time.time(),
-        },
-    )
+    return catalog_response("missiles")
 
 
 @api_blueprint.route("/config")
@@ -1,5 +1,7 @@
 from .cache import cache_cli
 from .check import check_cli
 from .importer import importer_cli
+from .pss import pss_cli
+from .record import record_cli
 
-__all__ = ["cache_cli", "check_cli", "importer_cli"]
+__all__ = ["cache_cli", "check_cli", "importer_cli", "pss_cli", "record_cli"]
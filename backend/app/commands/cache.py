@@ -4,21 +4,8 @@ import click
 from flask import current_app
 from flask.cli import AppGroup, with_appcontext
 
-from app.ext import cache
-from app.services.achievement import AchievementService
-from app.services.changes import ChangesService
-from app.services.character import CharacterService
-from app.services.collection import CollectionService
-from app.services.craft import CraftService
-from app.services.item import ItemService
-from app.services.market import MarketService
-from app.services.missile import MissileService
-from app.services.research import ResearchService
-from app.services.room import RoomService
-from app.services.ship import ShipService
-from app.services.skin import SkinService
-from app.services.sprite import SpriteService
-from app.services.training import TrainingService
+from app.ext import cache, dataset_cache
+from app.services.cache_builder import CacheBuilder
 
 cache_cli = AppGroup("cache", help="Manage the Flask cache.")
 
@@ -30,94 +17,51 @@ def clear_cache_command() -> None:
     with current_app.app_context():
         click.echo("Clearing cache...")
         cache.clear()
+        dataset_cache.clear()
         click.echo("Cache cleared.")
 
 
 @cache_cli.command("update")
+@click.option("--types", default=None, help="Comma separated types to update, all by default (e.g. sprite,item)")
+@click.option("--jobs", type=int, default=None, help="Number of worker processes, CACHE_UPDATE_JOBS by default")
 @with_appcontext
-def update_cache_command() -> None:
-    """Update the Flask cache."""
-    with current_app.app_context():
-        click.echo("Updating sprite cache...")
-        start = time.time()
-        SpriteService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Sprite cache updated in {duration:.2f}s.")
-
-        click.echo("Updating market cache...")
-        start = time.time()
-        MarketService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Market cache updated in {duration:.2f}.")
-
-        click.echo("Updating training cache...")
-        start = time.time()
-        TrainingService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Training cache updated {duration:.2f}s.")
-
-        click.echo("Updating item cache...")
-        start = time.time()
-        ItemService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Item cache updated {duration:.2f}s.")
-
-        click.echo("Updating character cache...")
-        start = time.time()
-        CharacterService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Character cache updated {duration:.2f}s.")
+def update_cache_command(types: str | None, jobs: int | None) -> None:
+    """Update the Flask cache, types built from other types are updated once they are done."""
+    try:
+        names = CacheBuilder.get_types(types.split(",") if types else None)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--types") from e
 
-        click.echo("Updating ship cache...")
-        start = time.time()
-        ShipService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Ship cache updated {duration:.2f}s.")
+    def on_updated(name: str, duration: float | None) -> None:
+        if duration is None:
+            click.echo(f"{name.capitalize()} cache not updated.")
+        else:
+            click.echo(f"{name.capitalize()} cache updated in {duration:.2f}s.")
 
-        click.echo("Updating room cache...")
-        start = time.time()
-        RoomService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Room cache updated {duration:.2f}s.")
+    click.echo(f"Updating {', '.join(names)} cache with {CacheBuilder.get_jobs(jobs)} processes...")
+    start = time.perf_counter()
 
-        click.echo("Updating craft cache...")
-        start = time.time()
-        CraftService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Craft cache updated {duration:.2f}s.")
+    try:
+        durations = CacheBuilder().update(names, jobs, on_updated)
+    except RuntimeError as e:
+        raise click.ClickException(str(e)) from e
 
-        click.echo("Updating skin cache...")
-        start = time.time()
-        SkinService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Skin cache updated {duration:.2f}s.")
+    duration = time.perf_counter() - start
+    click.echo(f"Cache updated in {duration:.2f}s ({sum(durations.values()):.2f}s of updates).")
 
-        click.echo("Updating achievement cache...")
-        start = time.time()
-        AchievementService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Achievement cache updated {duration:.2f}s.")
 
-        click.echo("Updating collection cache...")
-        start = time.time()
-        CollectionService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Collection cache updated {duration:.2f}s.")
-
-        click.echo("Updating missile cache...")
-        start = time.time()
-        MissileService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Missile cache updated {duration:.2f}s.")
-
-        click.echo("Updating research cache...")
-        start = time.time()
-        ResearchService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Research cache updated {duration:.2f}s.")
-
-        click.echo("Updating changes cache...")
-        start = time.time()
-        ChangesService().update_cache()
-        duration = time.time() - start
-        click.echo(f"Changes cache updated {duration:.2f}s.")
+@cache_cli.command("lock-stats")
+@click.option("--reset", is_flag=True, help="Forget the stats after printing them")
+@with_appcontext
+def lock_stats_command(reset: bool) -> None:
+    """Print the builds of each dataset, and the requests served while another process was building it."""
+    for key, stats in dataset_cache.lock_stats().items():
+        click.echo(key)
+        click.echo(f"  builds = {stats['builds']}")
+        click.echo(f"  contended = {stats['contended']}")
+        click.echo(f"  served stale = {stats['stale']}")
+        click.echo(f"  waited = {stats['waited']}")
+        click.echo(f"  timeouts = {stats['timeouts']}")
+
+    if reset:
+        dataset_cache.reset_lock_stats()
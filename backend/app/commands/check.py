@@ -3,6 +3,8 @@ from flask import current_app
 from flask.cli import AppGroup, with_appcontext
 
 from app.api_errors import EXPIRED_TOKEN_RESP2
+from app.ext import api_metrics, rate_limiter
+from app.ext.api_metrics import InMemoryMetricsSink
 from app.pixelstarshipsapi import PixelStarshipsApi
 
 check_cli = AppGroup("check", help="Check various aspects of the app.")
@@ -31,7 +33,7 @@ def token() -> None:
 
     # retrieve data as XML from Pixel Starships API
     pss_api = PixelStarshipsApi()
-    endpoint = f"https://{pss_api.server}/LadderService/ListUsersByRanking"
+    endpoint = f"{pss_api.base_url}/LadderService/ListUsersByRanking"
     current_app.logger.info("Checking %s...", endpoint)
     response = pss_api.call(endpoint, params=params, need_token=True)
 
@@ -39,3 +41,50 @@ def token() -> None:
         current_app.logger.error("Savy Token has expired: %s", response.text)
     else:
         current_app.logger.info("Savy Token is still valid.")
+
+
+@check_cli.command("rate-limit")
+@click.option("--reset", is_flag=True, help="Forget the current rate and throttle events")
+@with_appcontext
+def rate_limit(reset: bool) -> None:
+    """Print the current PSS API rate and throttle events."""
+    if reset:
+        rate_limiter.reset()
+
+    stats = rate_limiter.stats()
+    last_throttle_at = stats["last_throttle_at"].isoformat() if stats["last_throttle_at"] else "never"
+
+    click.echo(f"shared = {stats['shared']}")
+    click.echo(f"rate = {stats['rate']:.2f} requests/s")
+    click.echo(f"throttles = {stats['throttles']}")
+    click.echo(f"last_throttle_at = {last_throttle_at}")
+
+
+@check_cli.command("api-stats")
+@click.option("--reset", is_flag=True, help="Forget the metrics after printing them")
+@with_appcontext
+def api_stats(reset: bool) -> None:
+    """Print the metrics of each PSS API endpoint."""
+    if isinstance(api_metrics.sink, InMemoryMetricsSink):
+        click.echo("Metrics are kept in each process, only the ones of this command are printed", err=True)
+
+    for endpoint, stats in api_metrics.stats().items():
+        latency = stats["latency"]
+        size = stats["bytes"]
+        parse = stats["parse_time"]
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(stats["statuses"].items()))
+        histogram = ", ".join(
+            f"<={bucket}s: {count}"
+            for bucket, count in sorted(stats["latency_histogram"].items(), key=lambda bucket: float(bucket[0]))
+        )
+
+        click.echo(endpoint)
+        click.echo(f"  requests = {stats['requests']} ({statuses})")
+        click.echo(f"  latency = {latency['avg']:.3f}s avg, {latency['max']:.3f}s max, {latency['sum']:.1f}s total")
+        click.echo(f"  latency histogram = {histogram}")
+        click.echo(f"  bytes = {size['avg']:.0f} avg, {size['max']:.0f} max, {size['sum']:.0f} total")
+        click.echo(f"  parse time = {parse['avg']:.3f}s avg, {parse['max']:.3f}s max, {parse['sum']:.1f}s total")
+        click.echo(f"  token retries = {stats['token_retries']}")
+
+    if reset:
+        api_metrics.reset()
@@ -3,7 +3,6 @@ import random
 import time
 from collections.abc import Callable
 from pathlib import Path
-from urllib import request
 
 import click
 from flask import current_app
@@ -11,15 +10,19 @@ from flask.cli import AppGroup, with_appcontext
 from sqlalchemy.dialects.postgresql import insert
 
 from app.constants import PSS_SPRITES_URL
+from app.enums import TypeEnum
+from app.ext import api_metrics, cache, http_session
 from app.ext.db import db
 from app.models import Alliance, DailySale, Listing, MarketMessage, Player
 from app.pixelstarshipsapi import PixelStarshipsApi
+from app.pixelstarshipsapi_async import AsyncPixelStarshipsApi
 from app.services.achievement import AchievementService
-from app.services.changes import ChangesService
+from app.services.cache_builder import CACHE_TYPES, CacheBuilder
 from app.services.character import CharacterService
 from app.services.collection import CollectionService
 from app.services.craft import CraftService
 from app.services.daily_offer import DailyOfferService
+from app.services.design_version import DesignVersionService
 from app.services.item import ItemService
 from app.services.market import MarketService
 from app.services.missile import MissileService
@@ -31,7 +34,7 @@ from app.services.ship import ShipService
 from app.services.skin import SkinService
 from app.services.sprite import SpriteService
 from app.services.training import TrainingService
-from app.utils.pss import api_sleep, get_type_enum_from_string
+from app.utils.pss import get_type_enum_from_string
 
 importer_cli = AppGroup("import", help="Import data from PixyShip API.")
 
@@ -47,15 +50,39 @@ def log_command(func: Callable) -> Callable:
         end_time = time.time()  # Capturer le temps de fin
         elapsed_time = end_time - start_time  # Calculer le temps écoulé
         current_app.logger.info("END (%.2fs)", elapsed_time)
+
+        # connection reuse of the pooled transport during the command
+        for host, counters in http_session.stats().items():
+            current_app.logger.info(
+                "HTTP %s: %d requests, %d connections, %d reused",
+                host,
+                counters["requests"],
+                counters["connections"],
+                counters["reused"],
+            )
+
+        # where the time went for each PSS API endpoint called by the command
+        for endpoint, stats in api_metrics.stats().items():
+            current_app.logger.info(
+                "API %s: %d requests, %.2fs waiting, %.2fs parsing, %d bytes, %d token retries",
+                endpoint,
+                stats["requests"],
+                stats["latency"]["sum"],
+                stats["parse_time"]["sum"],
+                stats["bytes"]["sum"],
+                stats["token_retries"],
+            )
+
         return result
 
     return wrapper
 
 
 @importer_cli.command("players", help="Get top players and save them in database.")
+@click.option("--concurrency", type=int, default=None, help="Number of concurrent PSS API calls")
 @with_appcontext
 @log_command
-def import_players() -> None:
+def import_players(concurrency: int | None) -> None:
     """Get all top 100 players and top 100 alliances' players and save them in database."""
     player_service = PlayerService()
 
@@ -63,23 +90,32 @@ def import_players() -> None:
         current_app.logger.info("In staging mode, no players to import")
         return
 
+    async_pixel_starships_api = AsyncPixelStarshipsApi(player_service.pixel_starships_api, concurrency)
+
     current_app.logger.info("Importing players")
 
     current_app.logger.info("## top 100 players")
     top_users = list(player_service.get_top100_users_from_api().items())
-    api_sleep(5)
 
     current_app.logger.info("## top 100 alliances")
     count = 0
     top_alliances = player_service.get_top100_alliances_from_api()
-    for alliance_id, alliance in list(top_alliances.items()):
-        try:
-            count += 1
-            current_app.logger.info("[%d/100] %s (%d)...", count, alliance["name"], alliance_id)
-            top_users += list(player_service.get_alliance_users_from_api(alliance_id).items())
-            api_sleep(5)
-        except Exception:
-            current_app.logger.exception("Error when importing alliance (%d) users", alliance_id)
+
+    def save_alliance_users(alliance_id: int, alliance_users: dict) -> None:
+        nonlocal count
+        count += 1
+        current_app.logger.info("[%d/100] %s (%d)...", count, top_alliances[alliance_id]["name"], alliance_id)
+        top_users.extend(alliance_users.items())
+
+    def log_alliance_error(alliance_id: int, exception: Exception) -> None:
+        current_app.logger.error("Error when importing alliance (%d) users", alliance_id, exc_info=exception)
+
+    async_pixel_starships_api.crawl(
+        player_service.get_alliance_users_from_api,
+        list(top_alliances.keys()),
+        save_alliance_users,
+        log_alliance_error,
+    )
 
     try:
         # purge old data
@@ -97,9 +133,10 @@ def import_players() -> None:
 
 
 @importer_cli.command("assets", help="Get all assets and save them in database.")
+@click.option("--force", is_flag=True, help="Import all design lists, even if their version is unchanged")
 @with_appcontext
 @log_command
-def import_assets() -> None:
+def import_assets(force: bool) -> None:
     """Get all items, crews, rooms, ships and save them in database."""
     item_service = ItemService()
     character_service = CharacterService()
@@ -113,75 +150,71 @@ def import_assets() -> None:
     achievement_service = AchievementService()
     craft_service = CraftService()
     missile_service = MissileService()
-    changes_service = ChangesService()
-
-    current_app.logger.info("Importing sprites...")
-    sprite_service.update_sprites()
-    sprite_service.update_cache()
-
-    current_app.logger.info("Importing trainings...")
-    training_service.update_trainings()
-    training_service.update_cache()
-
-    current_app.logger.info("Importing items...")
-    item_service.update_items()
-    item_service.update_cache()
-
-    current_app.logger.info("Importing characters...")
-    character_service.update_characters()
-    character_service.update_cache()
-
-    current_app.logger.info("Importing researches...")
-    research_service.update_researches()
-    research_service.update_cache()
-
-    current_app.logger.info("Importing rooms...")
-    room_service.update_rooms()
-    room_service.update_cache()
+    design_version_service = DesignVersionService()
 
-    current_app.logger.info("Importing ships...")
-    ship_service.update_ships()
-    ship_service.update_cache()
-
-    current_app.logger.info("Importing collections...")
-    collection_service.update_collections()
-    collection_service.update_cache()
+    # get fresh design versions, the same API instance is used for the whole run to fetch shared lists only once
+    cache.delete("api_settings")
+    pixel_starships_api = PixelStarshipsApi()
 
-    current_app.logger.info("Importing skinsets...")
-    skin_service.update_skinsets()
-    skin_service.update_cache()
+    design_imports: list[tuple[TypeEnum, str, Callable]] = [
+        (TypeEnum.SPRITE, "sprites", sprite_service.update_sprites),
+        (TypeEnum.TRAINING, "trainings", training_service.update_trainings),
+        (TypeEnum.ITEM, "items", item_service.update_items),
+        (TypeEnum.CHARACTER, "characters", character_service.update_characters),
+        (TypeEnum.RESEARCH, "researches", research_service.update_researches),
+        (TypeEnum.ROOM, "rooms", room_service.update_rooms),
+        (TypeEnum.SHIP, "ships", ship_service.update_ships),
+        (TypeEnum.COLLECTION, "collections", collection_service.update_collections),
+        (TypeEnum.SKINSET, "skinsets", skin_service.update_skinsets),
+        (TypeEnum.SKIN, "skins", skin_service.update_skins),
+        (TypeEnum.ACHIEVEMENT, "achievements", achievement_service.update_achievements),
+        (TypeEnum.CRAFT, "crafts", craft_service.update_crafts),
+        (TypeEnum.MISSILE, "missiles", missile_service.update_missiles),
+    ]
+
+    imported_count = 0
+    for design_type, name, update_records in design_imports:
+        version = design_version_service.get_design_version_from_api_settings(
+            design_type,
+            pixel_starships_api.api_settings,
+        )
 
-    current_app.logger.info("Importing skins...")
-    skin_service.update_skins()
-    skin_service.update_cache()
+        if not force and design_version_service.is_design_version_imported(design_type, version):
+            current_app.logger.info("Skipping %s, version %s already imported", name, version)
+            continue
 
-    current_app.logger.info("Importing achievements...")
-    achievement_service.update_achievements()
-    achievement_service.update_cache()
+        current_app.logger.info("Importing %s (version %s)...", name, version)
+        update_records(pixel_starships_api)
+        design_version_service.save_design_version(design_type, version)
+        imported_count += 1
 
-    current_app.logger.info("Importing crafts...")
-    craft_service.update_crafts()
-    craft_service.update_cache()
+    if not imported_count:
+        current_app.logger.info("Nothing changed")
+        return
 
-    current_app.logger.info("Importing missiles...")
-    missile_service.update_missiles()
-    missile_service.update_cache()
+    def on_updated(name: str, duration: float | None) -> None:
+        if duration is None:
+            current_app.logger.warning("Cache of %s not updated", name)
+        else:
+            current_app.logger.info("Cache of %s updated in %.2fs", name, duration)
 
-    current_app.logger.info("Invalidating changes cache...")
-    changes_service.update_cache()
+    # services data are built from several types of records, refresh all of them
+    current_app.logger.info("Updating cache...")
+    CacheBuilder().update([name for name in CACHE_TYPES if name != "market"], on_updated=on_updated)
 
     current_app.logger.info("Done")
 
 
 @importer_cli.command("prestiges", help="Get all prestiges and save them in database.")
+@click.option("--concurrency", type=int, default=None, help="Number of concurrent PSS API calls")
 @with_appcontext
 @log_command
-def import_prestiges() -> None:
+def import_prestiges(concurrency: int | None) -> None:
     """Import prestiges for checking changes."""
     prestige_service = PrestigeService()
 
     current_app.logger.info("Importing prestiges...")
-    prestige_service.update_prestiges()
+    prestige_service.update_prestiges(concurrency)
 
     current_app.logger.info("Done")
 
@@ -357,13 +390,15 @@ def save_daily_sale(daily_sale: DailySale) -> None:
 @importer_cli.command("market", help="Get last market sales and save them in database.")
 @click.option("--one-item-only", is_flag=True, help="Import randomly only one item")
 @click.option("--item-id", type=int, default=None, help="Import only the given item")
+@click.option("--concurrency", type=int, default=None, help="Number of concurrent PSS API calls")
 @with_appcontext
 @log_command
-def import_market(one_item_only: bool, item_id: int | None) -> None:
+def import_market(one_item_only: bool, item_id: int | None, concurrency: int | None) -> None:
     """Get last market sales and save them in database."""
     item_service = ItemService()
     market_service = MarketService()
     pixel_starships_api = PixelStarshipsApi()
+    async_pixel_starships_api = AsyncPixelStarshipsApi(pixel_starships_api, concurrency)
 
     if current_app.config["USE_STAGING_API"]:
         current_app.logger.info("In staging mode, no sales to import")
@@ -387,12 +422,18 @@ def import_market(one_item_only: bool, item_id: int | None) -> None:
         total = 1
 
     saleable_items_items = list(saleable_items.items())
-    saleable_items_ordered = random.sample(saleable_items_items, k=len(saleable_items_items))
+    saleable_items_ordered = random.sample(saleable_items_items, k=len(saleable_items_items))[:total]
 
-    for count, (current_item_id, current_item) in enumerate(saleable_items_ordered, start=1):
-        current_app.logger.info("[%d/%d] item: %s (%d)", count, total, current_item["name"], current_item_id)
+    count = 0
 
-        sales = market_service.get_sales_from_api(pixel_starships_api, current_item_id)
+    def get_sales(saleable_item: tuple[int, dict]) -> list:
+        return market_service.get_sales_from_api(pixel_starships_api, saleable_item[0])
+
+    def save_sales(saleable_item: tuple[int, dict], sales: list) -> None:
+        nonlocal count
+        count += 1
+        current_item_id, current_item = saleable_item
+        current_app.logger.info("[%d/%d] item: %s (%d)", count, total, current_item["name"], current_item_id)
         current_app.logger.info("[%d/%d] retrieved: %d", count, total, len(sales))
 
         for sale in sales:
@@ -415,10 +456,7 @@ def import_market(one_item_only: bool, item_id: int | None) -> None:
         current_app.logger.info("[%d/%d] saved: %d", count, total, len(sales))
         db.session.commit()
 
-        if one_item_only:
-            break
-
-        api_sleep(3, force_sleep=True)
+    async_pixel_starships_api.crawl(get_sales, saleable_items_ordered, save_sales)
 
     market_service.update_cache()
     current_app.logger.info("Done")
@@ -427,11 +465,14 @@ def import_market(one_item_only: bool, item_id: int | None) -> None:
 @importer_cli.command("market-messages", help="Get last market messages and save them in database.")
 @click.option("--one-item-only", is_flag=True, help="Import randomly only one item")
 @click.option("--item-id", type=int, default=None, help="Import only the given item")
+@click.option("--concurrency", type=int, default=None, help="Number of concurrent PSS API calls")
 @with_appcontext
 @log_command
-def import_market_messages(one_item_only: bool, item_id: int | None) -> None:
+def import_market_messages(one_item_only: bool, item_id: int | None, concurrency: int | None) -> None:
     """Get last market messages and save them in database."""
     item_service = ItemService()
+    pixel_starships_api = PixelStarshipsApi()
+    async_pixel_starships_api = AsyncPixelStarshipsApi(pixel_starships_api, concurrency)
 
     if current_app.config["USE_STAGING_API"]:
         current_app.logger.info("In staging mode, no market messages to import")
@@ -457,12 +498,18 @@ def import_market_messages(one_item_only: bool, item_id: int | None) -> None:
     items_with_offstat_items: list[tuple[int, dict]] = list(items_with_offstat.items())
     items_with_offstat_ordered: list[tuple[int, dict]] = random.sample(
         items_with_offstat_items, k=len(items_with_offstat_items)
-    )
+    )[:total]
 
-    for count, (current_item_id, current_item) in enumerate(items_with_offstat_ordered, start=1):
-        current_app.logger.info("[%d/%d] item: %s (%d)", count, total, current_item["name"], current_item_id)
+    count = 0
+
+    def get_messages(item_with_offstat: tuple[int, dict]) -> list:
+        return MarketService.get_market_messages_from_api(pixel_starships_api, item_with_offstat[0])
 
-        messages = MarketService.get_market_messages_from_api(current_item_id)
+    def save_messages(item_with_offstat: tuple[int, dict], messages: list) -> None:
+        nonlocal count
+        count += 1
+        current_item_id, current_item = item_with_offstat
+        current_app.logger.info("[%d/%d] item: %s (%d)", count, total, current_item["name"], current_item_id)
         current_app.logger.info("[%d/%d] retrieved: %d", count, total, len(messages))
 
         for message in messages:
@@ -482,10 +529,7 @@ def import_market_messages(one_item_only: bool, item_id: int | None) -> None:
 
         db.session.commit()
 
-        if one_item_only:
-            break
-
-        api_sleep(1, force_sleep=True)
+    async_pixel_starships_api.crawl(get_messages, items_with_offstat_ordered, save_messages)
 
     current_app.logger.info("Done")
 
@@ -537,7 +581,9 @@ def dowload_sprites() -> None:
             current_app.logger.info("Downloading %s", filename)
             url = PSS_SPRITES_URL.format(image_number)
             try:
-                request.urlretrieve(url, filename)
+                response = http_session.get(url)
+                response.raise_for_status()
+                Path(filename).write_bytes(response.content)
             except Exception:
                 current_app.logger.exception("Error downloading sprite: %s", url)
 
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+
+from app.ext.http_fixtures import FixtureStore, Replayer, create_fixture_server
+
+pss_cli = AppGroup("pss", help="Offline PSS API tools.")
+
+
+@pss_cli.command("serve", help="Serve recorded PSS API responses, to be used with FORCED_PIXELSTARSHIPS_API_URL.")
+@click.option("--host", default="127.0.0.1", help="Host to listen on")
+@click.option("--port", type=int, default=8765, help="Port to listen on")
+@click.option("--latency", type=float, default=None, help="Delay added to each response, in seconds")
+@click.option("--throttle-rate", type=float, default=None, help="Requests per second before throttling, 0 to disable")
+@click.option("--throttle-status", type=int, default=None, help="HTTP status of throttled responses")
+@with_appcontext
+def serve(
+    host: str,
+    port: int,
+    latency: float | None,
+    throttle_rate: float | None,
+    throttle_status: int | None,
+) -> None:
+    """Start a local stand-in PSS API server replaying fixtures."""
+    fixtures_dir = current_app.config["PSS_FIXTURES_DIR"] or str(Path(current_app.instance_path) / "pss_fixtures")
+
+    if latency is None:
+        latency = current_app.config["PSS_REPLAY_LATENCY"]
+
+    if throttle_rate is None:
+        throttle_rate = current_app.config["PSS_REPLAY_THROTTLE_RATE"]
+
+    if throttle_status is None:
+        throttle_status = current_app.config["PSS_REPLAY_THROTTLE_STATUS"]
+
+    replayer = Replayer(
+        FixtureStore(fixtures_dir),
+        latency=latency,
+        throttle_rate=throttle_rate,
+        throttle_status=throttle_status,
+    )
+
+    server = create_fixture_server(replayer, host, port)
+    current_app.logger.info("Serving fixtures from %s on http://%s:%d", fixtures_dir, host, port)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,104 @@
+from xml.etree import ElementTree as ET
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import update
+
+from app.constants import RECORD_HASH_IGNORED_ATTRIBUTES
+from app.ext.db import db
+from app.models import Record
+from app.services.record import RecordService
+from app.utils.xml_helpers import create_data_delta, create_lean_record
+
+record_cli = AppGroup("record", help="Manage records.")
+
+
+@record_cli.command("rehash", help="Compute hashes of current records again with RECORD_HASH_ALGORITHM.")
+@click.option("--batch-size", type=int, default=1000, help="Number of records updated at once")
+@with_appcontext
+def rehash(batch_size: int) -> None:
+    """Compute hashes of current records again, to be run after changing the hash algorithm."""
+    records = (
+        db.session.query(Record.id, Record.type, Record.data)
+        .filter_by(current=True)
+        .execution_options(yield_per=batch_size)
+    )
+
+    updated_records = []
+    count = 0
+    for record in records:
+        # prestiges are stored as JSON, designs as XML with ignored attributes
+        if record.data.startswith("<"):
+            ignore_list = RECORD_HASH_IGNORED_ATTRIBUTES.get(record.type)
+            hash_input = create_lean_record(ET.fromstring(record.data), ignore_list).hash_input
+        else:
+            hash_input = record.data
+
+        updated_records.append({"id": record.id, "md5_hash": RecordService.get_record_hash(hash_input)})
+        if len(updated_records) >= batch_size:
+            count += len(updated_records)
+            db.session.execute(update(Record), updated_records)
+            updated_records = []
+
+    if updated_records:
+        count += len(updated_records)
+        db.session.execute(update(Record), updated_records)
+
+    db.session.commit()
+    current_app.logger.info("%d records hashed with %s", count, current_app.config["RECORD_HASH_ALGORITHM"])
+
+
+@record_cli.command("compress-history", help="Store previous versions of records as delta against the next ones.")
+@click.option("--batch-size", type=int, default=1000, help="Number of records updated at once")
+@with_appcontext
+def compress_history(batch_size: int) -> None:
+    """Store previous versions of records as delta, when only their root attributes changed."""
+    updated_records = []
+    count = 0
+    for record, data, next_data in RecordService.iter_history(batch_size):
+        # the newest version of each record is always kept with its data
+        if record.delta is not None or next_data is None:
+            continue
+
+        delta = create_data_delta(data, next_data)
+        if delta is None:
+            continue
+
+        updated_records.append({"id": record.id, "data": None, "delta": delta})
+        if len(updated_records) >= batch_size:
+            count += len(updated_records)
+            db.session.execute(update(Record), updated_records)
+            updated_records = []
+
+    if updated_records:
+        count += len(updated_records)
+        db.session.execute(update(Record), updated_records)
+
+    db.session.commit()
+    current_app.logger.info("%d records stored as delta", count)
+
+
+@record_cli.command("expand-history", help="Store previous versions of records with their full data again.")
+@click.option("--batch-size", type=int, default=1000, help="Number of records updated at once")
+@with_appcontext
+def expand_history(batch_size: int) -> None:
+    """Rebuild the data of previous versions stored as delta."""
+    updated_records = []
+    count = 0
+    for record, data, _next_data in RecordService.iter_history(batch_size):
+        if record.delta is None:
+            continue
+
+        updated_records.append({"id": record.id, "data": data, "delta": None})
+        if len(updated_records) >= batch_size:
+            count += len(updated_records)
+            db.session.execute(update(Record), updated_records)
+            updated_records = []
+
+    if updated_records:
+        count += len(updated_records)
+        db.session.execute(update(Record), updated_records)
+
+    db.session.commit()
+    current_app.logger.info("%d records stored with their full data", count)
@@ -17,9 +17,67 @@ class DefaultConfig:
     FORCED_PIXELSTARSHIPS_API_URL = None
     USE_STAGING_API = False
 
+    # Pooled HTTP transport used for all PSS API calls (connections are kept alive and reused)
+    PSS_HTTP_POOL_CONNECTIONS = 4
+    PSS_HTTP_POOL_MAXSIZE = 10
+    PSS_HTTP_POOL_BLOCK = True
+    PSS_HTTP_CONNECT_TIMEOUT = 5
+    PSS_HTTP_READ_TIMEOUT = 60
+    PSS_HTTP_RETRY_TOTAL = 3
+    PSS_HTTP_RETRY_BACKOFF_FACTOR = 1.0
+    PSS_HTTP_RETRY_STATUS_FORCELIST = (502, 503, 504)
+
+    # Record PSS API responses as fixtures ("record"), or replay them without network access ("replay"),
+    # fixtures are stored in the instance folder by default
+    PSS_HTTP_MODE = None
+    PSS_FIXTURES_DIR = None
+    PSS_REPLAY_LATENCY = 0.0
+    PSS_REPLAY_THROTTLE_RATE = 0.0
+    PSS_REPLAY_THROTTLE_STATUS = 429
+
+    # Bulk crawls (market, market messages, players, prestiges): number of concurrent calls
+    PSS_FAN_OUT_CONCURRENCY = 1
+
+    # PSS API rate limiter (requests per second) of crawls and imports, shared by all processes when the cache uses
+    # Redis, calls made while serving web requests are not limited. 400 isn't throttling, PSS answers it to bad requests
+    PSS_RATE_LIMIT_ENABLED = True
+    PSS_RATE_LIMIT_INITIAL_RATE = 2.0
+    PSS_RATE_LIMIT_MIN_RATE = 0.1
+    PSS_RATE_LIMIT_MAX_RATE = 10.0
+    PSS_RATE_LIMIT_INCREASE = 0.1
+    PSS_RATE_LIMIT_DECREASE_FACTOR = 0.5
+    PSS_RATE_LIMIT_THROTTLE_PAUSE = 10
+    PSS_RATE_LIMIT_THROTTLE_STATUSES = (429, 503)
+    PSS_RATE_LIMIT_STATE_TIMEOUT = 60 * 60 * 24
+
+    # Per-endpoint metrics of PSS API calls, kept in the process ("memory"), shared through Redis ("redis"),
+    # or sent to a custom sink given by its import path. None shares them through Redis when the cache uses it,
+    # `flask check api-stats` runs in its own process and only sees shared metrics
+    PSS_METRICS_ENABLED = True
+    PSS_METRICS_SINK = None
+    PSS_METRICS_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
     # Maximum of changes to be returned by PixyShip API and displayed in front
     CHANGES_MAX_ASSETS = 5000
 
+    # Digest of records hash input, "md5" or "xxh128" (faster, requires the xxhash extra).
+    # Both are 128 bits and stored in the md5_hash column, but they are not comparable with each other:
+    # after changing it, run `flask record rehash` or the next import will make a new version of every record
+    RECORD_HASH_ALGORITHM = "md5"
+
+    # Storage of previous versions of records, "full" keeps the whole data,
+    # "delta" only keeps the root attributes changed since the next version when nothing else changed.
+    # Existing history is converted with `flask record compress-history` (or `expand-history` to go back)
+    RECORD_HISTORY_MODE = "full"
+
+    # Number of records fetched at once when building data from records, bounds the memory used by a rebuild
+    RECORDS_CHUNK_SIZE = 1000
+
+    # Seconds before the in-process index of current records of a type is reloaded,
+    # and before an unknown record id can reload its type again
+    RECORD_INDEX_TTL = 300
+    RECORD_INDEX_NEGATIVE_TTL = 60
+
     # Generated with `python -c 'import os; print(os.urandom(16))'`, must be kept secret
     # Warning: never use this key value in production!
     SECRET_KEY = "dev"
@@ -30,6 +88,17 @@ class DefaultConfig:
     DEVICE_LOGIN_CHECKSUM_KEY = None
     MIN_DEVICES = 2
 
+    # Device tokens, renewed in background before they expire (in seconds)
+    DEVICE_TOKEN_LIFETIME = 60 * 60 * 12
+    DEVICE_TOKEN_RENEW_MARGIN = 60 * 30
+    DEVICE_POOL_RENEW_INTERVAL = 60 * 5
+    DEVICE_POOL_LEASE_TIMEOUT = 30
+
+    # Seconds before the lock of a device login shared by the processes is released if its process dies,
+    # and seconds between checks when another process holds it
+    DEVICE_POOL_RENEW_LOCK_TTL = 90
+    DEVICE_POOL_RENEW_LOCK_POLL_INTERVAL = 0.1
+
     # Session cookie security
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
@@ -46,6 +115,42 @@ class DefaultConfig:
     CACHE_REDIS_URL = "redis://localhost:6379/1"
     CACHE_DEFAULT_TIMEOUT = 600
 
+    # Number of processes updating the cache of independent types in parallel, None for the number of CPUs
+    CACHE_UPDATE_JOBS = None
+
+    # Serialized size of the services datasets (items, characters...) each worker keeps in memory,
+    # least recently used datasets are read again from Redis above it
+    DATASET_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+    # Listen to datasets invalidations published on Redis, so workers don't check the generation of their datasets
+    # on each access, and load the new ones in background
+    DATASET_CACHE_INVALIDATIONS = True
+
+    # Seconds a worker serves a dataset kept in memory without checking its generation in Redis,
+    # when invalidations are missed or disabled
+    DATASET_CACHE_REVALIDATE_INTERVAL = 5
+
+    # Seconds the previous generation of a dataset is kept in Redis for workers still loading it
+    DATASET_CACHE_PREVIOUS_GENERATION_TTL = 60
+
+    # Seconds an expired dataset is still served while a single process builds it again
+    DATASET_CACHE_STALE_TTL = 600
+
+    # Seconds before the lock of a dataset builder is released if its process dies
+    DATASET_CACHE_LOCK_TTL = 120
+
+    # Seconds a request waits for a dataset built by another process when no expired one is left,
+    # and seconds between checks, it builds the dataset itself after that
+    DATASET_CACHE_LOCK_WAIT = 10
+    DATASET_CACHE_LOCK_POLL_INTERVAL = 0.05
+
+    # Datasets also stored by id, so endpoints needing a few entities (item, character...) don't read all of them
+    DATASET_CACHE_ENTITY_KEYS = ("items", "characters", "rooms", "item_upgrades")
+
+    # Content encodings of catalog endpoints (items, crew, rooms...) responses, compressed when the cache is updated,
+    # by order of preference: "gzip", and "br" (smaller, requires the brotli extra)
+    CATALOG_ENCODINGS = ("gzip",)
+
     # Frontend configuration
     SPRITE_URL = "//pixelstarships.s3.amazonaws.com/"
     DISCORD_URL = "https://example.discord/"
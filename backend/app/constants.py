@@ -1,5 +1,7 @@
 import datetime
 
+from app.enums import TypeEnum
+
 PSS_SPRITES_URL = "https://pixelstarships.s3.amazonaws.com/{}.png"
 
 # A map to find the correct interior for a given race's ship
@@ -199,6 +201,32 @@ TYPE_PSS_API_NAME_FIELD: dict[str, str] = {
     "sprite": "SpriteKey",
 }
 
+# API settings versions of each design list, a list is imported again only if one of its versions changed
+DESIGN_VERSION_SETTINGS: dict[TypeEnum, tuple[str, ...]] = {
+    TypeEnum.SPRITE: ("FileVersion",),
+    TypeEnum.TRAINING: ("TrainingDesignVersion",),
+    TypeEnum.ITEM: ("ItemDesignVersion",),
+    TypeEnum.CHARACTER: ("CharacterDesignVersion",),
+    TypeEnum.RESEARCH: ("ResearchDesignVersion",),
+    TypeEnum.ROOM: ("RoomDesignVersion", "RoomDesignSpriteVersion", "RoomDesignPurchaseVersion"),
+    TypeEnum.SHIP: ("ShipDesignVersion",),
+    TypeEnum.COLLECTION: ("CollectionDesignVersion",),
+    TypeEnum.SKINSET: ("SkinSetVersion",),
+    TypeEnum.SKIN: ("SkinVersion",),
+    TypeEnum.ACHIEVEMENT: ("AchievementDesignVersion",),
+    TypeEnum.CRAFT: ("CraftDesignVersion", "MissileDesignVersion", "ItemDesignVersion"),
+    TypeEnum.MISSILE: ("ItemDesignVersion", "MissileDesignVersion"),
+}
+
+# attributes changing too often to make a new record, they are updated in the current record instead
+RECORD_HASH_IGNORED_ATTRIBUTES: dict[TypeEnum, list[str]] = {
+    TypeEnum.ITEM: ["FairPrice", "MarketPrice", "BuildPrice"],
+    TypeEnum.CRAFT: ["ReloadModifier"],
+    TypeEnum.MISSILE: ["ReloadModifier"],
+    TypeEnum.ROOM: ["AvailabilityMask"],
+    TypeEnum.SKINSET: ["PurchaseCount", "ApprovalFlags"],
+}
+
 EQUIPMENT_SLOTS: list[str] = ["Head", "Body", "Leg", "Weapon", "Accessory", "Pet"]
 
 SLOT_MAP: dict[str, str | None] = {
@@ -1,5 +1,21 @@
+from .api_metrics import api_metrics
 from .cache import cache
+from .dataset_cache import dataset_cache
 from .db import db
+from .device_pool import device_pool
+from .http_session import http_session
 from .migrate import migrate
+from .rate_limiter import rate_limiter
+from .redis_client import redis_client
 
-__all__ = ["cache", "db", "migrate"]
+__all__ = [
+    "api_metrics",
+    "cache",
+    "dataset_cache",
+    "db",
+    "device_pool",
+    "http_session",
+    "migrate",
+    "rate_limiter",
+    "redis_client",
+]
@@ -0,0 +1,245 @@
+import threading
+from urllib.parse import urlsplit
+
+from flask import Flask, current_app
+from redis import Redis
+from requests import Response
+from werkzeug.utils import import_string
+
+from .redis_client import redis_client
+
+# Keep the highest value of a hash field
+MAXIMUM_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]))
+if current == nil or tonumber(ARGV[2]) > current then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+
+class InMemoryMetricsSink:
+    """Metrics kept in the current process, flat counters grouped by endpoint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, dict[str, float]] = {}
+
+    def increment(self, endpoint: str, name: str, amount: float = 1) -> None:
+        """Add the amount to a counter."""
+        with self._lock:
+            counters = self._metrics.setdefault(endpoint, {})
+            counters[name] = counters.get(name, 0) + amount
+
+    def maximum(self, endpoint: str, name: str, value: float) -> None:
+        """Keep the highest value of a counter."""
+        with self._lock:
+            counters = self._metrics.setdefault(endpoint, {})
+            counters[name] = max(counters.get(name, value), value)
+
+    def update(self, endpoint: str, increments: dict[str, float], maximums: dict[str, float]) -> None:
+        """Add the increments to their counters and keep the highest values of the maximums, at once."""
+        with self._lock:
+            counters = self._metrics.setdefault(endpoint, {})
+            for name, amount in increments.items():
+                counters[name] = counters.get(name, 0) + amount
+
+            for name, value in maximums.items():
+                counters[name] = max(counters.get(name, value), value)
+
+    def get_metrics(self) -> dict[str, dict[str, float]]:
+        """Get a copy of the counters of each endpoint."""
+        with self._lock:
+            return {endpoint: counters.copy() for endpoint, counters in self._metrics.items()}
+
+    def reset(self) -> None:
+        """Forget all counters."""
+        with self._lock:
+            self._metrics = {}
+
+
+class RedisMetricsSink:
+    """Metrics shared by all processes, one Redis hash per endpoint."""
+
+    KEY_PREFIX = "pixyship:api_metrics:"
+    ENDPOINTS_KEY = KEY_PREFIX + "endpoints"
+
+    def __init__(self, connection: Redis) -> None:
+        self.connection = connection
+        self._maximum_script = connection.register_script(MAXIMUM_SCRIPT)
+
+    def increment(self, endpoint: str, name: str, amount: float = 1) -> None:
+        """Add the amount to a counter."""
+        pipeline = self.connection.pipeline()
+        pipeline.sadd(self.ENDPOINTS_KEY, endpoint)
+        pipeline.hincrbyfloat(self.KEY_PREFIX + endpoint, name, amount)
+        pipeline.execute()
+
+    def maximum(self, endpoint: str, name: str, value: float) -> None:
+        """Keep the highest value of a counter."""
+        self._maximum_script(keys=[self.KEY_PREFIX + endpoint], args=[name, value])
+
+    def update(self, endpoint: str, increments: dict[str, float], maximums: dict[str, float]) -> None:
+        """Add the increments to their counters and keep the highest values of the maximums, in one round trip."""
+        key = self.KEY_PREFIX + endpoint
+
+        pipeline = self.connection.pipeline(transaction=False)
+        pipeline.sadd(self.ENDPOINTS_KEY, endpoint)
+        for name, amount in increments.items():
+            pipeline.hincrbyfloat(key, name, amount)
+
+        for name, value in maximums.items():
+            self._maximum_script(keys=[key], args=[name, value], client=pipeline)
+
+        pipeline.execute()
+
+    def get_metrics(self) -> dict[str, dict[str, float]]:
+        """Get the counters of each endpoint."""
+        endpoints = sorted(endpoint.decode() for endpoint in self.connection.smembers(self.ENDPOINTS_KEY))
+
+        pipeline = self.connection.pipeline()
+        for endpoint in endpoints:
+            pipeline.hgetall(self.KEY_PREFIX + endpoint)
+
+        return {
+            endpoint: {name.decode(): float(value) for name, value in counters.items()}
+            for endpoint, counters in zip(endpoints, pipeline.execute(), strict=True)
+        }
+
+    def reset(self) -> None:
+        """Forget all counters."""
+        endpoints = [endpoint.decode() for endpoint in self.connection.smembers(self.ENDPOINTS_KEY)]
+        self.connection.delete(self.ENDPOINTS_KEY, *[self.KEY_PREFIX + endpoint for endpoint in endpoints])
+
+
+class ApiMetrics:
+    """Per-endpoint metrics of PSS API calls: latency, payload size, status codes, token retries and parse time."""
+
+    SUMMARIES = ("latency", "bytes", "parse_time")
+
+    def __init__(self) -> None:
+        self._config: dict = {}
+        self.sink: InMemoryMetricsSink | RedisMetricsSink | None = None
+
+    def init_app(self, app: Flask) -> None:
+        """Read the metrics configuration from the app and create the sink."""
+        self._config = {
+            "enabled": app.config["PSS_METRICS_ENABLED"],
+            "latency_buckets": tuple(sorted(app.config["PSS_METRICS_LATENCY_BUCKETS"])),
+        }
+
+        self.sink = self.create_sink(app.config["PSS_METRICS_SINK"])
+
+        app.extensions["api_metrics"] = self
+
+    @staticmethod
+    def create_sink(sink: str | None) -> InMemoryMetricsSink | RedisMetricsSink:
+        """Create the sink from its name ("memory" or "redis"), the import path of a custom sink class, or None."""
+        if sink == "memory":
+            return InMemoryMetricsSink()
+
+        if sink in ("redis", None):
+            # without Redis, metrics can only be kept in the current process
+            if redis_client.connection is None:
+                return InMemoryMetricsSink()
+
+            return RedisMetricsSink(redis_client.connection)
+
+        return import_string(sink)()
+
+    @staticmethod
+    def get_endpoint_name(url: str) -> str:
+        """Get the endpoint name of an API URL, without host and parameters."""
+        return urlsplit(url).path.strip("/")
+
+    @staticmethod
+    def summarize(name: str, value: float) -> tuple[dict[str, float], dict[str, float]]:
+        """Get the increments of the count and sum of a summary, and its maximum."""
+        return {f"{name}:count": 1, f"{name}:sum": value}, {f"{name}:max": value}
+
+    def observe(self, endpoint: str, name: str, value: float) -> None:
+        """Add a value to the count, sum and maximum of a summary."""
+        increments, maximums = self.summarize(name, value)
+        self.sink.update(endpoint, increments, maximums)
+
+    def observe_response(self, response: Response, latency: float, stream: bool = False) -> None:
+        """Record the status and latency of a response, and its size if the body has been downloaded."""
+        if not self._config.get("enabled"):
+            return
+
+        try:
+            increments, maximums = self.summarize("latency", latency)
+            increments[f"status:{response.status_code}"] = 1
+
+            bucket = next((bucket for bucket in self._config["latency_buckets"] if latency <= bucket), "inf")
+            increments[f"latency:bucket:{bucket}"] = 1
+
+            if not stream and response.raw is not None:
+                bytes_increments, bytes_maximums = self.summarize("bytes", response.raw.tell())
+                increments |= bytes_increments
+                maximums |= bytes_maximums
+
+            # all metrics of the response are sent at once
+            self.sink.update(self.get_endpoint_name(response.url), increments, maximums)
+        except Exception:
+            # metrics must never break an API call
+            current_app.logger.exception("Error when recording metrics of %s", response.url)
+
+    def observe_bytes(self, response: Response) -> None:
+        """Record the number of bytes received for the response body."""
+        if not self._config.get("enabled") or response.raw is None:
+            return
+
+        self.observe(self.get_endpoint_name(response.url), "bytes", response.raw.tell())
+
+    def observe_parse_time(self, response: Response, parse_time: float) -> None:
+        """Record the time spent parsing the XML of the response."""
+        if not self._config.get("enabled"):
+            return
+
+        self.observe(self.get_endpoint_name(response.url), "parse_time", parse_time)
+
+    def observe_token_retry(self, response: Response) -> None:
+        """Record a call retried because of an expired token."""
+        if not self._config.get("enabled"):
+            return
+
+        self.sink.increment(self.get_endpoint_name(response.url), "token_retries")
+
+    def stats(self) -> dict[str, dict]:
+        """Get the metrics of each endpoint, summaries with their average and the latency histogram."""
+        stats: dict[str, dict] = {}
+        for endpoint, counters in sorted(self.sink.get_metrics().items()):
+            endpoint_stats: dict = {
+                "requests": 0,
+                "statuses": {},
+                "latency_histogram": {},
+                "token_retries": int(counters.get("token_retries", 0)),
+            }
+
+            for name in self.SUMMARIES:
+                count = int(counters.get(f"{name}:count", 0))
+                total = counters.get(f"{name}:sum", 0.0)
+                endpoint_stats[name] = {
+                    "count": count,
+                    "sum": total,
+                    "avg": total / count if count else 0.0,
+                    "max": counters.get(f"{name}:max", 0.0),
+                }
+
+            for name, value in counters.items():
+                if name.startswith("status:"):
+                    endpoint_stats["statuses"][name.removeprefix("status:")] = int(value)
+                    endpoint_stats["requests"] += int(value)
+                elif name.startswith("latency:bucket:"):
+                    endpoint_stats["latency_histogram"][name.removeprefix("latency:bucket:")] = int(value)
+
+            stats[endpoint] = endpoint_stats
+
+        return stats
+
+    def reset(self) -> None:
+        """Forget all metrics."""
+        self.sink.reset()
+
+
+api_metrics = ApiMetrics()
@@ -0,0 +1,556 @@
+from __future__ import annotations
+
+import json
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import redis
+from flask import Flask, current_app
+
+from .cache import cache
+from .redis_client import RELEASE_LOCK_SCRIPT, redis_client
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Point a dataset to a new generation unless a more recent one is already used,
+# the previous generation is kept a little longer for workers still reading it
+SWITCH_GENERATION_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local generation = tonumber(ARGV[1])
+if generation <= current then
+    return 0
+end
+
+redis.call('SET', KEYS[1], generation, 'EX', ARGV[4])
+if current > 0 then
+    redis.call('EXPIRE', ARGV[2] .. current, ARGV[3])
+    redis.call('EXPIRE', ARGV[2] .. current .. ':entities', ARGV[3])
+end
+
+return 1
+"""
+
+class DatasetEntry(NamedTuple):
+    """Dataset kept in the memory of a worker."""
+
+    generation: int
+    value: Any
+    size: int
+    validated_at: float
+    expires_at: float
+
+
+class DatasetCache:
+    """Datasets built by services (items, characters, sprites...) stored in Redis by generation.
+
+    Each new version of a dataset is stored under a new generation number before the dataset points to it, and an
+    invalidation event is published. Workers keep the datasets they have read in memory: on an event, they load the
+    new generation in background and keep serving the previous one until it is ready. Without Redis, the Flask cache
+    is used as is.
+
+    A missing dataset is built by one process at a time: others serve its expired generation if it is still there,
+    or wait for it a bounded time.
+
+    Datasets of DATASET_CACHE_ENTITY_KEYS are also stored by id in a Redis hash, to get a few entities without
+    reading the whole dataset.
+    """
+
+    KEY_PREFIX = "pixyship:dataset:"
+    CHANNEL = "pixyship:dataset:invalidations"
+    LOCK_STATS_KEY = KEY_PREFIX + "lock_stats"
+    LOCK_STATS = ("builds", "contended", "stale", "waited", "timeouts")
+
+    def __init__(self) -> None:
+        self._config: dict = {}
+        self._app: Flask | None = None
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, DatasetEntry] = OrderedDict()
+        self._size = 0
+        # generations announced by invalidation events, only trusted while subscribed
+        self._generations: dict[str, int] = {}
+        self._subscription = 0
+        self._listener_thread: threading.Thread | None = None
+        self._switch_generation_script = None
+        self._release_lock_script = None
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._lock_stats: dict[str, dict[str, int]] = {}
+
+    def init_app(self, app: Flask) -> None:
+        """Read the cache configuration from the app."""
+        self._config = {
+            "timeout": app.config["CACHE_DEFAULT_TIMEOUT"],
+            "max_bytes": app.config["DATASET_CACHE_MAX_BYTES"],
+            "revalidate_interval": app.config["DATASET_CACHE_REVALIDATE_INTERVAL"],
+            "previous_generation_ttl": app.config["DATASET_CACHE_PREVIOUS_GENERATION_TTL"],
+            "invalidations": app.config["DATASET_CACHE_INVALIDATIONS"],
+            "stale_ttl": app.config["DATASET_CACHE_STALE_TTL"],
+            "lock_ttl": app.config["DATASET_CACHE_LOCK_TTL"],
+            "lock_wait": app.config["DATASET_CACHE_LOCK_WAIT"],
+            "lock_poll_interval": app.config["DATASET_CACHE_LOCK_POLL_INTERVAL"],
+            "entity_keys": frozenset(app.config["DATASET_CACHE_ENTITY_KEYS"]),
+        }
+
+        self._switch_generation_script = None
+        self._release_lock_script = None
+        if redis_client.connection is not None:
+            self._switch_generation_script = redis_client.connection.register_script(SWITCH_GENERATION_SCRIPT)
+            self._release_lock_script = redis_client.connection.register_script(RELEASE_LOCK_SCRIPT)
+
+        self._lock_stats = {}
+
+        self.clear_local()
+
+        app.extensions["dataset_cache"] = self
+
+    @classmethod
+    def get_data_key(cls, key: str, generation: int) -> str:
+        """Get the Redis key of a generation of the serialized dataset."""
+        return f"{cls.KEY_PREFIX}{key}:{generation}"
+
+    @classmethod
+    def get_entities_key(cls, key: str, generation: int) -> str:
+        """Get the Redis key of the hash of a generation of the dataset entities, serialized by id."""
+        return f"{cls.KEY_PREFIX}{key}:{generation}:entities"
+
+    @classmethod
+    def get_generation_key(cls, key: str) -> str:
+        """Get the Redis key of the generation currently used for the dataset."""
+        return f"{cls.KEY_PREFIX}{key}:generation"
+
+    @classmethod
+    def get_counter_key(cls, key: str) -> str:
+        """Get the Redis key giving the generation numbers of the dataset, never removed so they aren't reused."""
+        return f"{cls.KEY_PREFIX}{key}:counter"
+
+    @classmethod
+    def get_lock_key(cls, key: str) -> str:
+        """Get the Redis key of the lock held while building the dataset."""
+        return f"{cls.KEY_PREFIX}{key}:lock"
+
+    def get(self, key: str) -> Any:  # noqa: ANN401
+        """Get a dataset, None if it isn't in cache."""
+        if redis_client.connection is None:
+            return cache.get(key)
+
+        self.start_listener()
+
+        entry = self.get_valid_entry(key)
+        if entry is not None:
+            self.touch_local(key)
+            return entry.value
+
+        subscription = self._subscription
+        pipeline = redis_client.connection.pipeline(transaction=False)
+        pipeline.get(self.get_generation_key(key))
+        pipeline.ttl(self.get_generation_key(key))
+        generation, ttl = pipeline.execute()
+        if generation is None:
+            return None
+
+        generation = int(generation)
+        value = self.get_local(key, generation)
+        if value is None:
+            # kept in memory until the generation it points to expires
+            value = self.load(key, generation, time.monotonic() + (ttl if ttl >= 0 else self._config["timeout"]))
+            if value is None:
+                return None
+
+        # an event for a more recent generation can't have been missed while subscribed
+        if subscription and subscription == self._subscription:
+            self.set_generation(key, generation)
+
+        return value
+
+    def get_valid_entry(self, key: str) -> DatasetEntry | None:
+        """Get a dataset kept in memory if its generation was announced by the last event, or checked recently.
+
+        Expired datasets are never valid, even if no new generation was announced, so they are built again.
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if (
+            entry is not None
+            and now < entry.expires_at
+            and (
+                self._generations.get(key) == entry.generation
+                or now - entry.validated_at < self._config["revalidate_interval"]
+            )
+        ):
+            return entry
+
+        return None
+
+    def get_entities(self, key: str, ids: list[int]) -> dict[int, Any] | None:
+        """Get some entities of a dataset by id, None if the dataset isn't in cache.
+
+        Only the requested entities are read from Redis, unless this worker already has the whole dataset in memory.
+        Unknown ids are missing from the result.
+        """
+        if redis_client.connection is None or key not in self._config["entity_keys"]:
+            dataset = self.get(key)
+            if dataset is None:
+                return None
+
+            return {entity_id: dataset[entity_id] for entity_id in ids if entity_id in dataset}
+
+        self.start_listener()
+
+        entry = self.get_valid_entry(key)
+        if entry is not None:
+            return {entity_id: entry.value[entity_id] for entity_id in ids if entity_id in entry.value}
+
+        generation = redis_client.connection.get(self.get_generation_key(key))
+        if generation is None:
+            return None
+
+        entities_key = self.get_entities_key(key, int(generation))
+        pipeline = redis_client.connection.pipeline(transaction=False)
+        pipeline.exists(entities_key)
+        pipeline.hmget(entities_key, [str(entity_id) for entity_id in ids])
+        exists, values = pipeline.execute()
+        if not exists:
+            return None
+
+        return {
+            entity_id: pickle.loads(value) for entity_id, value in zip(ids, values, strict=True) if value is not None
+        }
+
+    def load(self, key: str, generation: int, expires_at: float | None = None) -> Any:  # noqa: ANN401
+        """Read a generation of a dataset from Redis and keep it in memory, None if it expired."""
+        data = redis_client.connection.get(self.get_data_key(key, generation))
+        if data is None:
+            return None
+
+        value = pickle.loads(data)
+        self.set_local(key, generation, value, len(data), expires_at)
+
+        return value
+
+    def set(self, key: str, value: Any) -> None:  # noqa: ANN401
+        """Store a new generation of a dataset, and announce it to the workers."""
+        if redis_client.connection is None:
+            cache.set(key, value)
+            return
+
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        generation = redis_client.connection.incr(self.get_counter_key(key))
+
+        # the new generation is complete before the dataset points to it, and outlives it to be served once expired
+        pipeline = redis_client.connection.pipeline(transaction=False)
+        pipeline.set(self.get_data_key(key, generation), data, ex=self._config["timeout"] + self._config["stale_ttl"])
+        if key in self._config["entity_keys"] and value:
+            entities_key = self.get_entities_key(key, generation)
+            pipeline.hset(
+                entities_key,
+                mapping={
+                    str(entity_id): pickle.dumps(entity, protocol=pickle.HIGHEST_PROTOCOL)
+                    for entity_id, entity in value.items()
+                },
+            )
+            pipeline.expire(entities_key, self._config["timeout"] + self._config["stale_ttl"])
+
+        pipeline.execute()
+
+        switched = self._switch_generation_script(
+            keys=[self.get_generation_key(key)],
+            args=[
+                generation,
+                f"{self.KEY_PREFIX}{key}:",
+                self._config["previous_generation_ttl"],
+                self._config["timeout"],
+            ],
+        )
+
+        # a more recent generation has been stored meanwhile
+        if not switched:
+            redis_client.connection.delete(self.get_data_key(key, generation), self.get_entities_key(key, generation))
+            return
+
+        self.set_local(key, generation, value, len(data))
+        redis_client.connection.publish(self.CHANNEL, json.dumps({"key": key, "generation": generation}))
+
+    def get_or_build(self, key: str, build: Callable[[], Any]) -> Any:  # noqa: ANN401
+        """Get a dataset, or build and store it if no other process or thread is already building it."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        token = self.acquire_build_lock(key)
+        if token is not None:
+            try:
+                # built by another builder meanwhile
+                value = self.get(key)
+                if value is None:
+                    self.increment_lock_stat(key, "builds")
+                    value = build()
+                    self.set(key, value)
+            finally:
+                self.release_build_lock(key, token)
+
+            return value
+
+        self.increment_lock_stat(key, "contended")
+
+        value = self.get_stale(key)
+        if value is not None:
+            self.increment_lock_stat(key, "stale")
+            return value
+
+        value = self.wait(key)
+        if value is not None:
+            self.increment_lock_stat(key, "waited")
+            return value
+
+        # the builder failed or is too slow, don't fail the request
+        self.increment_lock_stat(key, "timeouts")
+        current_app.logger.warning("Dataset %s still missing after waiting for its builder, building it", key)
+        value = build()
+        self.set(key, value)
+
+        return value
+
+    def acquire_build_lock(self, key: str) -> str | None:
+        """Get the lock to build a dataset, shared with the other processes, None if it is already held."""
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        if not build_lock.acquire(blocking=False):
+            return None
+
+        token = uuid.uuid4().hex
+        if redis_client.connection is None:
+            return token
+
+        # expires if the builder process dies
+        if redis_client.connection.set(self.get_lock_key(key), token, nx=True, ex=self._config["lock_ttl"]):
+            return token
+
+        build_lock.release()
+        return None
+
+    def release_build_lock(self, key: str, token: str) -> None:
+        """Release the lock to build a dataset."""
+        try:
+            if redis_client.connection is not None:
+                self._release_lock_script(keys=[self.get_lock_key(key)], args=[token])
+        finally:
+            self._build_locks[key].release()
+
+    def is_building(self, key: str) -> bool:
+        """Check if a dataset is being built by this process or another one."""
+        if self._build_locks[key].locked():
+            return True
+
+        return redis_client.connection is not None and bool(redis_client.connection.exists(self.get_lock_key(key)))
+
+    def get_stale(self, key: str) -> Any:  # noqa: ANN401
+        """Get the last generation of a dataset, even if it expired, None if it isn't anymore in cache."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry.value
+
+        if redis_client.connection is None:
+            return None
+
+        generation = redis_client.connection.get(self.get_counter_key(key))
+        if generation is None:
+            return None
+
+        data = redis_client.connection.get(self.get_data_key(key, int(generation)))
+        if data is None:
+            return None
+
+        return pickle.loads(data)
+
+    def wait(self, key: str) -> Any:  # noqa: ANN401
+        """Wait for a dataset being built, None if it isn't built in time or if its builder failed."""
+        deadline = time.monotonic() + self._config["lock_wait"]
+        while time.monotonic() < deadline:
+            time.sleep(self._config["lock_poll_interval"])
+
+            value = self.get(key)
+            if value is not None or not self.is_building(key):
+                return value
+
+        return None
+
+    def increment_lock_stat(self, key: str, name: str) -> None:
+        """Count a build or a contention on the lock of a dataset."""
+        if redis_client.connection is not None:
+            redis_client.connection.hincrby(self.LOCK_STATS_KEY, f"{key}:{name}")
+            return
+
+        with self._lock:
+            stats = self._lock_stats.setdefault(key, dict.fromkeys(self.LOCK_STATS, 0))
+            stats[name] += 1
+
+    def lock_stats(self) -> dict[str, dict[str, int]]:
+        """Get the builds and contentions on the lock of each dataset."""
+        if redis_client.connection is None:
+            with self._lock:
+                return {key: stats.copy() for key, stats in sorted(self._lock_stats.items())}
+
+        lock_stats: dict[str, dict[str, int]] = {}
+        for field, value in redis_client.connection.hgetall(self.LOCK_STATS_KEY).items():
+            key, name = field.decode().rsplit(":", 1)
+            lock_stats.setdefault(key, dict.fromkeys(self.LOCK_STATS, 0))[name] = int(value)
+
+        return dict(sorted(lock_stats.items()))
+
+    def reset_lock_stats(self) -> None:
+        """Forget the builds and contentions on the locks."""
+        with self._lock:
+            self._lock_stats = {}
+
+        if redis_client.connection is not None:
+            redis_client.connection.delete(self.LOCK_STATS_KEY)
+
+    def set_generation(self, key: str, generation: int) -> None:
+        """Remember the generation currently used for a dataset."""
+        with self._lock:
+            self._generations[key] = max(self._generations.get(key, 0), generation)
+
+    def get_local(self, key: str, generation: int) -> Any:  # noqa: ANN401
+        """Get a dataset kept in memory, None if it isn't or if its generation changed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.generation != generation:
+                return None
+
+            self._entries[key] = entry._replace(validated_at=time.monotonic())
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def touch_local(self, key: str) -> None:
+        """Mark a dataset kept in memory as recently used."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def set_local(
+        self,
+        key: str,
+        generation: int,
+        value: Any,  # noqa: ANN401
+        size: int,
+        expires_at: float | None = None,
+    ) -> None:
+        """Keep a dataset in memory until it expires, least recently used datasets are dropped above the memory bound.
+
+        A new generation expires after the cache timeout by default.
+        """
+        with self._lock:
+            previous_entry = self._entries.get(key)
+            if previous_entry is not None and previous_entry.generation > generation:
+                return
+
+            if previous_entry is not None:
+                del self._entries[key]
+                self._size -= previous_entry.size
+
+            # too big to be kept, it would evict all other datasets
+            if size > self._config["max_bytes"]:
+                return
+
+            now = time.monotonic()
+            if expires_at is None:
+                expires_at = now + self._config["timeout"]
+
+            self._entries[key] = DatasetEntry(generation, value, size, now, expires_at)
+            self._size += size
+
+            while self._size > self._config["max_bytes"]:
+                _, evicted_entry = self._entries.popitem(last=False)
+                self._size -= evicted_entry.size
+
+    def clear_local(self) -> None:
+        """Forget datasets kept in memory by this worker."""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._generations = {}
+            self._size = 0
+
+    def clear(self) -> None:
+        """Remove all datasets from Redis and from the memory of the workers."""
+        self.clear_local()
+
+        if redis_client.connection is None:
+            return
+
+        # counters are kept so generation numbers aren't reused, locks are released by their builders
+        keys = [
+            key
+            for key in redis_client.connection.scan_iter(f"{self.KEY_PREFIX}*")
+            if not key.endswith((b":counter", b":lock")) and key != self.LOCK_STATS_KEY.encode()
+        ]
+        if keys:
+            redis_client.connection.delete(*keys)
+
+        redis_client.connection.publish(self.CHANNEL, json.dumps({"key": None}))
+
+    def handle_invalidation(self, event: dict) -> None:
+        """Load the new generation of a dataset kept in memory, the previous one is served until it is ready."""
+        key = event["key"]
+        if key is None:
+            self.clear_local()
+            return
+
+        generation = event["generation"]
+        entry = self._entries.get(key)
+        if entry is not None and entry.generation < generation:
+            self.load(key, generation)
+
+        self.set_generation(key, generation)
+
+    def start_listener(self) -> None:
+        """Start the invalidation listener thread of the current process."""
+        if not self._config["invalidations"]:
+            return
+
+        if self._listener_thread is not None and self._listener_thread.is_alive():
+            return
+
+        with self._lock:
+            if self._listener_thread is not None and self._listener_thread.is_alive():
+                return
+
+            self._app = current_app._get_current_object()  # type: ignore[attr-defined]  # noqa: SLF001
+            self._listener_thread = threading.Thread(target=self.listen, name="dataset-cache", daemon=True)
+            self._listener_thread.start()
+
+    def listen(self) -> None:
+        """Handle invalidation events until the process exits, subscribe again after a connection error."""
+        subscription = 0
+        while True:
+            pubsub = redis_client.connection.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.CHANNEL)
+
+                # events sent before subscribing are lost, generations are checked in Redis again
+                subscription += 1
+                with self._lock:
+                    self._generations = {}
+                    self._subscription = subscription
+
+                for message in pubsub.listen():
+                    with self._app.app_context():
+                        self.handle_invalidation(json.loads(message["data"]))
+            except redis.RedisError:
+                with self._app.app_context():
+                    current_app.logger.exception("Error when listening to datasets invalidations")
+            finally:
+                with self._lock:
+                    self._generations = {}
+                    self._subscription = 0
+
+                pubsub.close()
+
+            time.sleep(self._config["revalidate_interval"])
+
+
+dataset_cache = DatasetCache()
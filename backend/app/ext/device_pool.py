@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import datetime
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from flask import Flask, current_app
+
+from .db import db
+from .redis_client import RELEASE_LOCK_SCRIPT, redis_client
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from app.models import Device
+    from app.pixelstarshipsapi import PixelStarshipsApi
+
+
+class PooledDevice:
+    """In-memory copy of a device and its token."""
+
+    def __init__(self, device: Device) -> None:
+        self.key: str = device.key
+        self.checksum: str = device.checksum
+        self.client_datetime: datetime.datetime = device.client_datetime
+        self.token: str | None = device.token
+        self.expires_at: datetime.datetime = (
+            device.expires_at.replace(tzinfo=datetime.UTC)
+            if device.expires_at
+            else datetime.datetime.fromtimestamp(0, tz=datetime.UTC)
+        )
+        self.lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        """Return a string representation of the pooled device."""
+        return f"<PooledDevice {self.key} {self.expires_at}>"
+
+    def expires_within(self, margin: datetime.timedelta) -> bool:
+        """Check if the token is missing or expires within the given margin."""
+        return not self.token or self.expires_at - margin <= datetime.datetime.now(tz=datetime.UTC)
+
+
+class DevicePool:
+    """Devices leased to concurrent PSS API calls, with tokens kept in memory and Redis and renewed in background.
+
+    The database is only used to load the devices and to save renewed tokens.
+    """
+
+    KEY_PREFIX = "pixyship:device_token:"
+
+    def __init__(self) -> None:
+        self._config: dict = {}
+        self._app: Flask | None = None
+        self._base_url: str | None = None
+        self._release_lock_script = None
+        self._devices: deque[PooledDevice] | None = None
+        self._condition = threading.Condition()
+        self._renewal_thread: threading.Thread | None = None
+
+    def init_app(self, app: Flask) -> None:
+        """Read the pool configuration from the app."""
+        self._config = {
+            "token_lifetime": datetime.timedelta(seconds=app.config["DEVICE_TOKEN_LIFETIME"]),
+            "renew_margin": datetime.timedelta(seconds=app.config["DEVICE_TOKEN_RENEW_MARGIN"]),
+            "renew_interval": app.config["DEVICE_POOL_RENEW_INTERVAL"],
+            "lease_timeout": app.config["DEVICE_POOL_LEASE_TIMEOUT"],
+            "renew_lock_ttl": app.config["DEVICE_POOL_RENEW_LOCK_TTL"],
+            "renew_lock_poll_interval": app.config["DEVICE_POOL_RENEW_LOCK_POLL_INTERVAL"],
+        }
+
+        self._release_lock_script = None
+        if redis_client.connection is not None:
+            self._release_lock_script = redis_client.connection.register_script(RELEASE_LOCK_SCRIPT)
+
+        with self._condition:
+            self._devices = None
+
+        app.extensions["device_pool"] = self
+
+    @contextmanager
+    def lease(self, pixel_starships_api: PixelStarshipsApi) -> Iterator[PooledDevice]:
+        """Lease a device with a valid token, waiting for a free device if all of them are in use."""
+        self.load(pixel_starships_api)
+
+        # only the URL is kept to log in, it follows the server used by the latest API
+        self._base_url = pixel_starships_api.base_url
+
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._devices, timeout=self._config["lease_timeout"]):
+                msg = "No device available"
+                raise TimeoutError(msg)
+
+            device = self._devices.popleft()
+
+        try:
+            if device.expires_within(datetime.timedelta(0)):
+                self.renew(device)
+
+            yield device
+        finally:
+            with self._condition:
+                # least recently used devices are leased first
+                self._devices.append(device)
+                self._condition.notify()
+
+    def load(self, pixel_starships_api: PixelStarshipsApi) -> None:
+        """Load the devices and their tokens once, then start the background renewal."""
+        if self._devices is not None:
+            return
+
+        with self._condition:
+            if self._devices is not None:
+                return
+
+            self._app = current_app._get_current_object()  # type: ignore[attr-defined]  # noqa: SLF001
+
+            devices = [PooledDevice(device) for device in pixel_starships_api.get_devices()]
+            for device in devices:
+                self.load_shared_token(device)
+
+            self._devices = deque(devices)
+
+        self.start_renewal()
+
+    def renew(self, device: PooledDevice) -> str | None:
+        """Get a new token for the device, shared with the other processes and saved in database."""
+        from app.pixelstarshipsapi import PixelStarshipsApi
+
+        # each login invalidates the previous token of the device, only one process logs it in at a time
+        with device.lock, self.renewal_lock(device):
+            # another process may have renewed it already
+            previous_token = device.token
+            self.load_shared_token(device)
+            if device.token != previous_token and not device.expires_within(self._config["renew_margin"]):
+                return device.token
+
+            token = PixelStarshipsApi.login_device(self._base_url, device.key, device.client_datetime, device.checksum)
+            device.token = token
+            device.expires_at = datetime.datetime.now(tz=datetime.UTC)
+            if token:
+                device.expires_at += self._config["token_lifetime"]
+
+            self.save_shared_token(device)
+            self.save_token(device)
+
+            return device.token
+
+    @contextmanager
+    def renewal_lock(self, device: PooledDevice) -> Iterator[None]:
+        """Hold the lock to renew the device, shared with the other processes, waiting for it if it is held."""
+        if redis_client.connection is None:
+            yield
+            return
+
+        lock_key = f"{self.KEY_PREFIX}{device.key}:lock"
+        token = uuid.uuid4().hex
+
+        # expires if the process holding it dies
+        while not redis_client.connection.set(lock_key, token, nx=True, ex=self._config["renew_lock_ttl"]):
+            time.sleep(self._config["renew_lock_poll_interval"])
+
+        try:
+            yield
+        finally:
+            self._release_lock_script(keys=[lock_key], args=[token])
+
+    def renew_expiring(self) -> None:
+        """Renew tokens expiring soon, devices in use are renewed once released."""
+        with self._condition:
+            devices = [device for device in self._devices if device.expires_within(self._config["renew_margin"])]
+
+        for device in devices:
+            try:
+                self.renew(device)
+            except Exception:
+                current_app.logger.exception("Error when renewing token of device %s", device.key)
+
+    def start_renewal(self) -> None:
+        """Start the background renewal thread of the current process."""
+        if self._renewal_thread is not None and self._renewal_thread.is_alive():
+            return
+
+        self._renewal_thread = threading.Thread(target=self.run_renewal, name="device-pool", daemon=True)
+        self._renewal_thread.start()
+
+    def run_renewal(self) -> None:
+        """Renew tokens before they expire, until the process exits."""
+        while True:
+            time.sleep(self._config["renew_interval"])
+            with self._app.app_context():
+                self.renew_expiring()
+
+    def load_shared_token(self, device: PooledDevice) -> None:
+        """Use the token shared by other processes if it is more recent."""
+        if redis_client.connection is None:
+            return
+
+        shared_token = redis_client.connection.get(self.KEY_PREFIX + device.key)
+        if shared_token is None:
+            return
+
+        shared_token = json.loads(shared_token)
+        expires_at = datetime.datetime.fromisoformat(shared_token["expires_at"])
+        if expires_at > device.expires_at:
+            device.token = shared_token["token"]
+            device.expires_at = expires_at
+
+    def save_shared_token(self, device: PooledDevice) -> None:
+        """Share the token with other processes until it expires."""
+        if redis_client.connection is None or not device.token:
+            return
+
+        ttl = int((device.expires_at - datetime.datetime.now(tz=datetime.UTC)).total_seconds())
+        if ttl <= 0:
+            return
+
+        shared_token = json.dumps({"token": device.token, "expires_at": device.expires_at.isoformat()})
+        redis_client.connection.set(self.KEY_PREFIX + device.key, shared_token, ex=ttl)
+
+    @staticmethod
+    def save_token(device: PooledDevice) -> None:
+        """Save the token in database, to be reused after a restart, the previous one is kept if the login failed."""
+        if not device.token:
+            return
+
+        from app.models import Device
+
+        db.session.query(Device).filter_by(key=device.key).update(
+            {"token": device.token, "expires_at": device.expires_at},
+        )
+        db.session.commit()
+
+
+device_pool = DevicePool()
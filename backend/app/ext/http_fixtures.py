@@ -0,0 +1,195 @@
+import hashlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+# request parameters changing on each call, not part of the fixture key
+VOLATILE_PARAMS = frozenset({"accessToken", "advertisingKey", "checksum", "clientDateTime", "deviceKey"})
+
+MISSING_FIXTURE_BODY = '<Error errorMessage="No recorded fixture for this request." />'
+THROTTLED_BODY = '<Error errorMessage="Too many requests." />'
+
+
+class FixtureStore:
+    """PSS API responses recorded as JSON files, one per request."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+
+    @staticmethod
+    def get_key(method: str, url: str) -> tuple[str, str]:
+        """Get the fixture folder and name of a request, ignoring volatile parameters."""
+        parts = urlsplit(url)
+        params = sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name not in VOLATILE_PARAMS
+        )
+
+        folder = parts.path.strip("/").replace("/", "_") or "root"
+        name = hashlib.sha1(f"{method.upper()} {parts.path} {params}".encode()).hexdigest()[:16]
+
+        return folder, name
+
+    def get_path(self, method: str, url: str) -> Path:
+        """Get the fixture file of a request."""
+        folder, name = self.get_key(method, url)
+        return self.directory / folder / f"{name}.json"
+
+    def load(self, method: str, url: str) -> dict | None:
+        """Get the recorded response of a request, if any."""
+        path = self.get_path(method, url)
+        if not path.exists():
+            return None
+
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save(self, method: str, url: str, status: int, content_type: str, body: str) -> None:
+        """Record the response of a request."""
+        path = self.get_path(method, url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fixture = {
+            "method": method.upper(),
+            "path": urlsplit(url).path,
+            "status": status,
+            "content_type": content_type,
+            "body": body,
+        }
+
+        path.write_text(json.dumps(fixture, ensure_ascii=False), encoding="utf-8")
+
+
+class ReplayThrottle:
+    """Token bucket rejecting requests above the given rate, to mimic PSS throttling."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Check if a request can be served now."""
+        if not self.rate:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            if self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+            return True
+
+
+class Replayer:
+    """Serve recorded responses with a configurable latency and throttling."""
+
+    def __init__(
+        self,
+        store: FixtureStore,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        throttle_status: int = 429,
+    ) -> None:
+        self.store = store
+        self.latency = latency
+        self.throttle = ReplayThrottle(throttle_rate)
+        self.throttle_status = throttle_status
+
+    def replay(self, method: str, url: str) -> tuple[int, str, bytes]:
+        """Get the status, content type and body to send back."""
+        if self.latency:
+            time.sleep(self.latency)
+
+        if not self.throttle.allow():
+            return self.throttle_status, "text/xml", THROTTLED_BODY.encode()
+
+        fixture = self.store.load(method, url)
+        if fixture is None:
+            return 404, "text/xml", MISSING_FIXTURE_BODY.encode()
+
+        return fixture["status"], fixture["content_type"], fixture["body"].encode()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter answering from recorded fixtures, without any network access."""
+
+    def __init__(self, replayer: Replayer, **kwargs: dict) -> None:
+        self.replayer = replayer
+        super().__init__(**kwargs)
+
+    def send(self, request: PreparedRequest, **_kwargs: dict) -> Response:
+        """Replay the recorded response of the request."""
+        status, content_type, body = self.replayer.replay(request.method, request.url)
+        return self.build_fixture_response(request, status, content_type, body)
+
+    def build_fixture_response(self, request: PreparedRequest, status: int, content_type: str, body: bytes) -> Response:
+        """Build a streamable response from a fixture."""
+        raw = HTTPResponse(
+            body=io.BytesIO(body),
+            headers={"Content-Type": content_type, "Content-Length": str(len(body))},
+            status=status,
+            preload_content=False,
+        )
+
+        return self.build_response(request, raw)
+
+
+class RecordingAdapter(ReplayAdapter):
+    """Transport adapter calling PSS API and recording each response as a fixture."""
+
+    def __init__(self, store: FixtureStore, **kwargs: dict) -> None:
+        self.store = store
+        super().__init__(Replayer(store), **kwargs)
+
+    def send(self, request: PreparedRequest, **kwargs: dict) -> Response:
+        """Send the request, record the response and return it."""
+        kwargs["stream"] = False
+        response = HTTPAdapter.send(self, request, **kwargs)
+
+        content_type = response.headers.get("Content-Type", "text/xml")
+        self.store.save(request.method, request.url, response.status_code, content_type, response.content.decode())
+
+        # the body has been read to be recorded, give a fresh streamable copy to the caller
+        return self.build_fixture_response(request, response.status_code, content_type, response.content)
+
+
+def create_fixture_server(replayer: Replayer, host: str, port: int) -> ThreadingHTTPServer:
+    """Create a local stand-in PSS API server replaying fixtures."""
+
+    class FixtureRequestHandler(BaseHTTPRequestHandler):
+        """Answer GET and POST requests from fixtures."""
+
+        def do_GET(self) -> None:
+            """Replay a GET request."""
+            self.replay("GET")
+
+        def do_POST(self) -> None:
+            """Replay a POST request."""
+            self.replay("POST")
+
+        def replay(self, method: str) -> None:
+            """Send back the recorded response."""
+            status, content_type, body = replayer.replay(method, self.path)
+
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return ThreadingHTTPServer((host, port), FixtureRequestHandler)
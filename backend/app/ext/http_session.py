@@ -0,0 +1,150 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import requests
+from flask import Flask
+from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .http_fixtures import FixtureStore, RecordingAdapter, ReplayAdapter, Replayer
+
+
+class HttpSession:
+    """Process-wide pooled HTTP transport, with keep-alive, timeouts and retries."""
+
+    def __init__(self) -> None:
+        self._config: dict = {}
+        self._session: requests.Session | None = None
+        self._adapter: HTTPAdapter | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask) -> None:
+        """Read the transport configuration from the app."""
+        self._config = {
+            "pool_connections": app.config["PSS_HTTP_POOL_CONNECTIONS"],
+            "pool_maxsize": app.config["PSS_HTTP_POOL_MAXSIZE"],
+            "pool_block": app.config["PSS_HTTP_POOL_BLOCK"],
+            "connect_timeout": app.config["PSS_HTTP_CONNECT_TIMEOUT"],
+            "read_timeout": app.config["PSS_HTTP_READ_TIMEOUT"],
+            "retry_total": app.config["PSS_HTTP_RETRY_TOTAL"],
+            "retry_backoff_factor": app.config["PSS_HTTP_RETRY_BACKOFF_FACTOR"],
+            "retry_status_forcelist": tuple(app.config["PSS_HTTP_RETRY_STATUS_FORCELIST"]),
+            "mode": app.config["PSS_HTTP_MODE"],
+            "fixtures_dir": app.config["PSS_FIXTURES_DIR"] or str(Path(app.instance_path) / "pss_fixtures"),
+            "replay_latency": app.config["PSS_REPLAY_LATENCY"],
+            "replay_throttle_rate": app.config["PSS_REPLAY_THROTTLE_RATE"],
+            "replay_throttle_status": app.config["PSS_REPLAY_THROTTLE_STATUS"],
+        }
+
+        # force a new session with the new configuration
+        self.close()
+
+        app.extensions["http_session"] = self
+
+    @property
+    def session(self) -> requests.Session:
+        """Get the session of the current process, created on first use."""
+        # sessions must not be shared between forked processes (gunicorn workers for example)
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self.create_session()
+                    self._pid = os.getpid()
+
+        return self._session
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        """Get the (connect, read) timeout."""
+        return self._config.get("connect_timeout", 5), self._config.get("read_timeout", 60)
+
+    def create_session(self) -> requests.Session:
+        """Create a new session with a pooled adapter mounted for HTTP and HTTPS."""
+        retry = Retry(
+            total=self._config.get("retry_total", 3),
+            backoff_factor=self._config.get("retry_backoff_factor", 1.0),
+            status_forcelist=self._config.get("retry_status_forcelist", ()),
+            # POST is never retried, a DeviceLogin sent twice would invalidate the token of the first one
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+
+        adapter_kwargs = {
+            "pool_connections": self._config.get("pool_connections", 4),
+            "pool_maxsize": self._config.get("pool_maxsize", 10),
+            "pool_block": self._config.get("pool_block", True),
+            "max_retries": retry,
+        }
+
+        # record real responses as fixtures, or replay them without network access
+        mode = self._config.get("mode")
+        if mode == "record":
+            self._adapter = RecordingAdapter(FixtureStore(self._config["fixtures_dir"]), **adapter_kwargs)
+        elif mode == "replay":
+            replayer = Replayer(
+                FixtureStore(self._config["fixtures_dir"]),
+                latency=self._config["replay_latency"],
+                throttle_rate=self._config["replay_throttle_rate"],
+                throttle_status=self._config["replay_throttle_status"],
+            )
+            self._adapter = ReplayAdapter(replayer, **adapter_kwargs)
+        else:
+            self._adapter = HTTPAdapter(**adapter_kwargs)
+
+        session = requests.Session()
+        session.mount("https://", self._adapter)
+        session.mount("http://", self._adapter)
+
+        return session
+
+    def close(self) -> None:
+        """Close the current session and all its pooled connections."""
+        with self._lock:
+            if self._session is not None and self._pid == os.getpid():
+                self._session.close()
+
+            self._session = None
+            self._adapter = None
+            self._pid = None
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Response:  # noqa: ANN401
+        """Send a request through the pooled session."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> Response:  # noqa: ANN401
+        """Send a GET request through the pooled session."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> Response:  # noqa: ANN401
+        """Send a POST request through the pooled session."""
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Get requests and connections counters for each host pool of the current process."""
+        stats: dict[str, dict[str, int]] = {}
+        if self._adapter is None or self._pid != os.getpid():
+            return stats
+
+        pools = self._adapter.poolmanager.pools
+        for key in pools:
+            pool = pools.get(key)
+            if pool is None:
+                continue
+
+            host = f"{pool.scheme}://{pool.host}:{pool.port}"
+            stats[host] = {
+                "requests": pool.num_requests,
+                "connections": pool.num_connections,
+                "reused": max(pool.num_requests - pool.num_connections, 0),
+            }
+
+        return stats
+
+
+http_session = HttpSession()
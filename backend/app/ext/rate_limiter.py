@@ -0,0 +1,175 @@
+import datetime
+import threading
+import time
+
+from flask import Flask
+from requests import Response
+
+from .redis_client import redis_client
+
+# Reserve the next request slot (GCRA), return the time to wait before sending it
+ACQUIRE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local rate = tonumber(redis.call('GET', KEYS[1])) or tonumber(ARGV[1])
+local next_at = tonumber(redis.call('GET', KEYS[2])) or now
+if next_at < now then
+    next_at = now
+end
+redis.call('SET', KEYS[2], tostring(next_at + 1 / rate), 'EX', ARGV[2])
+return tostring(next_at - now)
+"""
+
+# Additive increase on healthy responses, multiplicative decrease and pause on throttled ones
+FEEDBACK_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local rate = tonumber(redis.call('GET', KEYS[1])) or tonumber(ARGV[1])
+if ARGV[6] == '1' then
+    rate = math.max(tonumber(ARGV[2]), rate * tonumber(ARGV[5]))
+    local resume_at = now + tonumber(ARGV[7])
+    local next_at = tonumber(redis.call('GET', KEYS[2])) or now
+    if next_at < resume_at then
+        redis.call('SET', KEYS[2], tostring(resume_at), 'EX', ARGV[8])
+    end
+    redis.call('INCR', KEYS[3])
+    redis.call('SET', KEYS[4], tostring(now))
+else
+    rate = math.min(tonumber(ARGV[3]), rate + tonumber(ARGV[4]))
+end
+redis.call('SET', KEYS[1], tostring(rate), 'EX', ARGV[8])
+return tostring(rate)
+"""
+
+
+class RateLimiter:
+    """AIMD rate limiter for PSS API calls, shared by all processes through Redis (or local to the process)."""
+
+    KEY_PREFIX = "pixyship:rate_limiter:"
+
+    def __init__(self) -> None:
+        self._config: dict = {}
+        self._lock = threading.Lock()
+        self._local_state: dict = {}
+        self._acquire_script = None
+        self._feedback_script = None
+
+    def init_app(self, app: Flask) -> None:
+        """Read the rate limiter configuration from the app."""
+        self._config = {
+            "enabled": app.config["PSS_RATE_LIMIT_ENABLED"],
+            "initial_rate": float(app.config["PSS_RATE_LIMIT_INITIAL_RATE"]),
+            "min_rate": float(app.config["PSS_RATE_LIMIT_MIN_RATE"]),
+            "max_rate": float(app.config["PSS_RATE_LIMIT_MAX_RATE"]),
+            "increase": float(app.config["PSS_RATE_LIMIT_INCREASE"]),
+            "decrease_factor": float(app.config["PSS_RATE_LIMIT_DECREASE_FACTOR"]),
+            "throttle_pause": float(app.config["PSS_RATE_LIMIT_THROTTLE_PAUSE"]),
+            "throttle_statuses": frozenset(app.config["PSS_RATE_LIMIT_THROTTLE_STATUSES"]),
+            "state_timeout": int(app.config["PSS_RATE_LIMIT_STATE_TIMEOUT"]),
+        }
+
+        self._local_state = {}
+        self._acquire_script = None
+        self._feedback_script = None
+        if redis_client.connection is not None:
+            self._acquire_script = redis_client.connection.register_script(ACQUIRE_SCRIPT)
+            self._feedback_script = redis_client.connection.register_script(FEEDBACK_SCRIPT)
+
+        app.extensions["rate_limiter"] = self
+
+    @property
+    def keys(self) -> list[str]:
+        """Get the Redis keys holding the shared state."""
+        return [self.KEY_PREFIX + key for key in ("rate", "next_at", "throttles", "last_throttle_at")]
+
+    def acquire(self) -> None:
+        """Wait until the next request is allowed."""
+        if not self._config.get("enabled"):
+            return
+
+        if self._acquire_script is not None:
+            wait = float(
+                self._acquire_script(
+                    keys=self.keys[:2],
+                    args=[self._config["initial_rate"], self._config["state_timeout"]],
+                ),
+            )
+        else:
+            with self._lock:
+                now = time.time()
+                rate = self._local_state.get("rate", self._config["initial_rate"])
+                next_at = max(self._local_state.get("next_at", now), now)
+                self._local_state["next_at"] = next_at + 1 / rate
+                wait = next_at - now
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def feedback(self, response: Response) -> None:
+        """Adapt the rate to the response: slow down when throttled, speed up when healthy."""
+        if not self._config.get("enabled"):
+            return
+
+        throttled = response.status_code in self._config["throttle_statuses"]
+
+        if self._feedback_script is not None:
+            self._feedback_script(
+                keys=self.keys,
+                args=[
+                    self._config["initial_rate"],
+                    self._config["min_rate"],
+                    self._config["max_rate"],
+                    self._config["increase"],
+                    self._config["decrease_factor"],
+                    int(throttled),
+                    self._config["throttle_pause"],
+                    self._config["state_timeout"],
+                ],
+            )
+            return
+
+        with self._lock:
+            now = time.time()
+            rate = self._local_state.get("rate", self._config["initial_rate"])
+            if throttled:
+                rate = max(self._config["min_rate"], rate * self._config["decrease_factor"])
+                resume_at = now + self._config["throttle_pause"]
+                self._local_state["next_at"] = max(self._local_state.get("next_at", now), resume_at)
+                self._local_state["throttles"] = self._local_state.get("throttles", 0) + 1
+                self._local_state["last_throttle_at"] = now
+            else:
+                rate = min(self._config["max_rate"], rate + self._config["increase"])
+
+            self._local_state["rate"] = rate
+
+    def stats(self) -> dict:
+        """Get the current rate and the throttle events."""
+        if redis_client.connection is not None:
+            rate, _next_at, throttles, last_throttle_at = redis_client.connection.mget(self.keys)
+        else:
+            with self._lock:
+                rate = self._local_state.get("rate")
+                throttles = self._local_state.get("throttles")
+                last_throttle_at = self._local_state.get("last_throttle_at")
+
+        return {
+            "shared": redis_client.connection is not None,
+            "rate": float(rate) if rate is not None else self._config.get("initial_rate"),
+            "throttles": int(throttles or 0),
+            "last_throttle_at": (
+                datetime.datetime.fromtimestamp(float(last_throttle_at), tz=datetime.UTC)
+                if last_throttle_at is not None
+                else None
+            ),
+        }
+
+    def reset(self) -> None:
+        """Forget the current rate and throttle events."""
+        if redis_client.connection is not None:
+            redis_client.connection.delete(*self.keys)
+
+        with self._lock:
+            self._local_state = {}
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,29 @@
+import redis
+from flask import Flask
+
+# Release a lock only if it is still held by the same owner
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+
+return 0
+"""
+
+
+class RedisClient:
+    """Redis connection shared by the app, only available when the cache is backed by Redis."""
+
+    def __init__(self) -> None:
+        self.connection: redis.Redis | None = None
+
+    def init_app(self, app: Flask) -> None:
+        """Connect to the cache Redis database, if any."""
+        self.connection = None
+        if app.config["CACHE_TYPE"] == "RedisCache":
+            self.connection = redis.Redis.from_url(app.config["CACHE_REDIS_URL"])
+
+        app.extensions["redis_client"] = self
+
+
+redis_client = RedisClient()
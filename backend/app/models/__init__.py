@@ -1,9 +1,10 @@
 from .alliance import Alliance
 from .daily_sale import DailySale
+from .design_version import DesignVersion
 from .device import Device
 from .listing import Listing
 from .market_message import MarketMessage
 from .player import Player
 from .record import Record
 
-__all__ = ["Alliance", "DailySale", "Device", "Listing", "MarketMessage", "Player", "Record"]
+__all__ = ["Alliance", "DailySale", "DesignVersion", "Device", "Listing", "MarketMessage", "Player", "Record"]
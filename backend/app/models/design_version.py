@@ -0,0 +1,19 @@
+import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.enums import TypeEnum
+from app.ext.db import db
+
+
+class DesignVersion(db.Model):  # type: ignore[name-defined]
+    """Last imported version of a design list."""
+
+    type: Mapped[TypeEnum] = mapped_column(primary_key=True)
+    version: Mapped[str]
+    imported_at: Mapped[datetime.datetime] = mapped_column(server_default=func.now())
+
+    def __repr__(self) -> str:
+        """Return a string representation of the design version."""
+        return f"<DesignVersion {self.type} {self.version}>"
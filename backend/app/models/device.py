@@ -17,22 +17,3 @@ class Device(db.Model):  # type: ignore[name-defined]
     def __repr__(self) -> str:
         """Return a string representation of the device."""
         return f"<Device {self.key} {self.token} {self.expires_at}>"
-
-    def get_token(self) -> str | None:
-        """Get the device token."""
-        if not self.token or self.expires_at.replace(tzinfo=datetime.UTC) < datetime.datetime.now(tz=datetime.UTC):
-            self.renew_token()
-
-        return self.token
-
-    def renew_token(self) -> None:
-        """Renew the device token."""
-        from app.pixelstarshipsapi import PixelStarshipsApi
-
-        pixel_starships_api = PixelStarshipsApi()
-        token = pixel_starships_api.get_device_token(self.key, self.client_datetime, self.checksum)
-        if self.token is not None:
-            self.token = token
-            self.expires_at = datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(hours=12)
-
-        db.session.commit()
@@ -2,6 +2,7 @@ import datetime
 import uuid
 
 from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.enums import TypeEnum
@@ -18,7 +19,9 @@ class Record(db.Model):  # type: ignore[name-defined]
     type_id: Mapped[int]
     current: Mapped[bool]
     md5_hash: Mapped[uuid.UUID]
-    data: Mapped[str]
+    data: Mapped[str | None] = mapped_column(nullable=True)
+    delta: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    attributes: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     created_at: Mapped[datetime.datetime] = mapped_column(server_default=func.now())
     url: Mapped[str]
 
@@ -2,20 +2,24 @@ import datetime
 import hashlib
 import random
 import re
+import time
+from collections.abc import Iterator
+from functools import cached_property
 from urllib.parse import urljoin, urlparse
 from xml.etree import ElementTree as ET
 from xml.etree.ElementTree import Element
 
-import requests
-from flask import current_app
+from flask import current_app, has_request_context
 from requests import Response
 
 from app.api_errors import TOKEN_EXPIRED_REGEX
-from app.constants import API_URLS, IAP_OPTIONS_MASK_LOOKUP, PSS_START_DATE
-from app.ext import cache
+from app.constants import API_URLS, IAP_OPTIONS_MASK_LOOKUP, PSS_START_DATE, RECORD_HASH_IGNORED_ATTRIBUTES
+from app.enums import TypeEnum
+from app.ext import api_metrics, cache, device_pool, http_session, rate_limiter
 from app.ext.db import db
 from app.models import Device
-from app.utils.pss import api_sleep
+from app.pixelstarshipsapi_snapshot import DesignSnapshot
+from app.utils.xml_helpers import create_lean_record, iter_children
 
 
 class PixelStarshipsApi:
@@ -30,12 +34,11 @@ class PixelStarshipsApi:
             self._main_pixelstarships_api_url = API_URLS.get("MAIN")
             self._forced_pixelstarships_api_url = current_app.config.get("FORCED_PIXELSTARSHIPS_API_URL")
 
-        self._device_next_index: int = 0
-        self._devices: list[Device] | None = None
         self._api_settings: dict = self.get_api_settings()
 
         if not self._forced_pixelstarships_api_url:
             self.server: str = self._api_settings["ProductionServer"]
+            self.base_url: str = f"https://{self.server}"
         else:
             o = urlparse(self._forced_pixelstarships_api_url)
             if o.hostname is None:
@@ -44,19 +47,24 @@ class PixelStarshipsApi:
 
             self.server = o.hostname
 
+            # keep scheme and port, to use a local stand-in server for example
+            self.base_url = f"{o.scheme or 'https'}://{o.netloc}"
+
+    @cached_property
+    def snapshot(self) -> DesignSnapshot:
+        """Get design lists shared by imports made with this instance."""
+        return DesignSnapshot(self)
+
+    @property
+    def api_settings(self) -> dict:
+        """Get last game settings."""
+        return self._api_settings
+
     @property
     def maintenance_message(self) -> str:
         """Get maintenance message from API."""
         return self._api_settings["MaintenanceMessage"]
 
-    @property
-    def devices(self) -> list[Device]:
-        """Get generated devices."""
-        if not self._devices:
-            self._devices = self.get_devices()
-
-        return self._devices
-
     def get_devices(self) -> list[Device]:
         """Get generated devices from database."""
         devices = Device.query.all()
@@ -84,15 +92,15 @@ class PixelStarshipsApi:
         params = {"languageKey": "en", "deviceType": "DeviceTypeAndroid"}
 
         # Determine the appropriate URL to use
-        url = (
-            self._forced_pixelstarships_api_url
-            if self._forced_pixelstarships_api_url
-            else self._main_pixelstarships_api_url
-        )
+        url = self._forced_pixelstarships_api_url or self._main_pixelstarships_api_url
         settings = self.fetch_settings(url, params)
 
-        # If the server has changed, fetch the settings again
-        if "ProductionServer" in settings and url != f"https://{settings['ProductionServer']}":
+        # If the server has changed, fetch the settings again (unless the URL is forced)
+        if (
+            not self._forced_pixelstarships_api_url
+            and "ProductionServer" in settings
+            and url != f"https://{settings['ProductionServer']}"
+        ):
             settings = self.fetch_settings(f"https://{settings['ProductionServer']}", params)
 
         return settings
@@ -101,7 +109,7 @@ class PixelStarshipsApi:
         """Fetch settings from the given URL."""
         endpoint = urljoin(url, "SettingService/GetLatestVersion3")
         response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
         setting_element = root.find(".//Setting")
 
         if setting_element is None:
@@ -111,34 +119,37 @@ class PixelStarshipsApi:
         return setting_element.attrib
 
     def call(
-        self, endpoint: str, params: dict, need_token: bool = False, force_token_generation: bool = False
+        self,
+        endpoint: str,
+        params: dict,
+        need_token: bool = False,
+        force_token_generation: bool = False,
+        stream: bool = False,
     ) -> Response:
-        """Make a PSS API call."""
-        device = None
-        token = None
-
+        """Make a PSS API call, the body is not downloaded upfront if stream is set."""
         # don't use SAVY_PUBLIC_API_TOKEN on staging (it doesn't work)
         if current_app.config.get("USE_STAGING_API"):
             force_token_generation = True
 
         if need_token and (not current_app.config["SAVY_PUBLIC_API_TOKEN"] or force_token_generation):
             # protected endpoint, add device access token...
-            device = self.get_device()
-            token = device.get_token()
-        elif current_app.config["SAVY_PUBLIC_API_TOKEN"]:
-            # ...otherwise use Savy provided token if present
-            token = current_app.config["SAVY_PUBLIC_API_TOKEN"]
+            with device_pool.lease(self) as device:
+                if device.token:
+                    params["accessToken"] = device.token
 
-        if token:
-            params["accessToken"] = token
+                response = self.get_response(endpoint, params, stream)
 
-        response = self.get_response(endpoint, params)
+                # expired token, regenerate token and retry
+                if re.compile(TOKEN_EXPIRED_REGEX).search(response.text):
+                    api_metrics.observe_token_retry(response)
+                    params["accessToken"] = device_pool.renew(device)
+                    response = self.get_response(endpoint, params, stream)
+        else:
+            # ...otherwise use Savy provided token if present
+            if current_app.config["SAVY_PUBLIC_API_TOKEN"]:
+                params["accessToken"] = current_app.config["SAVY_PUBLIC_API_TOKEN"]
 
-        # expired token, regenerate tokens and retry
-        if device and re.compile(TOKEN_EXPIRED_REGEX).search(response.text):
-            device.renew_token()
-            params["accessToken"] = device.get_token()
-            response = self.get_response(endpoint, params)
+            response = self.get_response(endpoint, params, stream)
 
         if response.encoding is None:
             response.encoding = "utf-8"
@@ -146,17 +157,66 @@ class PixelStarshipsApi:
         return response
 
     @staticmethod
-    def get_response(endpoint: str, params: dict) -> Response:
-        """Get response from API."""
-        try:
-            response = requests.get(endpoint, params=params)
-        except requests.exceptions.ConnectionError:
-            current_app.logger.exception("Connection error, retry")
-            api_sleep(10, force_sleep=True)
-            response = requests.get(endpoint, params=params)
+    def get_response(
+        endpoint: str,
+        params: dict,
+        stream: bool = False,
+        rate_limited: bool | None = None,
+    ) -> Response:
+        """Get response from API, connection errors are retried by the pooled transport.
+
+        Crawls and imports are paced by the rate limiter, calls made while serving a web request are not by default,
+        so they never wait behind them.
+        """
+        if rate_limited is None:
+            rate_limited = not has_request_context()
+
+        if rate_limited:
+            rate_limiter.acquire()
+
+        start_time = time.perf_counter()
+        response = http_session.get(endpoint, params=params, stream=stream)
+        api_metrics.observe_response(response, time.perf_counter() - start_time, stream)
+
+        if rate_limited:
+            rate_limiter.feedback(response)
 
         return response
 
+    @staticmethod
+    def parse_response(response: Response) -> Element:
+        """Parse the XML of a downloaded response, the parse time is recorded in the endpoint metrics."""
+        start_time = time.perf_counter()
+        root = ET.fromstring(response.text)
+        api_metrics.observe_parse_time(response, time.perf_counter() - start_time)
+
+        return root
+
+    @staticmethod
+    def iter_response_nodes(response: Response, container_tag: str) -> Iterator[Element]:
+        """Decode a streamed response incrementally and yield the children of the container_tag node."""
+        # let urllib3 decompress the body, iterparse reads raw bytes and handles the XML encoding itself
+        response.raw.decode_content = True
+
+        nodes = iter_children(response.raw, container_tag)
+        parse_time = 0.0
+
+        try:
+            while True:
+                # parse time includes reading the streamed body, but not the handling of each node
+                start_time = time.perf_counter()
+                node = next(nodes, None)
+                parse_time += time.perf_counter() - start_time
+
+                if node is None:
+                    break
+
+                yield node
+        finally:
+            api_metrics.observe_bytes(response)
+            api_metrics.observe_parse_time(response, parse_time)
+            response.close()
+
     @staticmethod
     def create_device_key() -> str:
         """Generate random device key."""
@@ -188,26 +248,13 @@ class PixelStarshipsApi:
 
         return device_key, device_checksum
 
-    def get_device(self) -> Device:
-        """Get the next device."""
-        devices = self.devices
-
-        if self._device_next_index is None:
-            self._device_next_index = random.randrange(len(self.devices))
-
-        if self._device_next_index >= len(devices):
-            self._device_next_index = 0
-
-        device = devices[self._device_next_index]
-        self._device_next_index += 1
-
-        device = db.session.merge(device)
-        db.session.refresh(device)
-
-        return device
-
     def get_device_token(self, device_key: str, client_datetime: datetime, device_checksum: str) -> str | None:
         """Get device token from API for the given generated device."""
+        return self.login_device(self.base_url, device_key, client_datetime, device_checksum)
+
+    @staticmethod
+    def login_device(base_url: str, device_key: str, client_datetime: datetime, device_checksum: str) -> str | None:
+        """Get device token from the API at the given URL, without an instance of the API."""
         params = {
             "deviceKey": device_key,
             "checksum": device_checksum,
@@ -218,8 +265,8 @@ class PixelStarshipsApi:
             "clientDateTime": client_datetime,
         }
 
-        endpoint = f"https://{self.server}/UserService/DeviceLogin11"
-        response = requests.post(endpoint, params=params)
+        endpoint = f"{base_url}/UserService/DeviceLogin11"
+        response = http_session.post(endpoint, params=params)
 
         root = ET.fromstring(response.content.decode("utf-8"))
         user_login_node = root.find(".//UserLogin")
@@ -238,9 +285,9 @@ class PixelStarshipsApi:
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/ShipService/InspectShip2"
+        endpoint = f"{self.base_url}/ShipService/InspectShip2"
         response = self.call(endpoint, params=params, need_token=True, force_token_generation=True)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         inspect_ship: dict = {
             "User": root.find(".//User").attrib.copy(),
@@ -267,9 +314,9 @@ class PixelStarshipsApi:
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/PublicService/GetShipDetails"
+        endpoint = f"{self.base_url}/PublicService/GetShipDetails"
         response = self.call(endpoint, params=params, need_token=True)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         ship_node: Element = root.find(".//Ship")
         ship: dict = ship_node.attrib.copy()
@@ -288,9 +335,9 @@ class PixelStarshipsApi:
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/PublicService/GetShipRoomDetails"
+        endpoint = f"{self.base_url}/PublicService/GetShipRoomDetails"
         response = self.call(endpoint, params=params, need_token=True)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         ship_room_details_node = root.find(".//Rooms")
         ship_room_details = []
@@ -308,9 +355,9 @@ class PixelStarshipsApi:
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/UserService/SearchUsers"
+        endpoint = f"{self.base_url}/UserService/SearchUsers"
         response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         users = []
 
@@ -341,9 +388,9 @@ class PixelStarshipsApi:
         params = {"languageKey": "en", "deviceType": "DeviceTypeAndroid"}
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/LiveOpsService/GetTodayLiveOps2"
+        endpoint = f"{self.base_url}/LiveOpsService/GetTodayLiveOps2"
         response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         dailies_node = root.find(".//LiveOps")
 
@@ -352,102 +399,98 @@ class PixelStarshipsApi:
 
         return dailies
 
-    def get_sprites(self) -> list:
-        """Get sprites from API."""
+    def iter_sprites(self) -> Iterator[dict]:
+        """Stream sprites from API."""
         params = {
             "designVersion": self._api_settings["FileVersion"],
             "deviceType": "DeviceTypeAndroid",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/FileService/ListSprites"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        endpoint = f"{self.base_url}/FileService/ListSprites"
+        response = self.call(endpoint, params=params, stream=True)
 
-        sprites = []
-        sprite_nodes = root.find(".//Sprites")
-
-        for sprite_node in sprite_nodes:
+        for sprite_node in self.iter_response_nodes(response, "Sprites"):
             sprite = self.parse_sprite_node(sprite_node)
-            sprite["pixyship_xml_element"] = sprite_node  # custom field, return raw XML data too
-            sprites.append(sprite)
+            # custom field, return serialized XML data too, the parsed tree is released
+            sprite["pixyship_record"] = create_lean_record(sprite_node)
+            yield sprite
 
-        return sprites
+    def get_sprites(self) -> list:
+        """Get sprites from API."""
+        return list(self.iter_sprites())
 
     @staticmethod
     def parse_sprite_node(sprite_node: Element) -> dict:
         """Extract character data from XML node."""
         return sprite_node.attrib.copy()
 
-    def get_rooms_sprites(self) -> list:
-        """Get rooms sprites from API."""
+    def iter_rooms_sprites(self) -> Iterator[dict]:
+        """Stream rooms sprites from API."""
         params = {"designVersion": self._api_settings["RoomDesignSpriteVersion"]}
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/RoomDesignSpriteService/ListRoomDesignSprites"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        rooms_sprites = []
-        room_sprites_nodes = root.find(".//RoomDesignSprites")
+        endpoint = f"{self.base_url}/RoomDesignSpriteService/ListRoomDesignSprites"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for room_sprites_node in room_sprites_nodes:
+        for room_sprites_node in self.iter_response_nodes(response, "RoomDesignSprites"):
             room_sprites = self.parse_room_sprite_node(room_sprites_node)
-            room_sprites["pixyship_xml_element"] = room_sprites_node  # custom field, return raw XML data too
-            rooms_sprites.append(room_sprites)
+            # custom field, return serialized XML data too, the parsed tree is released
+            room_sprites["pixyship_record"] = create_lean_record(room_sprites_node)
+            yield room_sprites
 
-        return rooms_sprites
+    def get_rooms_sprites(self) -> list:
+        """Get rooms sprites from API."""
+        return list(self.iter_rooms_sprites())
 
     @staticmethod
     def parse_room_sprite_node(room_sprite_node: Element) -> dict:
         """Extract room sprite data from XML node."""
         return room_sprite_node.attrib.copy()
 
-    def get_skinsets(self) -> list:
-        """Get skinsets from API."""
+    def iter_skinsets(self) -> Iterator[dict]:
+        """Stream skinsets from API."""
         params = {
             "designVersion": self._api_settings["SkinSetVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/UserService/ListSkinsets2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        skinsets = []
-        skinset_nodes = root.find(".//SkinSets")
+        endpoint = f"{self.base_url}/UserService/ListSkinsets2"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for skinset_node in skinset_nodes:
+        for skinset_node in self.iter_response_nodes(response, "SkinSets"):
             skinset = self.parse_skinset_node(skinset_node)
-            skinset["pixyship_xml_element"] = skinset_node
-
-            skinsets.append(skinset)
+            # custom field, return serialized XML data too, the parsed tree is released
+            skinset["pixyship_record"] = create_lean_record(
+                skinset_node, RECORD_HASH_IGNORED_ATTRIBUTES[TypeEnum.SKINSET]
+            )
+            yield skinset
 
-        return skinsets
+    def get_skinsets(self) -> list:
+        """Get skinsets from API."""
+        return list(self.iter_skinsets())
 
-    def get_skins(self) -> list:
-        """Get skins from API."""
+    def iter_skins(self) -> Iterator[dict]:
+        """Stream skins from API."""
         params = {
             "designVersion": self._api_settings["SkinVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/UserService/ListSkins2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        skins = []
-        skin_nodes = root.find(".//Skins")
+        endpoint = f"{self.base_url}/UserService/ListSkins2"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for skinset_node in skin_nodes:
-            skin = self.parse_skin_node(skinset_node)
-            skin["pixyship_xml_element"] = skinset_node
+        for skin_node in self.iter_response_nodes(response, "Skins"):
+            skin = self.parse_skin_node(skin_node)
+            # custom field, return serialized XML data too, the parsed tree is released
+            skin["pixyship_record"] = create_lean_record(skin_node)
+            yield skin
 
-            skins.append(skin)
-
-        return skins
+    def get_skins(self) -> list:
+        """Get skins from API."""
+        return list(self.iter_skins())
 
     @staticmethod
     def parse_skinset_node(skinset_node: Element) -> dict:
@@ -459,100 +502,85 @@ class PixelStarshipsApi:
         """Extract skin data from XML node."""
         return skin_node.attrib.copy()
 
-    def get_ships(self) -> list:
-        """Get ships designs from API."""
+    def iter_ships(self) -> Iterator[dict]:
+        """Stream ships designs from API."""
         params = {
             "designVersion": self._api_settings["ShipDesignVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/ShipService/ListAllShipDesigns2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        ships = []
-        ship_nodes = root.find(".//ShipDesigns")
+        endpoint = f"{self.base_url}/ShipService/ListAllShipDesigns2"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for ship_node in ship_nodes:
+        for ship_node in self.iter_response_nodes(response, "ShipDesigns"):
             ship = self.parse_ship_node(ship_node)
-            ship["pixyship_xml_element"] = ship_node  # custom field, return raw XML data too
-            ships.append(ship)
+            # custom field, return serialized XML data too, the parsed tree is released
+            ship["pixyship_record"] = create_lean_record(ship_node)
+            yield ship
 
-        return ships
+    def get_ships(self) -> list:
+        """Get ships designs from API."""
+        return list(self.iter_ships())
 
     @staticmethod
     def parse_ship_node(ship_node: Element) -> dict:
         """Extract character data from XML node."""
         return ship_node.attrib.copy()
 
-    def get_researches(self) -> list:
-        """Get research designs from API."""
+    def iter_researches(self) -> Iterator[dict]:
+        """Stream research designs from API."""
         params = {
             "designVersion": self._api_settings["ResearchDesignVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/ResearchService/ListAllResearchDesigns2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        researches = []
-        research_nodes = root.find(".//ResearchDesigns")
+        endpoint = f"{self.base_url}/ResearchService/ListAllResearchDesigns2"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for research_node in research_nodes:
+        for research_node in self.iter_response_nodes(response, "ResearchDesigns"):
             research = self.parse_research_node(research_node)
-            research["pixyship_xml_element"] = research_node  # custom field, return raw XML data too
-            researches.append(research)
+            # custom field, return serialized XML data too, the parsed tree is released
+            research["pixyship_record"] = create_lean_record(research_node)
+            yield research
 
-        return researches
+    def get_researches(self) -> list:
+        """Get research designs from API."""
+        return list(self.iter_researches())
 
     @staticmethod
     def parse_research_node(research_node: Element) -> dict:
         """Extract research data from XML node."""
         return research_node.attrib.copy()
 
-    def get_rooms(self) -> list:
-        """Get room designs from API."""
-        # get room purchase
-        rooms_purchase = self.get_rooms_purchase()
-
+    def iter_rooms(self) -> Iterator[dict]:
+        """Stream room designs from API."""
         params = {
             "designVersion": self._api_settings["RoomDesignSpriteVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/RoomService/ListRoomDesigns2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        rooms = []
-        room_nodes = root.find(".//RoomDesigns")
-        if room_nodes is None:
-            return []
+        endpoint = f"{self.base_url}/RoomService/ListRoomDesigns2"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for room_node in room_nodes:
+        for room_node in self.iter_response_nodes(response, "RoomDesigns"):
             # if room purchase, add node to room node
-            room_purchase = next(
-                (
-                    room_purchase
-                    for room_purchase in rooms_purchase
-                    if room_purchase["RoomDesignId"] == room_node.attrib["RootRoomDesignId"]
-                ),
-                None,
-            )
+            room_purchase = self.snapshot.rooms_purchase_by_room_design_id.get(room_node.attrib["RootRoomDesignId"])
 
             if room_purchase:
                 room_node.set("AvailabilityMask", room_purchase["AvailabilityMask"])
 
             room = self.parse_room_node(room_node)
 
-            room["pixyship_xml_element"] = room_node  # custom field, return raw XML data too
-            rooms.append(room)
+            # custom field, return serialized XML data too, the parsed tree is released
+            room["pixyship_record"] = create_lean_record(room_node, RECORD_HASH_IGNORED_ATTRIBUTES[TypeEnum.ROOM])
+            yield room
 
-        return rooms
+    def get_rooms(self) -> list:
+        """Get room designs from API."""
+        return list(self.iter_rooms())
 
     @staticmethod
     def parse_room_node(room_node: Element) -> dict:
@@ -567,64 +595,46 @@ class PixelStarshipsApi:
 
         return room
 
-    def get_missile_designs(self) -> list:
-        """Get missile designs from API."""
+    def iter_missile_designs(self) -> Iterator[dict]:
+        """Stream missile designs from API."""
         params = {
             "designVersion": self._api_settings["MissileDesignVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/RoomService/ListMissileDesigns"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        missile_designs = []
-        missile_design_nodes = root.find(".//MissileDesigns")
+        endpoint = f"{self.base_url}/RoomService/ListMissileDesigns"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for missile_design_node in missile_design_nodes:
+        for missile_design_node in self.iter_response_nodes(response, "MissileDesigns"):
             missile_design = self.parse_missile_design_node(missile_design_node)
 
-            missile_design["pixyship_xml_element"] = missile_design_node  # custom field, return raw XML data too
-            missile_designs.append(missile_design)
+            # custom field, return serialized XML data too, the parsed tree is released
+            missile_design["pixyship_record"] = create_lean_record(missile_design_node)
+            yield missile_design
 
-        return missile_designs
+    def get_missile_designs(self) -> list:
+        """Get missile designs from API."""
+        return list(self.iter_missile_designs())
 
     @staticmethod
     def parse_missile_design_node(missile_design_node: Element) -> dict:
         """Extract missile design data from XML node."""
         return missile_design_node.attrib.copy()
 
-    def get_crafts(self) -> list:
-        """Get crafts designs from API."""
-        # get missile designs
-        missile_designs = self.get_missile_designs()
-
-        # get item designs
-        item_designs = self.get_items()
-
+    def iter_crafts(self) -> Iterator[dict]:
+        """Stream crafts designs from API."""
         params = {
             "designVersion": self._api_settings["CraftDesignVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/RoomService/ListCraftDesigns"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        endpoint = f"{self.base_url}/RoomService/ListCraftDesigns"
+        response = self.call(endpoint, params=params, stream=True)
 
-        crafts = []
-        craft_nodes = root.find(".//CraftDesigns")
-
-        for craft_node in craft_nodes:
-            missile_design = next(
-                (
-                    missile_design
-                    for missile_design in missile_designs
-                    if missile_design["MissileDesignId"] == craft_node.attrib["MissileDesignId"]
-                ),
-                None,
-            )
+        for craft_node in self.iter_response_nodes(response, "CraftDesigns"):
+            missile_design = self.snapshot.missile_designs_by_id.get(craft_node.attrib["MissileDesignId"])
 
             if not missile_design:
                 current_app.logger.error(
@@ -633,25 +643,23 @@ class PixelStarshipsApi:
                 )
                 continue
 
-            item_design = next(
-                (
-                    item_design
-                    for item_design in item_designs
-                    if item_design["CraftDesignId"] == craft_node.attrib["CraftDesignId"]
-                ),
-                None,
+            reload_modifier = self.snapshot.item_reload_modifiers_by_craft_design_id.get(
+                craft_node.attrib["CraftDesignId"],
             )
 
-            if item_design:
-                craft_node.set("ReloadModifier", item_design["ReloadModifier"])
+            if reload_modifier is not None:
+                craft_node.set("ReloadModifier", reload_modifier)
 
-            craft_node.append(missile_design["pixyship_xml_element"])
+            craft_node.append(ET.fromstring(missile_design["pixyship_record"].data))
             craft = self.parse_craft_node(craft_node)
 
-            craft["pixyship_xml_element"] = craft_node  # custom field, return raw XML data too
-            crafts.append(craft)
+            # custom field, return serialized XML data too, the parsed tree is released
+            craft["pixyship_record"] = create_lean_record(craft_node, RECORD_HASH_IGNORED_ATTRIBUTES[TypeEnum.CRAFT])
+            yield craft
 
-        return crafts
+    def get_crafts(self) -> list:
+        """Get crafts designs from API."""
+        return list(self.iter_crafts())
 
     @staticmethod
     def parse_craft_node(craft_node: Element) -> dict:
@@ -663,66 +671,38 @@ class PixelStarshipsApi:
 
         return craft
 
-    def get_missiles(self) -> list:
-        """Get missiles designs from API."""
-        # get room purchase
-        missile_designs = self.get_missile_designs()
-
-        # get item designs
-        item_designs = self.get_items()
-
-        params = {
-            "designVersion": self._api_settings["ItemDesignVersion"],
-            "languageKey": "en",
-        }
-
-        # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/ItemService/ListItemDesigns2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        missiles = []
-        item_nodes = root.find(".//ItemDesigns")
-
-        for item_node in item_nodes:
-            if item_node.attrib["ItemType"] != "Missile":
-                continue
-
-            missile_design = next(
-                (
-                    missile_design
-                    for missile_design in missile_designs
-                    if missile_design["MissileDesignId"] == item_node.attrib["MissileDesignId"]
-                ),
-                None,
-            )
+    def iter_missiles(self) -> Iterator[dict]:
+        """Get missiles designs from item designs."""
+        for item_design in self.snapshot.missile_items:
+            missile_design = self.snapshot.missile_designs_by_id.get(item_design["MissileDesignId"])
 
             if not missile_design:
                 current_app.logger.error(
                     "Cannot retrieve missile MissileDesign for MissileDesignId %s",
-                    item_node.attrib["MissileDesignId"],
+                    item_design["MissileDesignId"],
                 )
                 continue
 
-            item_design = next(
-                (
-                    item_design
-                    for item_design in item_designs
-                    if item_design["CraftDesignId"] == item_node.attrib["CraftDesignId"]
-                ),
-                None,
+            # item designs only keep their serialized XML, rebuild the few missile items
+            item_node = ET.fromstring(item_design["pixyship_record"].data)
+
+            reload_modifier = self.snapshot.item_reload_modifiers_by_craft_design_id.get(
+                item_node.attrib["CraftDesignId"],
             )
 
-            if item_design:
-                item_node.set("ReloadModifier", item_design["ReloadModifier"])
+            if reload_modifier is not None:
+                item_node.set("ReloadModifier", reload_modifier)
 
-            item_node.append(missile_design["pixyship_xml_element"])
+            item_node.append(ET.fromstring(missile_design["pixyship_record"].data))
             missile = self.parse_missile_node(item_node)
 
-            missile["pixyship_xml_element"] = item_node  # custom field, return raw XML data too
-            missiles.append(missile)
+            # custom field, return serialized XML data too, the parsed tree is released
+            missile["pixyship_record"] = create_lean_record(item_node, RECORD_HASH_IGNORED_ATTRIBUTES[TypeEnum.MISSILE])
+            yield missile
 
-        return missiles
+    def get_missiles(self) -> list:
+        """Get missiles designs from API."""
+        return list(self.iter_missiles())
 
     @staticmethod
     def parse_missile_node(missile_node: Element) -> dict:
@@ -734,60 +714,52 @@ class PixelStarshipsApi:
 
         return missile
 
-    def get_rooms_purchase(self) -> list:
-        """Get room designs from API."""
+    def iter_rooms_purchase(self) -> Iterator[dict]:
+        """Stream room designs purchases from API."""
         params = {
             "designVersion": self._api_settings["RoomDesignPurchaseVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/RoomService/ListRoomDesignPurchase"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        rooms_purchase = []
-        room_purchase_nodes = root.find(".//RoomDesignPurchases")
-
-        if room_purchase_nodes is None:
-            return []
+        endpoint = f"{self.base_url}/RoomService/ListRoomDesignPurchase"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for room_purchase_node in room_purchase_nodes:
+        for room_purchase_node in self.iter_response_nodes(response, "RoomDesignPurchases"):
             room_purchase = self.parse_room_node(room_purchase_node)
-            room_purchase["pixyship_xml_element"] = room_purchase_node  # custom field, return raw XML data too
-            rooms_purchase.append(room_purchase)
+            # custom field, return serialized XML data too, the parsed tree is released
+            room_purchase["pixyship_record"] = create_lean_record(room_purchase_node)
+            yield room_purchase
 
-        return rooms_purchase
+    def get_rooms_purchase(self) -> list:
+        """Get room designs from API."""
+        return list(self.iter_rooms_purchase())
 
     @staticmethod
     def parse_room_purchase_node(room_purchase_node: Element) -> dict:
         """Extract room purchase data from XML node."""
         return room_purchase_node.attrib.copy()
 
-    def get_characters(self) -> list:
-        """Get character designs from API."""
+    def iter_characters(self) -> Iterator[dict]:
+        """Stream character designs from API."""
         params = {
             "designVersion": self._api_settings["CharacterDesignVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/CharacterService/ListAllCharacterDesigns2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        characters = []
-        character_nodes = root.find(".//CharacterDesigns")
-        if character_nodes is None:
-            current_app.logger.error("Error when parsing response: %s", response.text)
-            return []
+        endpoint = f"{self.base_url}/CharacterService/ListAllCharacterDesigns2"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for character_node in character_nodes:
+        for character_node in self.iter_response_nodes(response, "CharacterDesigns"):
             character = self.parse_character_node(character_node)
-            character["pixyship_xml_element"] = character_node  # custom field, return raw XML data too
-            characters.append(character)
+            # custom field, return serialized XML data too, the parsed tree is released
+            character["pixyship_record"] = create_lean_record(character_node)
+            yield character
 
-        return characters
+    def get_characters(self) -> list:
+        """Get character designs from API."""
+        return list(self.iter_characters())
 
     @staticmethod
     def parse_character_node(character_node: Element) -> dict:
@@ -802,54 +774,52 @@ class PixelStarshipsApi:
 
         return character
 
-    def get_collections(self) -> list:
-        """Get collection designs from API."""
+    def iter_collections(self) -> Iterator[dict]:
+        """Stream collection designs from API."""
         params = {
             "designVersion": self._api_settings["CollectionDesignVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/CollectionService/ListAllCollectionDesigns"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        collections = []
-        collection_nodes = root.find(".//CollectionDesigns")
+        endpoint = f"{self.base_url}/CollectionService/ListAllCollectionDesigns"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for collection_node in collection_nodes:
+        for collection_node in self.iter_response_nodes(response, "CollectionDesigns"):
             collection = self.parse_collection_node(collection_node)
-            collection["pixyship_xml_element"] = collection_node  # custom field, return raw XML data too
-            collections.append(collection)
+            # custom field, return serialized XML data too, the parsed tree is released
+            collection["pixyship_record"] = create_lean_record(collection_node)
+            yield collection
 
-        return collections
+    def get_collections(self) -> list:
+        """Get collection designs from API."""
+        return list(self.iter_collections())
 
     @staticmethod
     def parse_collection_node(collection_node: Element) -> dict:
         """Extract collection data from XML node."""
         return collection_node.attrib.copy()
 
-    def get_items(self) -> list:
-        """Get item designs from API."""
+    def iter_items(self) -> Iterator[dict]:
+        """Stream item designs from API."""
         params = {
             "designVersion": self._api_settings["ItemDesignVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/ItemService/ListItemDesigns2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        items = []
-        item_nodes = root.find(".//ItemDesigns")
+        endpoint = f"{self.base_url}/ItemService/ListItemDesigns2"
+        response = self.call(endpoint, params=params, stream=True)
 
-        for item_node in item_nodes:
+        for item_node in self.iter_response_nodes(response, "ItemDesigns"):
             item = self.parse_item_node(item_node)
-            item["pixyship_xml_element"] = item_node  # custom field, return raw XML data too
-            items.append(item)
+            # custom field, return serialized XML data too, the parsed tree is released
+            item["pixyship_record"] = create_lean_record(item_node, RECORD_HASH_IGNORED_ATTRIBUTES[TypeEnum.ITEM])
+            yield item
 
-        return items
+    def get_items(self) -> list:
+        """Get item designs from API."""
+        return list(self.iter_items())
 
     @staticmethod
     def parse_item_node(item_node: Element) -> dict:
@@ -864,9 +834,9 @@ class PixelStarshipsApi:
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/AllianceService/ListAlliancesByRanking"
+        endpoint = f"{self.base_url}/AllianceService/ListAlliancesByRanking"
         response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         alliances = []
         alliance_nodes = root.find(".//Alliances")
@@ -905,7 +875,7 @@ class PixelStarshipsApi:
             current_app.logger.info("retrieve sales of %d from %d to %d", item_id, start, end)
 
             # retrieve data as XML from Pixel Starships API
-            endpoint = f"https://{self.server}/MarketService/ListSalesByItemDesignId"
+            endpoint = f"{self.base_url}/MarketService/ListSalesByItemDesignId"
             response = self.call(endpoint, params=params)
 
             if response.status_code == 400:
@@ -918,11 +888,10 @@ class PixelStarshipsApi:
                     sales.clear()
                     break
 
-                # too many request, wait a little, and try again
-                api_sleep(30, force_sleep=True)
+                # try again, at the pace of the rate limiter
                 continue
 
-            root = ET.fromstring(response.text)
+            root = self.parse_response(response)
 
             # parse HTTP body as XML and find sales nodes
             sale_nodes = root.find(".//Sales")
@@ -938,7 +907,6 @@ class PixelStarshipsApi:
                     sales.clear()
                     break
 
-                api_sleep(3, force_sleep=True)
                 continue
 
             # no more sales available
@@ -967,8 +935,6 @@ class PixelStarshipsApi:
             start += 20
             end += 20
 
-            api_sleep(3, force_sleep=True)
-
         return sales
 
     @staticmethod
@@ -991,18 +957,15 @@ class PixelStarshipsApi:
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/MessageService/ListActiveMarketplaceMessages5"
+        endpoint = f"{self.base_url}/MessageService/ListActiveMarketplaceMessages5"
         response = self.call(endpoint, params=params, need_token=True, force_token_generation=True)
 
         if response.status_code == 400:
             current_app.logger.error("Response in error: %s", response.text)
 
-            # too many request, wait a little, and try again
-            api_sleep(10, force_sleep=True)
-
             return []
 
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         # parse HTTP body as XML and find market_messages nodes
         market_messsage_nodes = root.find(".//Messages")
@@ -1029,9 +992,9 @@ class PixelStarshipsApi:
         params = {"allianceId": alliance_id, "take": take, "skip": skip}
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/AllianceService/ListUsers"
+        endpoint = f"{self.base_url}/AllianceService/ListUsers"
         response = self.call(endpoint, params=params, need_token=True)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         users = []
         user_nodes = root.find(".//Users")
@@ -1048,9 +1011,9 @@ class PixelStarshipsApi:
         params = {"from": start, "to": end}
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/LadderService/ListUsersByRanking"
+        endpoint = f"{self.base_url}/LadderService/ListUsersByRanking"
         response = self.call(endpoint, params=params, need_token=True)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         users = []
         user_nodes = root.find(".//Users")
@@ -1067,9 +1030,9 @@ class PixelStarshipsApi:
         params = {"characterDesignId": character_id}
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/CharacterService/PrestigeCharacterTo"
+        endpoint = f"{self.base_url}/CharacterService/PrestigeCharacterTo"
         response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         prestiges = []
         prestige_nodes = root.find(".//Prestiges")
@@ -1088,9 +1051,9 @@ class PixelStarshipsApi:
         params = {"characterDesignId": character_id}
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/CharacterService/PrestigeCharacterFrom"
+        endpoint = f"{self.base_url}/CharacterService/PrestigeCharacterFrom"
         response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         prestiges = []
         prestige_nodes = root.find(".//Prestiges")
@@ -1132,56 +1095,52 @@ class PixelStarshipsApi:
 
         return options
 
-    def get_trainings(self) -> list:
-        """Get trainings data from API."""
+    def iter_trainings(self) -> Iterator[dict]:
+        """Stream trainings data from API."""
         params = {
             "designVersion": self._api_settings["TrainingDesignVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/TrainingService/ListAllTrainingDesigns2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
-
-        trainings = []
-        training_nodes = root.find(".//TrainingDesigns")
+        endpoint = f"{self.base_url}/TrainingService/ListAllTrainingDesigns2"
+        response = self.call(endpoint, params=params, stream=True)
 
-        if training_nodes:
-            for training_node in training_nodes:
-                training = self.parse_training_node(training_node)
-                training["pixyship_xml_element"] = training_node  # custom field, return raw XML data too
-                trainings.append(training)
+        for training_node in self.iter_response_nodes(response, "TrainingDesigns"):
+            training = self.parse_training_node(training_node)
+            # custom field, return serialized XML data too, the parsed tree is released
+            training["pixyship_record"] = create_lean_record(training_node)
+            yield training
 
-        return trainings
+    def get_trainings(self) -> list:
+        """Get trainings data from API."""
+        return list(self.iter_trainings())
 
     @staticmethod
     def parse_training_node(training_node: Element) -> dict:
         """Extract training data from XML node."""
         return training_node.attrib.copy()
 
-    def get_achievements(self) -> list:
-        """Get achievements data from API."""
+    def iter_achievements(self) -> Iterator[dict]:
+        """Stream achievements data from API."""
         params = {
             "designVersion": self._api_settings["AchievementDesignVersion"],
             "languageKey": "en",
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/AchievementService/ListAchievementDesigns2"
-        response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        endpoint = f"{self.base_url}/AchievementService/ListAchievementDesigns2"
+        response = self.call(endpoint, params=params, stream=True)
 
-        achievements = []
-        achievement_nodes = root.find(".//AchievementDesigns")
+        for achievement_node in self.iter_response_nodes(response, "AchievementDesigns"):
+            achievement = self.parse_achievement_node(achievement_node)
+            # custom field, return serialized XML data too, the parsed tree is released
+            achievement["pixyship_record"] = create_lean_record(achievement_node)
+            yield achievement
 
-        if achievement_nodes:
-            for achievement_node in achievement_nodes:
-                achievement = self.parse_achievement_node(achievement_node)
-                achievement["pixyship_xml_element"] = achievement_node  # custom field, return raw XML data too
-                achievements.append(achievement)
-
-        return achievements
+    def get_achievements(self) -> list:
+        """Get achievements data from API."""
+        return list(self.iter_achievements())
 
     @staticmethod
     def parse_achievement_node(achievement_node: Element) -> dict:
@@ -1196,9 +1155,9 @@ class PixelStarshipsApi:
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/SituationService/ListSituationDesigns"
+        endpoint = f"{self.base_url}/SituationService/ListSituationDesigns"
         response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         situations = []
         situation_nodes = root.find(".//SituationDesigns")
@@ -1224,9 +1183,9 @@ class PixelStarshipsApi:
         }
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/PromotionService/ListAllPromotionDesigns2"
+        endpoint = f"{self.base_url}/PromotionService/ListAllPromotionDesigns2"
         response = self.call(endpoint, params=params)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         promotions = []
         promotion_nodes = root.find(".//PromotionDesigns")
@@ -1249,9 +1208,9 @@ class PixelStarshipsApi:
         params = {"languageKey": "en"}
 
         # retrieve data as XML from Pixel Starships API
-        endpoint = f"https://{self.server}/GalaxyService/ListStarSystemMarkers"
+        endpoint = f"{self.base_url}/GalaxyService/ListStarSystemMarkers"
         response = self.call(endpoint, params=params, need_token=True)
-        root = ET.fromstring(response.text)
+        root = self.parse_response(response)
 
         markers = []
         markers_nodes = root.find(".//StarSystemMarkers")
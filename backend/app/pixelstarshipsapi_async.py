@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from flask import current_app
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from app.pixelstarshipsapi import PixelStarshipsApi
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class AsyncPixelStarshipsApi:
+    """Asyncio twin of PixelStarshipsApi, crawling PSS endpoints with bounded concurrency."""
+
+    def __init__(
+        self,
+        pixel_starships_api: PixelStarshipsApi,
+        concurrency: int | None = None,
+    ) -> None:
+        if concurrency is None:
+            concurrency = current_app.config["PSS_FAN_OUT_CONCURRENCY"]
+
+        self.concurrency = max(1, concurrency)
+        self.pixel_starships_api = pixel_starships_api
+
+        self._app = current_app._get_current_object()  # type: ignore[attr-defined]  # noqa: SLF001
+
+    def crawl(
+        self,
+        func: Callable[[T], R],
+        items: Iterable[T],
+        on_result: Callable[[T, R], Any],
+        on_error: Callable[[T, Exception], Any] | None = None,
+    ) -> None:
+        """Call func for each item concurrently, results are handled one by one in the calling thread."""
+        asyncio.run(self._crawl(func, list(items), on_result, on_error or self.log_error))
+
+    async def _crawl(
+        self,
+        func: Callable[[T], R],
+        items: list[T],
+        on_result: Callable[[T, R], Any],
+        on_error: Callable[[T, Exception], Any],
+    ) -> None:
+        """Schedule all items and handle results as soon as they are available."""
+        loop = asyncio.get_running_loop()
+
+        # the workers of the executor bound the concurrency, other items wait in its queue
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="pss") as executor:
+
+            async def run(item: T) -> tuple[T, R | None, Exception | None]:
+                try:
+                    return item, await loop.run_in_executor(executor, self._call, func, item), None
+                except Exception as exception:  # noqa: BLE001
+                    return item, None, exception
+
+            for future in asyncio.as_completed([run(item) for item in items]):
+                item, result, exception = await future
+
+                # results are handled in the event loop thread, with the caller's app context and database session
+                if exception is not None:
+                    on_error(item, exception)
+                else:
+                    on_result(item, result)  # type: ignore[arg-type]
+
+    def _call(self, func: Callable[[T], R], item: T) -> R:
+        """Call func in a worker thread, with its own app context (and so its own database session)."""
+        with self._app.app_context():
+            return func(item)
+
+    @staticmethod
+    def log_error(item: object, exception: Exception) -> None:
+        """Log a failed call without stopping the crawl."""
+        current_app.logger.error("Error when crawling %s: %s", item, exception, exc_info=exception)
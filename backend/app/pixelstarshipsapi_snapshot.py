@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from collections import deque
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from app.pixelstarshipsapi import PixelStarshipsApi
+
+
+class DesignSnapshot:
+    """Design lists shared by several imports, each list is fetched at most once and indexed by id for joins.
+
+    Item designs are too large to be kept: only the attributes other designs are joined with are.
+    """
+
+    def __init__(self, pixel_starships_api: PixelStarshipsApi) -> None:
+        self.pixel_starships_api = pixel_starships_api
+
+        # item designs are streamed, only these small indexes are kept
+        self._item_reload_modifiers_by_craft_design_id: dict[str, str] = {}
+        self._missile_items: list[dict] | None = None
+
+    def iter_items(self) -> Iterator[dict]:
+        """Stream item designs, only keeping what crafts and missiles are joined with once all are seen."""
+        reload_modifiers_by_craft_design_id: dict[str, str] = {}
+        missile_items = []
+        for item in self.pixel_starships_api.iter_items():
+            # first item wins, like a linear search
+            reload_modifiers_by_craft_design_id.setdefault(item["CraftDesignId"], item["ReloadModifier"])
+            if item["ItemType"] == "Missile":
+                missile_items.append(item)
+
+            yield item
+
+        self._item_reload_modifiers_by_craft_design_id = reload_modifiers_by_craft_design_id
+        self._missile_items = missile_items
+
+    def load_items(self) -> None:
+        """Stream item designs if they haven't been yet, to index them."""
+        if self._missile_items is None:
+            deque(self.iter_items(), maxlen=0)
+
+    @property
+    def item_reload_modifiers_by_craft_design_id(self) -> dict[str, str]:
+        """Get the ReloadModifier of item designs by CraftDesignId."""
+        self.load_items()
+        return self._item_reload_modifiers_by_craft_design_id
+
+    @property
+    def missile_items(self) -> list[dict]:
+        """Get item designs of missiles."""
+        self.load_items()
+        return self._missile_items
+
+    @cached_property
+    def missile_designs(self) -> list[dict]:
+        """Get missile designs."""
+        return self.pixel_starships_api.get_missile_designs()
+
+    @cached_property
+    def missile_designs_by_id(self) -> dict[str, dict]:
+        """Get missile designs by MissileDesignId."""
+        return self.index(self.missile_designs, "MissileDesignId")
+
+    @cached_property
+    def rooms_purchase(self) -> list[dict]:
+        """Get room designs purchases."""
+        return self.pixel_starships_api.get_rooms_purchase()
+
+    @cached_property
+    def rooms_purchase_by_room_design_id(self) -> dict[str, dict]:
+        """Get room designs purchases by RoomDesignId."""
+        return self.index(self.rooms_purchase, "RoomDesignId")
+
+    @staticmethod
+    def index(designs: list[dict], key: str) -> dict[str, dict]:
+        """Index designs by the given attribute, keeping the first design of each value like a linear search."""
+        designs_by_key: dict[str, dict] = {}
+        for design in designs:
+            designs_by_key.setdefault(design[key], design)
+
+        return designs_by_key
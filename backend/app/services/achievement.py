@@ -1,10 +1,10 @@
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 
 
 class AchievementService(BaseService):
@@ -16,26 +16,21 @@ class AchievementService(BaseService):
     @cached_property
     def achievements(self) -> dict[int, dict]:
         """Get achievements data."""
-        achievements = cache.get("achievements")
-        if achievements is None:
-            achievements = self.get_achievements_from_db()
-            cache.set("achievements", achievements)
-
-        return achievements
+        return dataset_cache.get_or_build("achievements", self.get_achievements_from_db)
 
     def update_cache(self) -> None:
         """Load achievements in cache."""
-        cache.set("achievements", self.get_achievements_from_db())
+        dataset_cache.set("achievements", self.get_achievements_from_db())
 
     def get_achievements_from_db(self) -> dict[int, dict]:
         """Load achievements from database."""
-        records = self.record_service.get_records_from_type(TypeEnum.ACHIEVEMENT)
+        records = self.record_service.iter_records_from_type(TypeEnum.ACHIEVEMENT)
 
         achievements = {}
         all_parent_achievement_design_id = []
 
         for record in records:
-            achievement = PixelStarshipsApi.parse_achievement_node(ET.fromstring(record.data))
+            achievement = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_achievement_node)
 
             starbux_reward = 0
             mineral_reward = 0
@@ -72,22 +67,18 @@ class AchievementService(BaseService):
 
         return achievements
 
-    def update_achievements(self) -> None:
+    def update_achievements(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Update data and save records."""
-        pixel_starships_api = PixelStarshipsApi()
-        achievements = pixel_starships_api.get_achievements()
-        still_presents_ids = []
-
-        for achievement in achievements:
-            record_id = int(achievement["AchievementDesignId"])
-            self.record_service.add_record(
-                TypeEnum.ACHIEVEMENT,
-                record_id,
-                achievement["AchievementTitle"],
-                int(achievement["SpriteId"]),
-                achievement["pixyship_xml_element"],
-                pixel_starships_api.server,
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        achievements = pixel_starships_api.iter_achievements()
+        rows = (
+            RecordRow(
+                type_id=int(achievement["AchievementDesignId"]),
+                name=achievement["AchievementTitle"],
+                sprite_id=int(achievement["SpriteId"]),
+                data=achievement["pixyship_record"],
+                attributes=achievement,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.ACHIEVEMENT, still_presents_ids)
+            for achievement in achievements
+        )
+        self.record_service.add_records(TypeEnum.ACHIEVEMENT, rows, pixel_starships_api.server)
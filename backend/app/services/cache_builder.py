@@ -0,0 +1,181 @@
+import functools
+import multiprocessing
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+from flask import Flask, current_app
+
+from app.services.achievement import AchievementService
+from app.services.catalog import CatalogService
+from app.services.changes import ChangesService
+from app.services.character import CharacterService
+from app.services.collection import CollectionService
+from app.services.craft import CraftService
+from app.services.item import ItemService
+from app.services.market import MarketService
+from app.services.missile import MissileService
+from app.services.research import ResearchService
+from app.services.room import RoomService
+from app.services.ship import ShipService
+from app.services.skin import SkinService
+from app.services.sprite import SpriteService
+from app.services.training import TrainingService
+
+# service updating the cache of each type, and the types read from the cache while building it
+CACHE_TYPES: dict[str, tuple[type, tuple[str, ...]]] = {
+    "sprite": (SpriteService, ()),
+    "market": (MarketService, ()),
+    "training": (TrainingService, ("sprite",)),
+    "skin": (SkinService, ("sprite",)),
+    "character": (CharacterService, ("sprite",)),
+    "item": (ItemService, ("sprite", "market", "training", "skin", "character")),
+    "research": (ResearchService, ("sprite",)),
+    "room": (RoomService, ("sprite", "item", "research")),
+    "ship": (ShipService, ("sprite", "item", "room")),
+    "craft": (CraftService, ("sprite",)),
+    "achievement": (AchievementService, ("sprite",)),
+    "collection": (CollectionService, ("sprite", "item", "character")),
+    "missile": (MissileService, ("sprite", "character", "item", "room")),
+    "changes": (ChangesService, ("sprite", "character", "item")),
+    "catalog": (
+        CatalogService,
+        ("item", "character", "collection", "room", "ship", "skin", "craft", "missile"),
+    ),
+}
+
+# caches kept in the memory of each process, workers results would be lost
+LOCAL_CACHE_TYPES = frozenset({"NullCache", "SimpleCache", "null", "simple"})
+
+
+def update_type_cache(name: str) -> float:
+    """Update the cache of a type, return the duration in seconds."""
+    service_class, _ = CACHE_TYPES[name]
+
+    start = time.perf_counter()
+    service_class().update_cache()
+
+    return time.perf_counter() - start
+
+
+@functools.cache
+def get_worker_app() -> Flask:
+    """Get the app of the current worker process, created on its first task."""
+    from app import create_app
+
+    return create_app()
+
+
+def update_type_cache_in_worker(name: str) -> float:
+    """Update the cache of a type from a worker process."""
+    with get_worker_app().app_context():
+        return update_type_cache(name)
+
+
+class CacheBuilder:
+    """Update the cache of types after the types they are built from, independent types in parallel processes.
+
+    Workers push their results to the shared cache, dependents read them from there once they are done.
+    """
+
+    @staticmethod
+    def get_types(names: list[str] | None = None) -> list[str]:
+        """Check the given type names, all types by default."""
+        if not names:
+            return list(CACHE_TYPES)
+
+        unknown_names = [name for name in names if name not in CACHE_TYPES]
+        if unknown_names:
+            msg = f"Unknown cache types: {', '.join(unknown_names)} (available: {', '.join(CACHE_TYPES)})"
+            raise ValueError(msg)
+
+        return names
+
+    @staticmethod
+    def get_jobs(jobs: int | None = None) -> int:
+        """Get the number of worker processes, only one when the cache isn't shared between processes."""
+        if current_app.config["CACHE_TYPE"] in LOCAL_CACHE_TYPES:
+            return 1
+
+        return max(1, jobs or current_app.config["CACHE_UPDATE_JOBS"] or os.cpu_count() or 1)
+
+    def update(
+        self,
+        names: list[str] | None = None,
+        jobs: int | None = None,
+        on_updated: Callable[[str, float | None], None] | None = None,
+    ) -> dict[str, float]:
+        """Update the cache of the given types, types not given are read as they are in cache.
+
+        on_updated is called with the duration of each updated type, or None if it failed or was skipped.
+        """
+        names = self.get_types(names)
+        jobs = self.get_jobs(jobs)
+
+        if jobs == 1:
+            return self.schedule(names, self.run, on_updated)
+
+        # spawned workers don't share the database and Redis connections of this process
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+            return self.schedule(
+                names,
+                lambda name: executor.submit(update_type_cache_in_worker, name),
+                on_updated,
+            )
+
+    @staticmethod
+    def run(name: str) -> Future:
+        """Update the cache of a type in the current process, as a done future."""
+        future: Future = Future()
+        try:
+            future.set_result(update_type_cache(name))
+        except Exception as e:  # noqa: BLE001
+            future.set_exception(e)
+
+        return future
+
+    @staticmethod
+    def schedule(
+        names: list[str],
+        submit: Callable[[str], Future],
+        on_updated: Callable[[str, float | None], None] | None,
+    ) -> dict[str, float]:
+        """Submit each type once the types it is built from are updated, skip it if one of them failed."""
+        waiting = {name: {dependency for dependency in CACHE_TYPES[name][1] if dependency in names} for name in names}
+        running: dict[Future, str] = {}
+        durations: dict[str, float] = {}
+        failed: list[str] = []
+
+        while waiting or running:
+            for name in [name for name, dependencies in waiting.items() if dependencies <= durations.keys()]:
+                del waiting[name]
+                running[submit(name)] = name
+
+            # remaining types wait for a failed type
+            if not running:
+                for name in waiting:
+                    current_app.logger.error("Cache of %s not updated, a type it is built from failed", name)
+                    failed.append(name)
+                    if on_updated:
+                        on_updated(name, None)
+
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    durations[name] = future.result()
+                except Exception:
+                    current_app.logger.exception("Error when updating cache of %s", name)
+                    failed.append(name)
+
+                if on_updated:
+                    on_updated(name, durations.get(name))
+
+        if failed:
+            msg = f"Cache not updated for: {', '.join(failed)}"
+            raise RuntimeError(msg)
+
+        return durations
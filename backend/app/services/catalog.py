@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import time
+from typing import TYPE_CHECKING
+
+from flask import current_app
+
+from app.ext import dataset_cache
+from app.services.base import BaseService
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class CatalogService(BaseService):
+    """Service to manage responses of catalog endpoints, serialized and compressed once when the cache is updated."""
+
+    def __init__(self) -> None:
+        super().__init__()
+
+        # data of each catalog endpoint
+        self.catalogs: dict[str, Callable[[], dict]] = {
+            "items": self.get_items,
+            "crew": self.get_crew,
+            "rooms": self.get_rooms,
+            "ships": self.get_ships,
+            "skins": self.get_skins,
+            "crafts": self.get_crafts,
+            "missiles": self.get_missiles,
+            "collections": self.get_collections,
+        }
+
+    def get_response(self, name: str) -> dict:
+        """Get the response of a catalog endpoint: its ETag, last modification time and body by content encoding."""
+        return dataset_cache.get_or_build(f"catalog:{name}", lambda: self.create_response(name))
+
+    def update_cache(self) -> None:
+        """Load catalog endpoints responses in cache."""
+        for name in self.catalogs:
+            dataset_cache.set(f"catalog:{name}", self.create_response(name))
+
+    def create_response(self, name: str) -> dict:
+        """Serialize the response of a catalog endpoint, and compress it with each configured encoding."""
+        # data is serialized once, for its ETag and the body
+        data_json = current_app.json.dumps(self.catalogs[name]())
+        etag = hashlib.sha256(data_json.encode()).hexdigest()
+
+        # unchanged data, the previous response is kept as is so clients having it don't download it again
+        previous_response = dataset_cache.get(f"catalog:{name}")
+        if previous_response is not None and previous_response["etag"] == etag:
+            return previous_response
+
+        # same as serializing the whole response with sorted keys, without serializing data again
+        current_time = time.time()
+        body = f'{{"current_time": {current_app.json.dumps(current_time)}, "data": {data_json}, "status": "success"}}'
+
+        # same body as jsonify
+        bodies = {"identity": f"{body}\n".encode()}
+        for encoding in current_app.config["CATALOG_ENCODINGS"]:
+            bodies[encoding] = self.compress(bodies["identity"], encoding)
+
+        return {
+            "etag": etag,
+            "last_modified": current_time,
+            "bodies": bodies,
+        }
+
+    @staticmethod
+    def compress(body: bytes, encoding: str) -> bytes:
+        """Compress a body with the highest level, it is only done once per cache update."""
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=9, mtime=0)
+
+        if encoding == "br":
+            import brotli
+
+            return brotli.compress(body, quality=11)
+
+        msg = f"Unknown catalog encoding: {encoding}"
+        raise ValueError(msg)
+
+    def get_items(self) -> dict:
+        """Get all items."""
+        return self.item_service.items
+
+    def get_crew(self) -> dict:
+        """Get all crew, with the name and sprite of their collection."""
+        collections = self.collection_service.collections
+
+        crew = {}
+        for character_id, character in self.character_service.characters.items():
+            crew[character_id] = character
+            if character["collection"]:
+                crew[character_id] = {
+                    **character,
+                    "collection_sprite": collections[character["collection"]]["icon_sprite"],
+                    "collection_name": collections[character["collection"]]["name"],
+                }
+
+        return crew
+
+    def get_rooms(self) -> dict:
+        """Get all rooms."""
+        return self.room_service.rooms
+
+    def get_ships(self) -> dict:
+        """Get all ships."""
+        return self.ship_service.ships
+
+    def get_skins(self) -> dict:
+        """Get all skins, without duplicate skins with the same name."""
+        skins_filtered = {}
+        known_names = set()
+        for skin_id, skin in self.skin_service.skins.items():
+            if skin["name"] not in known_names:
+                skins_filtered[skin_id] = skin
+                known_names.add(skin["name"])
+
+        return skins_filtered
+
+    def get_crafts(self) -> dict:
+        """Get all crafts."""
+        return self.craft_service.crafts
+
+    def get_missiles(self) -> dict:
+        """Get all missiles."""
+        return self.missile_service.missiles
+
+    def get_collections(self) -> dict:
+        """Get the collections with their characters, without collections having none."""
+        characters = self.character_service.characters
+
+        collections = {}
+        for collection_id, collection in self.collection_service.collections.items():
+            collection_characters = [
+                character for character in characters.values() if character["collection"] == collection_id
+            ]
+            if collection_characters:
+                collections[collection_id] = {**collection, "chars": collection_characters}
+
+        return collections
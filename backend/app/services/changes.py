@@ -5,11 +5,12 @@ from flask import current_app
 from sqlalchemy import text
 
 from app.enums import TypeEnum
-from app.ext import cache, db
+from app.ext import dataset_cache, db
 from app.services.base import BaseService
 from app.services.item import ItemService
 from app.services.record import RecordService
 from app.utils.pss import get_type_enum_from_string
+from app.utils.xml_helpers import apply_data_delta
 
 
 class ChangesService(BaseService):
@@ -21,27 +22,17 @@ class ChangesService(BaseService):
     @cached_property
     def changes(self) -> list[dict]:
         """Get changes data."""
-        changes = cache.get("changes")
-        if changes is None:
-            changes = self.get_changes_from_db()
-            cache.set("changes", changes)
-
-        return changes
+        return dataset_cache.get_or_build("changes", self.get_changes_from_db)
 
     @cached_property
     def last_prestiges_changes(self) -> datetime | None:
         """Get last prestiges changes date."""
-        last_prestiges_changes = cache.get("last_prestiges_changes")
-        if last_prestiges_changes is None:
-            last_prestiges_changes = self.get_last_prestiges_changes_from_db()
-            cache.set("last_prestiges_changes", last_prestiges_changes)
-
-        return last_prestiges_changes
+        return dataset_cache.get_or_build("last_prestiges_changes", self.get_last_prestiges_changes_from_db)
 
     def update_cache(self) -> None:
         """Load cache."""
-        cache.set("changes", self.get_changes_from_db())
-        cache.set("last_prestiges_changes", self.get_last_prestiges_changes_from_db())
+        dataset_cache.set("changes", self.get_changes_from_db())
+        dataset_cache.set("last_prestiges_changes", self.get_last_prestiges_changes_from_db())
 
     def get_changes_from_db(self) -> list[dict]:
         """Get changes from database."""
@@ -64,14 +55,14 @@ class ChangesService(BaseService):
         min_changes_dates_result = db.session.execute(text(min_changes_dates_sql)).fetchall()
 
         min_changes_dates_conditions = [
-            f"(c.type = '{record[0]}' AND o.data IS NULL AND (o.id IS NOT NULL OR c.created_at > '{record[1]}'))"
+            f"(c.type = '{record[0]}' AND o.id IS NULL AND c.created_at > '{record[1]}')"
             if record[0] == "sprite"
             else f"(c.type = '{record[0]}' AND (o.id IS NOT NULL OR c.created_at > '{record[1]}'))"
             for record in min_changes_dates_result
         ]
 
         sql = """
-            SELECT sub.name, sub.sprite_id, sub.type, sub.type_id, sub.data, sub.created_at, sub.old_data
+            SELECT sub.name, sub.sprite_id, sub.type, sub.type_id, sub.data, sub.created_at, sub.old_data, sub.old_delta
             FROM (SELECT DISTINCT ON (c.id) c.id,
                                             c.name,
                                             c.sprite_id,
@@ -79,7 +70,8 @@ class ChangesService(BaseService):
                                             c.type_id,
                                             c.data,
                                             c.created_at,
-                                            o.data as old_data
+                                            o.data as old_data,
+                                            o.delta as old_delta
                   FROM record c
                            LEFT JOIN record o ON o.type = c.type AND o.type_id = c.type_id AND o.current = FALSE
                   WHERE c.current = TRUE
@@ -100,6 +92,11 @@ class ChangesService(BaseService):
         change_data = record[4]
         change_created_at = record[5]
         change_old_data = record[6]
+        change_old_delta = record[7]
+
+        # the previous version may be stored as a delta against the current one
+        if change_old_data is None and change_old_delta is not None:
+            change_old_data = apply_data_delta(change_data, change_old_delta)
 
         record_type = get_type_enum_from_string(record[2])
         if record_type is None:
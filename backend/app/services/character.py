@@ -1,5 +1,4 @@
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.constants import (
     ABILITY_NAME_MAP,
@@ -8,9 +7,10 @@ from app.constants import (
     RARITY_MAP,
 )
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 from app.utils.calculation import float_range, int_range
 
 
@@ -23,25 +23,35 @@ class CharacterService(BaseService):
     @cached_property
     def characters(self) -> dict[int, dict]:
         """Get characters data."""
-        characters = cache.get("characters")
+        return dataset_cache.get_or_build("characters", self.get_characters_from_records)
+
+    def get_character(self, character_id: int) -> dict | None:
+        """Get a character, None if unknown."""
+        return self.get_characters_by_ids([character_id]).get(character_id)
+
+    def get_characters_by_ids(self, character_ids: list[int]) -> dict[int, dict]:
+        """Get some characters by id, read alone from cache when possible, unknown ids are ignored."""
+        characters = dataset_cache.get_entities("characters", character_ids)
         if characters is None:
-            characters = self.get_characters_from_records()
-            cache.set("characters", characters)
+            characters = {
+                character_id: self.characters[character_id]
+                for character_id in character_ids
+                if character_id in self.characters
+            }
 
         return characters
 
     def update_cache(self) -> None:
         """Load characters in cache."""
-        cache.set("characters", self.get_characters_from_records())
+        dataset_cache.set("characters", self.get_characters_from_records())
 
     def get_characters_from_records(self) -> dict[int, dict]:
         """Load crews from database."""
-        records = self.record_service.get_records_from_type(TypeEnum.CHARACTER)
+        records = self.record_service.iter_records_from_type(TypeEnum.CHARACTER)
 
         characters = {}
         for record in records:
-            character_node = ET.fromstring(record.data)
-            character = PixelStarshipsApi.parse_character_node(character_node)
+            character = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_character_node)
 
             characters[record.type_id] = {
                 "name": character["CharacterDesignName"],
@@ -111,22 +121,18 @@ class CharacterService(BaseService):
                 ]
                 character["collection_name"] = self.collection_service.collections[character["collection"]]["name"]
 
-    def update_characters(self) -> None:
+    def update_characters(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Get crews from API and save them in database."""
-        pixel_starships_api = PixelStarshipsApi()
-        characters = pixel_starships_api.get_characters()
-        still_presents_ids = []
-
-        for character in characters:
-            record_id = int(character["CharacterDesignId"])
-            self.record_service.add_record(
-                TypeEnum.CHARACTER,
-                record_id,
-                character["CharacterDesignName"],
-                int(character["ProfileSpriteId"]),
-                character["pixyship_xml_element"],
-                pixel_starships_api.server,
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        characters = pixel_starships_api.iter_characters()
+        rows = (
+            RecordRow(
+                type_id=int(character["CharacterDesignId"]),
+                name=character["CharacterDesignName"],
+                sprite_id=int(character["ProfileSpriteId"]),
+                data=character["pixyship_record"],
+                attributes=character,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.CHARACTER, still_presents_ids)
+            for character in characters
+        )
+        self.record_service.add_records(TypeEnum.CHARACTER, rows, pixel_starships_api.server)
@@ -1,5 +1,4 @@
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from flask import current_app
 
@@ -13,9 +12,10 @@ from app.constants import (
     SPECIAL_ABILITY_TYPE_MAP,
 )
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 
 
 class CollectionService(BaseService):
@@ -27,25 +27,19 @@ class CollectionService(BaseService):
     @cached_property
     def collections(self) -> dict[int, dict]:
         """Get collections data."""
-        collections = cache.get("collections")
-        if collections is None:
-            collections = self.get_collections_from_records()
-            cache.set("collections", collections)
-
-        return collections
+        return dataset_cache.get_or_build("collections", self.get_collections_from_records)
 
     def update_cache(self) -> None:
         """Load collections in cache."""
-        cache.set("collections", self.get_collections_from_records())
+        dataset_cache.set("collections", self.get_collections_from_records())
 
     def get_collections_from_records(self) -> dict[int, dict]:
         """Load collections from database."""
-        records = self.record_service.get_records_from_type(TypeEnum.COLLECTION)
+        records = self.record_service.iter_records_from_type(TypeEnum.COLLECTION)
 
         collections = {}
         for record in records:
-            collection_node = ET.fromstring(record.data)
-            collection = PixelStarshipsApi.parse_collection_node(collection_node)
+            collection = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_collection_node)
 
             max_use = int(collection["MaxUse"])
             cooldown_time = int(collection["CooldownTime"])
@@ -317,22 +311,18 @@ class CollectionService(BaseService):
 
         return f"{base_chance}% chance to reduce all negative status effects' duration on the current room by {duration_seconds:.1f} seconds."
 
-    def update_collections(self) -> None:
+    def update_collections(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Get collections from API and save them in database."""
-        pixel_starships_api = PixelStarshipsApi()
-        collections = pixel_starships_api.get_collections()
-        still_presents_ids = []
-
-        for collection in collections:
-            record_id = int(collection["CollectionDesignId"])
-            self.record_service.add_record(
-                TypeEnum.COLLECTION,
-                record_id,
-                collection["CollectionName"],
-                int(collection["SpriteId"]),
-                collection["pixyship_xml_element"],
-                pixel_starships_api.server,
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        collections = pixel_starships_api.iter_collections()
+        rows = (
+            RecordRow(
+                type_id=int(collection["CollectionDesignId"]),
+                name=collection["CollectionName"],
+                sprite_id=int(collection["SpriteId"]),
+                data=collection["pixyship_record"],
+                attributes=collection,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.COLLECTION, still_presents_ids)
+            for collection in collections
+        )
+        self.record_service.add_records(TypeEnum.COLLECTION, rows, pixel_starships_api.server)
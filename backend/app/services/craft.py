@@ -1,10 +1,10 @@
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 
 
 class CraftService(BaseService):
@@ -16,24 +16,19 @@ class CraftService(BaseService):
     @cached_property
     def crafts(self) -> dict[int, dict]:
         """Get crafts data."""
-        crafts = cache.get("crafts")
-        if crafts is None:
-            crafts = self.get_crafts_from_records()
-            cache.set("crafts", crafts)
-
-        return crafts
+        return dataset_cache.get_or_build("crafts", self.get_crafts_from_records)
 
     def update_cache(self) -> None:
         """Load crafts in cache."""
-        cache.set("crafts", self.get_crafts_from_records())
+        dataset_cache.set("crafts", self.get_crafts_from_records())
 
     def get_crafts_from_records(self) -> dict[int, dict]:
         """Load crafts from database."""
-        records = self.record_service.get_records_from_type(TypeEnum.CRAFT)
+        records = self.record_service.iter_records_from_type(TypeEnum.CRAFT)
 
         crafts = {}
         for record in records:
-            craft = PixelStarshipsApi.parse_craft_node(ET.fromstring(record.data))
+            craft = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_craft_node)
             missile_design = craft["MissileDesign"]
 
             crafts[record.type_id] = {
@@ -67,23 +62,18 @@ class CraftService(BaseService):
 
         return crafts
 
-    def update_crafts(self) -> None:
+    def update_crafts(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Get crafts from API and save them in database."""
-        pixel_starships_api = PixelStarshipsApi()
-        crafts = pixel_starships_api.get_crafts()
-        still_presents_ids = []
-
-        for craft in crafts:
-            record_id = int(craft["CraftDesignId"])
-            self.record_service.add_record(
-                TypeEnum.CRAFT,
-                record_id,
-                craft["CraftName"],
-                int(craft["SpriteId"]),
-                craft["pixyship_xml_element"],
-                pixel_starships_api.server,
-                ["ReloadModifier"],
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        crafts = pixel_starships_api.iter_crafts()
+        rows = (
+            RecordRow(
+                type_id=int(craft["CraftDesignId"]),
+                name=craft["CraftName"],
+                sprite_id=int(craft["SpriteId"]),
+                data=craft["pixyship_record"],
+                attributes=craft,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.CRAFT, still_presents_ids)
+            for craft in crafts
+        )
+        self.record_service.add_records(TypeEnum.CRAFT, rows, pixel_starships_api.server)
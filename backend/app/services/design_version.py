@@ -0,0 +1,47 @@
+from sqlalchemy import func
+
+from app.constants import DESIGN_VERSION_SETTINGS
+from app.enums import TypeEnum
+from app.ext.db import db
+from app.models import DesignVersion
+from app.services.base import BaseService
+
+
+class DesignVersionService(BaseService):
+    """Service to manage the imported versions of design lists."""
+
+    def __init__(self) -> None:
+        super().__init__()
+
+    @staticmethod
+    def get_design_version_from_api_settings(design_type: TypeEnum, api_settings: dict) -> str | None:
+        """Get the current version of a design list, None if unknown."""
+        versions = [api_settings.get(key) for key in DESIGN_VERSION_SETTINGS[design_type]]
+        if not all(versions):
+            return None
+
+        return "/".join(versions)
+
+    @staticmethod
+    def is_design_version_imported(design_type: TypeEnum, version: str | None) -> bool:
+        """Check if the given version of a design list has already been imported."""
+        if version is None:
+            return False
+
+        design_version = db.session.get(DesignVersion, design_type)
+        return design_version is not None and design_version.version == version
+
+    @staticmethod
+    def save_design_version(design_type: TypeEnum, version: str | None) -> None:
+        """Save the imported version of a design list."""
+        if version is None:
+            return
+
+        design_version = DesignVersion(
+            type=design_type,
+            version=version,
+            imported_at=func.now(),
+        )
+
+        db.session.merge(design_version)
+        db.session.commit()
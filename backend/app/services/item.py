@@ -1,5 +1,5 @@
+from collections import defaultdict
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.constants import (
     ENHANCE_MAP,
@@ -10,9 +10,10 @@ from app.constants import (
     SLOT_MAP,
 )
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 from app.utils.pss import has_offstat
 
 
@@ -25,25 +26,33 @@ class ItemService(BaseService):
     @cached_property
     def items(self) -> dict[int, dict]:
         """Get items data."""
-        items = cache.get("items")
+        return dataset_cache.get_or_build("items", self.get_items_from_records)
+
+    def get_item(self, item_id: int) -> dict | None:
+        """Get an item, None if unknown."""
+        return self.get_items_by_ids([item_id]).get(item_id)
+
+    def get_items_by_ids(self, item_ids: list[int]) -> dict[int, dict]:
+        """Get some items by id, read alone from cache when possible, unknown ids are ignored."""
+        items = dataset_cache.get_entities("items", item_ids)
         if items is None:
-            items = self.get_items_from_records()
-            cache.set("items", items)
+            items = {item_id: self.items[item_id] for item_id in item_ids if item_id in self.items}
 
         return items
 
     def update_cache(self) -> None:
         """Load items in cache."""
-        cache.set("items", self.get_items_from_records())
+        items = self.get_items_from_records()
+        dataset_cache.set("items", items)
+        dataset_cache.set("item_upgrades", self.get_items_upgrades(items))
 
     def get_items_from_records(self) -> dict[int, dict]:
         """Get items from database."""
-        records = self.record_service.get_records_from_type(TypeEnum.ITEM)
+        records = self.record_service.iter_records_from_type(TypeEnum.ITEM)
 
         items: dict = {}
         for record in records:
-            item_node = ET.fromstring(record.data)
-            item = PixelStarshipsApi.parse_item_node(item_node)
+            item = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_item_node)
 
             number_of_rewards = 0
             if item["Content"] and float(item["ModuleArgument"]) != 0:
@@ -247,29 +256,36 @@ class ItemService(BaseService):
 
     def get_item_upgrades(self, item_id: int) -> list:
         """Get items that can be upgraded with a given item."""
-        return [
-            ItemService.create_light_item(item)
-            for item in self.items.values()
-            if item["recipe"] and any(recipe_item["id"] == item_id for recipe_item in item["recipe"])
-        ]
+        upgrades = dataset_cache.get_entities("item_upgrades", [item_id])
+        if upgrades is None:
+            upgrades = dataset_cache.get_or_build("item_upgrades", lambda: self.get_items_upgrades(self.items))
+
+        return upgrades.get(item_id, [])
+
+    @staticmethod
+    def get_items_upgrades(items: dict[int, dict]) -> dict[int, list]:
+        """Get items that can be upgraded with each item, as light items."""
+        upgrades = defaultdict(list)
+        for item in items.values():
+            for recipe_item_id in dict.fromkeys(recipe_item["id"] for recipe_item in item["recipe"] or []):
+                upgrades[recipe_item_id].append(ItemService.create_light_item(item))
 
-    def update_items(self) -> None:
+        return dict(upgrades)
+
+    def update_items(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Get items from API and save them in database."""
-        pixel_starships_api = PixelStarshipsApi()
-        items = pixel_starships_api.get_items()
-        still_presents_ids = []
-
-        for item in items:
-            record_id = int(item["ItemDesignId"])
-            self.record_service.add_record(
-                TypeEnum.ITEM,
-                record_id,
-                item["ItemDesignName"],
-                int(item["ImageSpriteId"]),
-                item["pixyship_xml_element"],
-                pixel_starships_api.server,
-                ["FairPrice", "MarketPrice", "BuildPrice"],
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+
+        # streamed, crafts and missiles imported afterward are joined with the few attributes kept by the snapshot
+        items = pixel_starships_api.snapshot.iter_items()
+        rows = (
+            RecordRow(
+                type_id=int(item["ItemDesignId"]),
+                name=item["ItemDesignName"],
+                sprite_id=int(item["ImageSpriteId"]),
+                data=item["pixyship_record"],
+                attributes=item,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.ITEM, still_presents_ids)
+            for item in items
+        )
+        self.record_service.add_records(TypeEnum.ITEM, rows, pixel_starships_api.server)
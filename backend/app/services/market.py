@@ -5,7 +5,7 @@ from functools import cached_property
 from sqlalchemy import desc, text
 
 from app.constants import SHORT_ENHANCE_MAP
-from app.ext import cache
+from app.ext import dataset_cache
 from app.ext.db import db
 from app.models import Listing
 from app.pixelstarshipsapi import PixelStarshipsApi
@@ -21,16 +21,11 @@ class MarketService(BaseService):
     @cached_property
     def prices(self) -> dict[int, dict]:
         """Get prices data."""
-        prices = cache.get("prices")
-        if prices is None:
-            prices = self.get_prices_from_db()
-            cache.set("prices", prices)
-
-        return prices
+        return dataset_cache.get_or_build("prices", self.get_prices_from_db)
 
     def update_cache(self) -> None:
         """Load prices in cache."""
-        cache.set("prices", self.get_prices_from_db())
+        dataset_cache.set("prices", self.get_prices_from_db())
 
     @staticmethod
     def get_prices_from_db() -> dict[int, dict]:
@@ -77,7 +72,8 @@ class MarketService(BaseService):
                 FROM listing
                 WHERE item_id = :item_id
                   AND amount > 0
-                  AND sale_at::DATE >= now() - '6 months'::INTERVAL
+                  -- same days as sale_at::DATE >= now() - '6 months', without a cast preventing the index use
+                  AND sale_at >= (now() - '6 months'::INTERVAL)::DATE + 1
                 GROUP BY item_id, item_name, currency, sale_at::DATE
                 ORDER BY item_id, item_name, currency, sale_at::DATE
             """
@@ -171,7 +167,6 @@ class MarketService(BaseService):
         return pixel_starships_api.get_sales(item_id, max_sale_id)
 
     @staticmethod
-    def get_market_messages_from_api(item_id: int) -> list:
+    def get_market_messages_from_api(pixel_starships_api: PixelStarshipsApi, item_id: int) -> list:
         """Get market messages of item."""
-        pixel_starships_api = PixelStarshipsApi()
         return pixel_starships_api.get_market_messages(item_id)
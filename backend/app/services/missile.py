@@ -1,10 +1,10 @@
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 
 
 class MissileService(BaseService):
@@ -17,24 +17,19 @@ class MissileService(BaseService):
     @cached_property
     def missiles(self) -> dict[int, dict]:
         """Get missiles data."""
-        missiles = cache.get("missiles")
-        if missiles is None:
-            missiles = self.get_missiles_from_records()
-            cache.set("missiles", missiles)
-
-        return missiles
+        return dataset_cache.get_or_build("missiles", self.get_missiles_from_records)
 
     def update_cache(self) -> None:
         """Load missiles in cache."""
-        cache.set("missiles", self.get_missiles_from_records())
+        dataset_cache.set("missiles", self.get_missiles_from_records())
 
     def get_missiles_from_records(self) -> dict[int, dict]:
         """Load missiles from database."""
-        records = self.record_service.records[TypeEnum.MISSILE]
+        records = self.record_service.iter_records_from_type(TypeEnum.MISSILE)
 
         missiles = {}
-        for record in records.values():
-            missile = PixelStarshipsApi.parse_missile_node(ET.fromstring(record.data))
+        for record in records:
+            missile = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_missile_node)
             missile_design = missile["MissileDesign"]
 
             missiles[record.type_id] = {
@@ -61,22 +56,18 @@ class MissileService(BaseService):
 
         return missiles
 
-    def update_missiles(self) -> None:
+    def update_missiles(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Get missiles from API and save them in database."""
-        missiles = self.pixel_starships_api.get_missiles()
-        still_presents_ids = []
-
-        for missile in missiles:
-            record_id = int(missile["ItemDesignId"])
-            self.record_service.add_record(
-                TypeEnum.MISSILE,
-                record_id,
-                missile["ItemDesignName"],
-                int(missile["ImageSpriteId"]),
-                missile["pixyship_xml_element"],
-                self.pixel_starships_api.server,
-                ["ReloadModifier"],
+        pixel_starships_api = pixel_starships_api or self.pixel_starships_api
+        missiles = pixel_starships_api.iter_missiles()
+        rows = (
+            RecordRow(
+                type_id=int(missile["ItemDesignId"]),
+                name=missile["ItemDesignName"],
+                sprite_id=int(missile["ImageSpriteId"]),
+                data=missile["pixyship_record"],
+                attributes=missile,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.MISSILE, still_presents_ids)
+            for missile in missiles
+        )
+        self.record_service.add_records(TypeEnum.MISSILE, rows, pixel_starships_api.server)
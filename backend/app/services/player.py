@@ -106,10 +106,15 @@ class PlayerService(BaseService):
 
         ship_id = int(ship_data["ShipDesignId"])
 
+        # only the rooms of the ship are read from cache
+        rooms_by_id = self.room_service.get_rooms_by_ids(
+            list({int(current_room_data["RoomDesignId"]) for current_room_data in room_data}),
+        )
+
         rooms = []
         for current_room_data in room_data:
             room = dict(
-                self.convert_room_sprite_to_race_sprite(int(current_room_data["RoomDesignId"]), ship_id),
+                self.convert_room_sprite_to_race_sprite(rooms_by_id[int(current_room_data["RoomDesignId"])], ship_id),
                 design_id=int(current_room_data["RoomDesignId"]),
                 row=int(current_room_data["Row"]),
                 column=int(current_room_data["Column"]),
@@ -148,10 +153,13 @@ class PlayerService(BaseService):
             return None
 
         stickers = []
+        items = self.item_service.get_items_by_ids(
+            list({int(sticker_string.split("@")[0]) for sticker_string in stickers_string.split("|")}),
+        )
 
         for sticker_string in stickers_string.split("|"):
             item_id = int(sticker_string.split("@")[0])
-            item = self.item_service.items[item_id]
+            item = items[item_id]
             coords = sticker_string.split("@")[1].split("-")
 
             sticker = {
@@ -165,10 +173,8 @@ class PlayerService(BaseService):
 
         return stickers
 
-    def convert_room_sprite_to_race_sprite(self, room_id: int, ship_id: int) -> dict:
+    def convert_room_sprite_to_race_sprite(self, room: dict, ship_id: int) -> dict:
         """Convert rooms to the correct interior depending on ship race."""
-        room = self.room_service.rooms[room_id]
-
         if room["type"] in ("Armor", "Lift"):
             ship = self.ship_service.ships[ship_id]
 
@@ -3,8 +3,11 @@ import json
 from collections import Counter, defaultdict
 from typing import Any
 
+from flask import current_app
+
 from app.enums import TypeEnum
 from app.pixelstarshipsapi import PixelStarshipsApi
+from app.pixelstarshipsapi_async import AsyncPixelStarshipsApi
 from app.services.base import BaseService
 
 
@@ -80,16 +83,18 @@ class PrestigeService(BaseService):
 
         return prestiges_to, grouped_to
 
-    def update_prestiges(self) -> None:
+    def update_prestiges(self, concurrency: int | None = None) -> None:
         """Get prestiges from API and save them in database."""
         still_presents_ids = []
+        failed_characters = []
 
-        for character in self.character_service.characters.values():
-            prestiges = self.get_prestiges_from_api(character["id"])
+        # load characters before crawling, workers only read them
+        characters = list(self.character_service.characters.values())
 
+        def save_prestiges(character: dict, prestiges: dict) -> None:
             # no prestiges, probably special crew or API bug
             if not prestiges["to"] and not prestiges["from"]:
-                continue
+                return
 
             json_content = json.dumps(
                 {
@@ -110,4 +115,22 @@ class PrestigeService(BaseService):
             )
             still_presents_ids.append(int(record_id))
 
+        def log_prestiges_error(character: dict, exception: Exception) -> None:
+            failed_characters.append(character)
+            current_app.logger.error(
+                "Error when getting prestiges of %s (%d)", character["name"], character["id"], exc_info=exception
+            )
+
+        AsyncPixelStarshipsApi(self.pixel_starships_api, concurrency).crawl(
+            lambda character: self.get_prestiges_from_api(character["id"]),
+            characters,
+            save_prestiges,
+            log_prestiges_error,
+        )
+
+        # missing prestiges would be flagged as deleted
+        if failed_characters:
+            current_app.logger.error("%d characters failed, old prestiges are kept", len(failed_characters))
+            return
+
         self.record_service.purge_old_records(TypeEnum.PRESTIGE, still_presents_ids)
@@ -1,58 +1,157 @@
 import hashlib
-from functools import cached_property
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import NamedTuple
 from xml.etree import ElementTree as ET
 from xml.etree.ElementTree import Element
 
 from flask import current_app
-from sqlalchemy import func
+from sqlalchemy import Integer, Row, all_, any_, bindparam, func, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.enums import TypeEnum
-from app.ext import cache
 from app.ext.db import db
 from app.models import Record
 from app.services.base import BaseService
-from app.utils.xml_helpers import sort_attributes
+from app.utils.xml_helpers import LeanRecord, apply_data_delta, create_data_delta
 
 
-class RecordService(BaseService):
-    """Service to manage records."""
+class RecordRow(NamedTuple):
+    """Design row to be saved as a record."""
+
+    type_id: int
+    name: str
+    sprite_id: int
+    data: LeanRecord | str
+    attributes: dict | None = None
+
+
+class RecordEntry(NamedTuple):
+    """Lightweight copy of a current record, to look it up by id."""
+
+    type: TypeEnum
+    type_id: int
+    name: str | None
+    sprite_id: int | None
+
+
+class RecordIndex:
+    """Current records of each type by id, shared by all services of the process.
+
+    Each type is loaded on first use and reloaded after RECORD_INDEX_TTL seconds, or when an unknown id is requested.
+    Unknown ids are then remembered for RECORD_INDEX_NEGATIVE_TTL seconds, so they don't reload the type again.
+    """
+
+    MAX_MISSING = 10000
 
     def __init__(self) -> None:
-        super().__init__()
+        self._lock = threading.Lock()
+        self._entries: dict[TypeEnum, dict[int, RecordEntry]] = {}
+        self._loaded_at: dict[TypeEnum, float] = {}
+        self._missing: dict[tuple[TypeEnum, int], float] = {}
+
+    @staticmethod
+    def query_entries(record_type: TypeEnum) -> dict[int, RecordEntry]:
+        """Get the entries of the current records of a type from database."""
+        rows = db.session.execute(
+            select(Record.type_id, Record.name, Record.sprite_id).where(
+                Record.type == record_type,
+                Record.current.is_(True),
+            ),
+        )
+
+        return {row.type_id: RecordEntry(record_type, row.type_id, row.name, row.sprite_id) for row in rows}
+
+    def load(self, record_type: TypeEnum) -> dict[int, RecordEntry]:
+        """Load the entries of a type, and forget its unknown ids."""
+        entries = self.query_entries(record_type)
+
+        with self._lock:
+            self._entries[record_type] = entries
+            self._loaded_at[record_type] = time.monotonic()
+            self._missing = {key: expires_at for key, expires_at in self._missing.items() if key[0] != record_type}
+
+        return entries
+
+    def get_entries(self, record_type: TypeEnum) -> dict[int, RecordEntry]:
+        """Get the entries of a type, loaded on first use and reloaded once expired."""
+        loaded_at = self._loaded_at.get(record_type)
+        if loaded_at is None or time.monotonic() - loaded_at > current_app.config["RECORD_INDEX_TTL"]:
+            return self.load(record_type)
+
+        return self._entries[record_type]
+
+    def get(self, record_type: TypeEnum, type_id: int, reload_on_miss: bool = True) -> RecordEntry | None:
+        """Get the entry of a record, None if the record is unknown."""
+        entry = self.get_entries(record_type).get(type_id)
+        if entry is not None or not reload_on_miss:
+            return entry
+
+        key = (record_type, type_id)
+        if self._missing.get(key, 0) > time.monotonic():
+            return None
+
+        # happens when there's new things, reload this type only
+        entry = self.load(record_type).get(type_id)
+        if entry is None:
+            with self._lock:
+                # oldest unknown ids are forgotten first
+                if len(self._missing) >= self.MAX_MISSING:
+                    del self._missing[next(iter(self._missing))]
 
-    @cached_property
-    def records(self) -> dict[TypeEnum, dict[int, Record]]:
-        """Get records data."""
-        records: dict[TypeEnum, dict[int, Record]] = {}
-        current_records: list[Record] = Record.query.filter_by(current=True).all()
+                self._missing[key] = time.monotonic() + current_app.config["RECORD_INDEX_NEGATIVE_TTL"]
 
-        for record in current_records:
-            db.session.expunge(record)
-            if record.type not in records:
-                records[record.type] = {}
+        return entry
 
-            records[record.type][record.type_id] = record
+    def invalidate(self, record_type: TypeEnum | None = None) -> None:
+        """Reload a type, or all types, on next use."""
+        with self._lock:
+            if record_type is None:
+                self._loaded_at = {}
+                self._missing = {}
+            else:
+                self._loaded_at.pop(record_type, None)
 
-        return records
+
+record_index = RecordIndex()
+
+
+class RecordService(BaseService):
+    """Service to manage records."""
+
+    def __init__(self) -> None:
+        super().__init__()
 
     @staticmethod
     def get_records_from_type(record_type: TypeEnum) -> list[Record]:
         """Get records from given PSS API type (LimitedCatalogType for example)."""
         return Record.query.filter_by(current=True, type=record_type).order_by(Record.type_id).all()
 
-    def get_record(self, record_type: TypeEnum, record_type_id: int, reload_on_error: bool = True) -> Record | None:
+    @staticmethod
+    def iter_records_from_type(record_type: TypeEnum) -> Iterator[Row]:
+        """Iterate over current records of a type with only the columns needed to build data.
+
+        Rows are fetched by chunks of RECORDS_CHUNK_SIZE through a server-side cursor, so the session must not be
+        committed until the iteration is over.
+        """
+        return iter(
+            db.session.execute(
+                select(Record.type_id, Record.name, Record.sprite_id, Record.data, Record.attributes)
+                .where(Record.type == record_type, Record.current.is_(True))
+                .order_by(Record.type_id)
+                .execution_options(yield_per=current_app.config["RECORDS_CHUNK_SIZE"]),
+            ),
+        )
+
+    @staticmethod
+    def get_record(record_type: TypeEnum, record_type_id: int, reload_on_error: bool = True) -> RecordEntry | None:
         """Get PixyShip record from given PSS API type (LimitedCatalogType for example)."""
-        try:
-            return self.records[record_type][record_type_id]
-        except KeyError:
-            # happens when there's new things, reload
-            if reload_on_error:
-                self._records = {}
-                cache.clear()
-                return self.get_record(record_type, record_type_id, False)
-
-            current_app.logger.exception("Cannot find record of type %s with id %d", record_type, record_type_id)
-            return None
+        record = record_index.get(record_type, record_type_id, reload_on_error)
+        if record is None:
+            current_app.logger.warning("Cannot find record of type %s with id %d", record_type, record_type_id)
+
+        return record
 
     def get_record_name(self, record_type: TypeEnum, type_id: int, reload_on_error: bool = True) -> str | None:
         """Get sprite date for the given record ID."""
@@ -68,31 +167,17 @@ class RecordService(BaseService):
         record_id: int,
         record_name: str,
         record_sprite_id: int,
-        raw_data: Element | str,
+        raw_data: LeanRecord | str,
         url: str,
-        ignore_list: list[str] | None = None,
     ) -> None:
         """Save a record to the DB with hash."""
-        ignore_list = ignore_list or []
-
-        if isinstance(raw_data, Element):
-            # since python 3.8, attrib order is now preserved, but we need a sorted order for legacy comparaisons
-            sort_attributes(raw_data)
-
-            # data to be stored in database
-            data: str = ET.tostring(raw_data).decode()
-
-            # ignore some fields for hashing
-            for i in ignore_list:
-                raw_data.attrib.pop(i, None)
-
-            # hash
-            md5_str = ET.tostring(raw_data).decode().replace("\n", " ")
+        if isinstance(raw_data, LeanRecord):
+            data, md5_str = raw_data
         else:
             data = raw_data
             md5_str = data
 
-        md5_hash = hashlib.md5(md5_str.encode("utf-8")).hexdigest()
+        md5_hash = RecordService.get_record_hash(md5_str)
 
         # check if this is already in the db as the current
         existing = Record.query.filter_by(type=record_type, type_id=record_id, current=True).first()
@@ -100,8 +185,12 @@ class RecordService(BaseService):
         if existing:
             # hash is stored as uuid with extra dashes, remove them when comparing hashes
             if str(existing.md5_hash).replace("-", "") == md5_hash:
-                # if we ignored fields, update them, but don't make a new record.
-                if ignore_list and existing.data != data:
+                # if ignored fields changed, update them, but don't make a new record.
+                if existing.data != data:
+                    rebased_records = RecordService.get_rebased_records(record_type, {record_id: data})
+                    if rebased_records:
+                        db.session.execute(update(Record), rebased_records)
+
                     existing.data = data
                     db.session.commit()
 
@@ -120,6 +209,11 @@ class RecordService(BaseService):
             # new hash and data, previous record is no more the current
             existing.current = False
 
+            delta = RecordService.get_history_delta(existing.data, data)
+            if delta is not None:
+                existing.data = None
+                existing.delta = delta
+
         # create the new record and save it in database
         new_record = Record(
             type=record_type,
@@ -133,23 +227,317 @@ class RecordService(BaseService):
 
         db.session.add(new_record)
         db.session.commit()
+        record_index.invalidate(record_type)
 
     @staticmethod
-    def set_not_current(record_type: TypeEnum, type_id: int) -> None:
-        """Set record's current state to False in the DB."""
-        existing = Record.query.filter_by(type=record_type, type_id=type_id, current=True).first()
-        existing.current = False
+    def add_records(record_type: TypeEnum, rows: Iterable[RecordRow], url: str) -> None:
+        """Save the records of a whole design list in one transaction, only changed rows are written.
+
+        Records no more presents in the list are disabled in the same transaction.
+        Rows are compared to the current records as they are streamed, only the ones to be written are kept.
+        """
+        # current hashes of the type, data is only compared through its hash
+        existing_records = {
+            existing.type_id: existing
+            for existing in db.session.query(
+                Record.id,
+                Record.type_id,
+                Record.md5_hash,
+                func.md5(Record.data).label("data_hash"),
+                Record.attributes.is_(None).label("missing_attributes"),
+                Record.name,
+                Record.sprite_id,
+            ).filter_by(type=record_type, current=True)
+        }
+
+        new_records: dict[int, dict] = {}
+        next_data_by_id: dict[int, str] = {}
+        updated_records: dict[int, dict] = {}
+        updated_data_by_type_id: dict[int, str] = {}
+        still_presents_ids: set[int] = set()
+        rows_count = 0
+
+        for row in rows:
+            rows_count += 1
+            type_id = row.type_id
+            existing = existing_records.get(type_id)
+
+            # a design listed twice is saved once, like the last call of add_record
+            if type_id in still_presents_ids:
+                new_records.pop(type_id, None)
+                updated_records.pop(type_id, None)
+                updated_data_by_type_id.pop(type_id, None)
+                if existing:
+                    next_data_by_id.pop(existing.id, None)
+
+            still_presents_ids.add(type_id)
+
+            if isinstance(row.data, LeanRecord):
+                data, md5_str = row.data
+            else:
+                data = row.data
+                md5_str = data
+
+            md5_hash = RecordService.get_record_hash(md5_str)
+            attributes = RecordService.get_row_attributes(row.attributes)
+
+            if existing:
+                # hash is stored as uuid with extra dashes, remove them when comparing hashes
+                if str(existing.md5_hash).replace("-", "") == md5_hash:
+                    # if ignored fields, name or sprite id changed, update them, but don't make a new record,
+                    # records saved before attributes were stored get them too
+                    data_changed = existing.data_hash != hashlib.md5(data.encode("utf-8")).hexdigest()
+                    if data_changed:
+                        updated_data_by_type_id[type_id] = data
+
+                    if (
+                        data_changed
+                        or existing.name != row.name
+                        or existing.sprite_id != row.sprite_id
+                        or (existing.missing_attributes and attributes is not None)
+                    ):
+                        updated_records[type_id] = {
+                            "id": existing.id,
+                            "data": data,
+                            "attributes": attributes,
+                            "name": row.name,
+                            "sprite_id": row.sprite_id,
+                        }
+
+                    continue
+
+                # new hash and data, previous record is no more the current
+                next_data_by_id[existing.id] = data
+
+            new_records[type_id] = {
+                "type": record_type,
+                "type_id": type_id,
+                "current": True,
+                "md5_hash": md5_hash,
+                "data": data,
+                "attributes": attributes,
+                "url": url,
+                "name": row.name,
+                "sprite_id": row.sprite_id,
+            }
+
+        # previous versions stored as delta against data about to be replaced are stored against the new data
+        if updated_data_by_type_id:
+            rebased_records = RecordService.get_rebased_records(record_type, updated_data_by_type_id)
+            if rebased_records:
+                db.session.execute(update(Record), rebased_records)
+
+        if next_data_by_id:
+            not_current_ids = list(next_data_by_id)
+            db.session.execute(
+                update(Record)
+                .where(Record.id == any_(bindparam("not_current_ids", not_current_ids, type_=ARRAY(Integer))))
+                .values(current=False),
+                execution_options={"synchronize_session": False},
+            )
+
+            compressed_records = RecordService.get_compressed_records(next_data_by_id)
+            if compressed_records:
+                db.session.execute(update(Record), compressed_records)
+
+        if updated_records:
+            db.session.execute(update(Record), list(updated_records.values()))
+
+        if new_records:
+            db.session.execute(insert(Record), list(new_records.values()))
+
+        RecordService.purge_old_records(record_type, still_presents_ids, commit=False)
         db.session.commit()
+        record_index.invalidate(record_type)
+
+        current_app.logger.info(
+            "%s: %d rows, %d new records, %d updated records",
+            record_type,
+            rows_count,
+            len(new_records),
+            len(updated_records),
+        )
 
     @staticmethod
-    def purge_old_records(record_type: TypeEnum, still_presents_ids: list[int]) -> None:
-        """Disable old records not presents in API."""
-        current_ids = Record.query.filter_by(type=record_type, current=True).with_entities(Record.type_id).all()
-        current_ids = [current_id[0] for current_id in current_ids]
-        no_more_presents_ids = list(set(current_ids) - set(still_presents_ids))
+    def get_history_delta(data: str, next_data: str) -> dict | None:
+        """Get the delta to store instead of the data of a previous version, None to keep the full data."""
+        if current_app.config["RECORD_HISTORY_MODE"] != "delta":
+            return None
+
+        return create_data_delta(data, next_data)
+
+    @staticmethod
+    def get_compressed_records(next_data_by_id: dict[int, str]) -> list[dict]:
+        """Get the values of previous versions to be stored as delta against their next version data."""
+        if current_app.config["RECORD_HISTORY_MODE"] != "delta":
+            return []
+
+        previous_records = db.session.query(Record.id, Record.data).where(
+            Record.id == any_(bindparam("previous_ids", list(next_data_by_id), type_=ARRAY(Integer))),
+            Record.delta.is_(None),
+        )
+
+        compressed_records = []
+        for previous_record in previous_records:
+            delta = create_data_delta(previous_record.data, next_data_by_id[previous_record.id])
+            if delta is not None:
+                compressed_records.append({"id": previous_record.id, "data": None, "delta": delta})
+
+        return compressed_records
+
+    @staticmethod
+    def get_rebased_records(record_type: TypeEnum, new_data_by_type_id: dict[int, str]) -> list[dict]:
+        """Get the values of previous versions stored as delta, before the data of their current record is replaced.
+
+        Their delta is against the current data, they are rebuilt from it and stored against the new data instead.
+        Must be called before the current records are updated.
+        """
+        type_ids = bindparam("type_ids", list(new_data_by_type_id), type_=ARRAY(Integer))
+        current_data_by_type_id = dict(
+            db.session.query(Record.type_id, Record.data).filter(
+                Record.type == record_type,
+                Record.type_id == any_(type_ids),
+                Record.current.is_(True),
+            ),
+        )
+
+        # the previous version of a current record is the latest one of its type id
+        previous_records = (
+            db.session.query(Record.id, Record.type_id, Record.delta)
+            .filter(Record.type == record_type, Record.type_id == any_(type_ids), Record.current.is_(False))
+            .distinct(Record.type_id)
+            .order_by(Record.type_id, Record.id.desc())
+        )
+
+        rebased_records = []
+        for previous_record in previous_records:
+            current_data = current_data_by_type_id.get(previous_record.type_id)
+            if previous_record.delta is None or current_data is None:
+                continue
+
+            rebased_records.append(
+                {
+                    "id": previous_record.id,
+                    **RecordService.rebase_delta(
+                        previous_record.delta,
+                        current_data,
+                        new_data_by_type_id[previous_record.type_id],
+                    ),
+                },
+            )
+
+        return rebased_records
+
+    @staticmethod
+    def rebase_delta(delta: dict, data: str, new_data: str) -> dict:
+        """Get the data and delta of a previous version stored as delta against data, to be stored against new data."""
+        previous_data = apply_data_delta(data, delta)
+
+        new_delta = RecordService.get_history_delta(previous_data, new_data)
+        if new_delta is None:
+            return {"data": previous_data, "delta": None}
+
+        return {"data": None, "delta": new_delta}
+
+    @staticmethod
+    def get_record_data(record: Record) -> str:
+        """Get the data of a record, a previous version stored as delta is rebuilt from the next versions."""
+        if record.delta is None:
+            return record.data
+
+        # deltas are chained up to the nearest next version stored with its data
+        deltas = [record.delta]
+        next_records = (
+            db.session.query(Record.data, Record.delta)
+            .filter(Record.type == record.type, Record.type_id == record.type_id, Record.id > record.id)
+            .order_by(Record.id)
+        )
+
+        for next_record in next_records:
+            if next_record.delta is None:
+                data = next_record.data
+                break
+
+            deltas.append(next_record.delta)
+        else:
+            msg = f"No next version with data to rebuild record {record.id}"
+            raise ValueError(msg)
+
+        for delta in reversed(deltas):
+            data = apply_data_delta(data, delta)
+
+        return data
+
+    @staticmethod
+    def iter_history(batch_size: int) -> Iterator[tuple[Row, str, str | None]]:
+        """Iterate over all records with their full data and the full data of their next version, if any."""
+        records = (
+            db.session.query(Record.id, Record.type, Record.type_id, Record.data, Record.delta)
+            .order_by(Record.type, Record.type_id, Record.id.desc())
+            .execution_options(yield_per=batch_size)
+        )
+
+        next_key = None
+        next_data = None
+        for record in records:
+            key = (record.type, record.type_id)
+            if key != next_key:
+                next_data = None
+
+            data = record.data if record.delta is None else apply_data_delta(next_data, record.delta)
+            yield record, data, next_data
+
+            next_key = key
+            next_data = data
+
+    @staticmethod
+    def get_record_hash(hash_input: str) -> str:
+        """Get the hex digest of a record hash input, with the configured algorithm."""
+        algorithm = current_app.config["RECORD_HASH_ALGORITHM"]
+
+        if algorithm == "md5":
+            return hashlib.md5(hash_input.encode("utf-8")).hexdigest()
+
+        if algorithm == "xxh128":
+            import xxhash
+
+            return xxhash.xxh128_hexdigest(hash_input.encode("utf-8"))
+
+        msg = f"Unknown record hash algorithm: {algorithm}"
+        raise ValueError(msg)
+
+    @staticmethod
+    def get_row_attributes(row: dict | None) -> dict | None:
+        """Get the attributes of a parsed API row to be stored with its record, without PixyShip custom fields."""
+        if row is None:
+            return None
+
+        return {key: value for key, value in row.items() if not key.startswith("pixyship_")}
+
+    @staticmethod
+    def get_record_attributes(record: Record | Row, parse_node: Callable[[Element], dict]) -> dict:
+        """Get the decoded attributes of a record, its XML data is only parsed for records saved without them."""
+        if record.attributes is not None:
+            return record.attributes
+
+        return parse_node(ET.fromstring(record.data))
+
+    @staticmethod
+    def purge_old_records(record_type: TypeEnum, still_presents_ids: Iterable[int], commit: bool = True) -> None:
+        """Disable old records not presents in API, in one statement."""
+        db.session.execute(
+            update(Record)
+            .where(
+                Record.type == record_type,
+                Record.current.is_(True),
+                Record.type_id != all_(bindparam("still_presents_ids", list(still_presents_ids), type_=ARRAY(Integer))),
+            )
+            .values(current=False),
+            execution_options={"synchronize_session": False},
+        )
 
-        for no_more_presents_id in no_more_presents_ids:
-            RecordService.set_not_current(record_type, no_more_presents_id)
+        if commit:
+            db.session.commit()
 
     def get_record_sprite_id(self, record_type: TypeEnum, type_id: int) -> int | None:
         """Get sprite date for the given record ID."""
@@ -1,12 +1,11 @@
-from xml.etree import ElementTree as ET
-
 from werkzeug.utils import cached_property
 
 from app.constants import RESEARCH_TYPE_MAP
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 
 
 class ResearchService(BaseService):
@@ -18,24 +17,19 @@ class ResearchService(BaseService):
     @cached_property
     def researches(self) -> dict[int, dict]:
         """Get researches data."""
-        researches = cache.get("researches")
-        if researches is None:
-            researches = self.get_researches_from_records()
-            cache.set("researches", researches)
-
-        return researches
+        return dataset_cache.get_or_build("researches", self.get_researches_from_records)
 
     def update_cache(self) -> None:
         """Load researches in cache."""
-        cache.set("researches", self.get_researches_from_records())
+        dataset_cache.set("researches", self.get_researches_from_records())
 
     def get_researches_from_records(self) -> dict[int, dict]:
         """Load researches from database."""
-        records = self.record_service.get_records_from_type(TypeEnum.RESEARCH)
+        records = self.record_service.iter_records_from_type(TypeEnum.RESEARCH)
 
         researches = {}
         for record in records:
-            research = PixelStarshipsApi.parse_research_node(ET.fromstring(record.data))
+            research = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_research_node)
             researches[record.type_id] = {
                 **research,
                 "id": record.type_id,
@@ -71,22 +65,18 @@ class ResearchService(BaseService):
 
         return researches
 
-    def update_researches(self) -> None:
+    def update_researches(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Update data and save records."""
-        pixel_starships_api = PixelStarshipsApi()
-        researches = pixel_starships_api.get_researches()
-        still_presents_ids = []
-
-        for research in researches:
-            record_id = int(research["ResearchDesignId"])
-            self.record_service.add_record(
-                TypeEnum.RESEARCH,
-                record_id,
-                research["ResearchName"],
-                int(research["ImageSpriteId"]),
-                research["pixyship_xml_element"],
-                pixel_starships_api.server,
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        researches = pixel_starships_api.iter_researches()
+        rows = (
+            RecordRow(
+                type_id=int(research["ResearchDesignId"]),
+                name=research["ResearchName"],
+                sprite_id=int(research["ImageSpriteId"]),
+                data=research["pixyship_record"],
+                attributes=research,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.RESEARCH, still_presents_ids)
+            for research in researches
+        )
+        self.record_service.add_records(TypeEnum.RESEARCH, rows, pixel_starships_api.server)
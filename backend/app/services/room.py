@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import math
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.constants import (
     CAPACITY_RATIO_MAP,
@@ -15,9 +14,10 @@ from app.constants import (
     ROOM_TYPE_MAP,
 )
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 from app.utils.pss import parse_price_from_pricestring, parse_requirement
 
 
@@ -30,36 +30,34 @@ class RoomService(BaseService):
     @cached_property
     def rooms(self) -> dict:
         """Get rooms data."""
-        rooms = cache.get("rooms")
-        if rooms is None:
-            rooms, _ = self.get_rooms_from_records()
-            cache.set("rooms", rooms)
-
-        return rooms
+        return dataset_cache.get_or_build("rooms", lambda: self.get_rooms_from_records()[0])
 
     @cached_property
     def rooms_by_name(self) -> dict:
         """Get rooms data by name."""
-        rooms_by_name = cache.get("rooms_by_name")
-        if rooms_by_name is None:
-            _, rooms_by_name = self.get_rooms_from_records()
-            cache.set("rooms_by_name", rooms_by_name)
+        return dataset_cache.get_or_build("rooms_by_name", lambda: self.get_rooms_from_records()[1])
 
-        return rooms_by_name
+    def get_rooms_by_ids(self, room_ids: list[int]) -> dict[int, dict]:
+        """Get some rooms by id, read alone from cache when possible, unknown ids are ignored."""
+        rooms = dataset_cache.get_entities("rooms", room_ids)
+        if rooms is None:
+            rooms = {room_id: self.rooms[room_id] for room_id in room_ids if room_id in self.rooms}
+
+        return rooms
 
     def update_cache(self) -> None:
         """Load rooms in cache."""
         rooms, rooms_by_name = self.get_rooms_from_records()
-        cache.set("rooms", rooms)
-        cache.set("rooms_by_name", rooms_by_name)
+        dataset_cache.set("rooms", rooms)
+        dataset_cache.set("rooms_by_name", rooms_by_name)
 
     def get_rooms_from_records(self) -> tuple[dict, dict]:
         """Load rooms from database."""
-        records = self.record_service.get_records_from_type(TypeEnum.ROOM)
+        records = self.record_service.iter_records_from_type(TypeEnum.ROOM)
 
         rooms = {}
         for record in records:
-            room = PixelStarshipsApi.parse_room_node(ET.fromstring(record.data))
+            room = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_room_node)
             missile_design = room["MissileDesign"]
 
             room_price, room_price_currency = parse_price_from_pricestring(room["PriceString"])
@@ -79,7 +77,12 @@ class RoomService(BaseService):
                 elif requirement["type"] == TypeEnum.RESEARCH:
                     requirement["object"] = self.research_service.researches[requirement["id"]]
                 else:
-                    requirement["object"] = self.record_service.get_record(requirement["type"], requirement["id"])
+                    requirement_record = self.record_service.get_record(requirement["type"], requirement["id"])
+                    if requirement_record:
+                        requirement["object"] = {
+                            "id": requirement_record.type_id,
+                            "name": requirement_record.name,
+                        }
 
             rooms[record.type_id] = {
                 "id": record.type_id,
@@ -149,23 +152,18 @@ class RoomService(BaseService):
         rooms_by_name = {room["name"]: room for room_id, room in rooms.items()}
         return rooms, rooms_by_name
 
-    def update_rooms(self) -> None:
+    def update_rooms(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Get rooms from API and save them in database."""
-        pixel_starships_api = PixelStarshipsApi()
-        rooms = pixel_starships_api.get_rooms()
-        still_presents_ids = []
-
-        for room in rooms:
-            record_id = int(room["RoomDesignId"])
-            self.record_service.add_record(
-                TypeEnum.ROOM,
-                record_id,
-                room["RoomName"],
-                int(room["ImageSpriteId"]),
-                room["pixyship_xml_element"],
-                pixel_starships_api.server,
-                ["AvailabilityMask"],
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        rooms = pixel_starships_api.iter_rooms()
+        rows = (
+            RecordRow(
+                type_id=int(room["RoomDesignId"]),
+                name=room["RoomName"],
+                sprite_id=int(room["ImageSpriteId"]),
+                data=room["pixyship_record"],
+                attributes=room,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.ROOM, still_presents_ids)
+            for room in rooms
+        )
+        self.record_service.add_records(TypeEnum.ROOM, rows, pixel_starships_api.server)
@@ -1,12 +1,12 @@
 import html
 import time
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 from app.utils.pss import parse_requirement
 
 
@@ -19,24 +19,19 @@ class ShipService(BaseService):
     @cached_property
     def ships(self) -> dict[int, dict]:
         """Get ships data."""
-        ships = cache.get("ships")
-        if ships is None:
-            ships = self.get_ships_from_records()
-            cache.set("ships", ships)
-
-        return ships
+        return dataset_cache.get_or_build("ships", self.get_ships_from_records)
 
     def update_cache(self) -> None:
         """Load ships in cache."""
-        cache.set("ships", self.get_ships_from_records())
+        dataset_cache.set("ships", self.get_ships_from_records())
 
     def get_ships_from_records(self) -> dict[int, dict]:
         """Load ships from database."""
-        records = self.record_service.get_records_from_type(TypeEnum.SHIP)
+        records = self.record_service.iter_records_from_type(TypeEnum.SHIP)
 
         ships = {}
         for record in records:
-            ship = PixelStarshipsApi.parse_ship_node(ET.fromstring(record.data))
+            ship = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_ship_node)
             starbux_cost, mineral_cost, points_cost, items_cost = self.parse_ship_unlock_costs(
                 ship["MineralCost"],
                 ship["StarbuxCost"],
@@ -130,25 +125,21 @@ class ShipService(BaseService):
             if (parsed := self.parse_requirement(unparsed_requirement.strip())) is not None
         ]
 
-    def update_ships(self) -> None:
+    def update_ships(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Get ships from API and save them in database."""
-        pixel_starships_api = PixelStarshipsApi()
-        ships = pixel_starships_api.get_ships()
-        still_presents_ids = []
-
-        for ship in ships:
-            record_id = int(ship["ShipDesignId"])
-            self.record_service.add_record(
-                TypeEnum.SHIP,
-                record_id,
-                ship["ShipDesignName"],
-                int(ship["MiniShipSpriteId"]),
-                ship["pixyship_xml_element"],
-                pixel_starships_api.server,
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        ships = pixel_starships_api.iter_ships()
+        rows = (
+            RecordRow(
+                type_id=int(ship["ShipDesignId"]),
+                name=ship["ShipDesignName"],
+                sprite_id=int(ship["MiniShipSpriteId"]),
+                data=ship["pixyship_record"],
+                attributes=ship,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.SHIP, still_presents_ids)
+            for ship in ships
+        )
+        self.record_service.add_records(TypeEnum.SHIP, rows, pixel_starships_api.server)
 
     def parse_requirement(self, requirement_string: str) -> dict | None:
         """Parse requirement asset."""
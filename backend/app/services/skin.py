@@ -1,13 +1,13 @@
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.constants import (
     RACES,
 )
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 
 
 class SkinService(BaseService):
@@ -19,36 +19,26 @@ class SkinService(BaseService):
     @cached_property
     def skins(self) -> dict[int, dict]:
         """Get skins data."""
-        skins = cache.get("skins")
-        if skins is None:
-            skins = self.get_skins_from_records()
-            cache.set("skins", skins)
-
-        return skins
+        return dataset_cache.get_or_build("skins", self.get_skins_from_records)
 
     @cached_property
     def skinsets(self) -> dict[int, dict]:
         """Get skinsets data."""
-        skinsets = cache.get("skinsets")
-        if skinsets is None:
-            skinsets = self.get_skinsets_from_db()
-            cache.set("skinsets", skinsets)
-
-        return skinsets
+        return dataset_cache.get_or_build("skinsets", self.get_skinsets_from_db)
 
     def update_cache(self) -> None:
         """Load skins in cache."""
-        cache.set("skins", self.get_skins_from_records())
-        cache.set("skinsets", self.get_skinsets_from_db())
+        dataset_cache.set("skins", self.get_skins_from_records())
+        dataset_cache.set("skinsets", self.get_skinsets_from_db())
 
     def get_skins_from_records(self) -> dict[int, dict]:
         """Load skins from database."""
-        skin_records = self.record_service.get_records_from_type(TypeEnum.SKIN)
+        skin_records = self.record_service.iter_records_from_type(TypeEnum.SKIN)
         skins = {}
 
         # for each skin, find the skinset and add name and description
         for skin_record in skin_records:
-            skin = PixelStarshipsApi.parse_skin_node(ET.fromstring(skin_record.data))
+            skin = self.record_service.get_record_attributes(skin_record, PixelStarshipsApi.parse_skin_node)
             skinset_id = int(skin["SkinSetId"])
 
             # if skinset is not in the skinsets, skip
@@ -74,13 +64,13 @@ class SkinService(BaseService):
 
     def get_skinsets_from_db(self) -> dict[int, dict]:
         """Load skinsets from database."""
-        skinset_records = self.record_service.get_records_from_type(TypeEnum.SKINSET)
+        skinset_records = self.record_service.iter_records_from_type(TypeEnum.SKINSET)
 
         skinsets = {}
 
         # retrieve all skinsets
         for skinset_record in skinset_records:
-            skinset = PixelStarshipsApi.parse_skinset_node(ET.fromstring(skinset_record.data))
+            skinset = self.record_service.get_record_attributes(skinset_record, PixelStarshipsApi.parse_skinset_node)
 
             skinsets[skinset_record.type_id] = {
                 "id": int(skinset["SkinSetId"]),
@@ -91,43 +81,34 @@ class SkinService(BaseService):
 
         return skinsets
 
-    def update_skinsets(self) -> None:
+    def update_skinsets(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Update skinsets and save records."""
-        pixel_starships_api = PixelStarshipsApi()
-        skinsets = pixel_starships_api.get_skinsets()
-        still_presents_ids = []
-
-        for skinset in skinsets:
-            record_id = int(skinset["SkinSetId"])
-            self.record_service.add_record(
-                TypeEnum.SKINSET,
-                record_id,
-                skinset["SkinSetName"],
-                int(skinset["SpriteId"]),
-                skinset["pixyship_xml_element"],
-                pixel_starships_api.server,
-                ["PurchaseCount", "ApprovalFlags"],
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        skinsets = pixel_starships_api.iter_skinsets()
+        rows = (
+            RecordRow(
+                type_id=int(skinset["SkinSetId"]),
+                name=skinset["SkinSetName"],
+                sprite_id=int(skinset["SpriteId"]),
+                data=skinset["pixyship_record"],
+                attributes=skinset,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.SKINSET, still_presents_ids)
+            for skinset in skinsets
+        )
+        self.record_service.add_records(TypeEnum.SKINSET, rows, pixel_starships_api.server)
 
-    def update_skins(self) -> None:
+    def update_skins(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Update skins and save records."""
-        pixel_starships_api = PixelStarshipsApi()
-        skins = pixel_starships_api.get_skins()
-        still_presents_ids = []
-
-        for skin in skins:
-            record_id = int(skin["SkinId"])
-            self.record_service.add_record(
-                TypeEnum.SKIN,
-                record_id,
-                skin["SkinName"],
-                int(skin["SpriteId"]),
-                skin["pixyship_xml_element"],
-                pixel_starships_api.server,
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        skins = pixel_starships_api.iter_skins()
+        rows = (
+            RecordRow(
+                type_id=int(skin["SkinId"]),
+                name=skin["SkinName"],
+                sprite_id=int(skin["SpriteId"]),
+                data=skin["pixyship_record"],
+                attributes=skin,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.SKIN, still_presents_ids)
+            for skin in skins
+        )
+        self.record_service.add_records(TypeEnum.SKIN, rows, pixel_starships_api.server)
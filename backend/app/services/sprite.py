@@ -1,10 +1,10 @@
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 
 
 class SpriteService(BaseService):
@@ -16,16 +16,11 @@ class SpriteService(BaseService):
     @cached_property
     def sprites(self) -> dict[int, dict]:
         """Get sprites data."""
-        sprites = cache.get("sprites")
-        if sprites is None:
-            sprites = self.get_sprites_from_records()
-            cache.set("sprites", sprites)
-
-        return sprites
+        return dataset_cache.get_or_build("sprites", self.get_sprites_from_records)
 
     def update_cache(self) -> None:
         """Load sprites in cache."""
-        cache.set("sprites", self.get_sprites_from_records())
+        dataset_cache.set("sprites", self.get_sprites_from_records())
 
     def get_sprite_infos(self, sprite_id: int) -> dict | None:
         """Get sprite infos from given id."""
@@ -45,11 +40,11 @@ class SpriteService(BaseService):
 
     def get_sprites_from_records(self) -> dict[int, dict]:
         """Load sprites from database."""
-        records = self.record_service.get_records_from_type(TypeEnum.SPRITE)
+        records = self.record_service.iter_records_from_type(TypeEnum.SPRITE)
 
         sprites = {}
         for record in records:
-            sprite = PixelStarshipsApi.parse_sprite_node(ET.fromstring(record.data))
+            sprite = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_sprite_node)
 
             sprites[record.type_id] = {
                 "image_file": int(sprite["ImageFileId"]),
@@ -62,22 +57,18 @@ class SpriteService(BaseService):
 
         return sprites
 
-    def update_sprites(self) -> None:
+    def update_sprites(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Update data and save records."""
-        pixel_starships_api = PixelStarshipsApi()
-        sprites = pixel_starships_api.get_sprites()
-        still_presents_ids = []
-
-        for sprite in sprites:
-            record_id = int(sprite["SpriteId"])
-            self.record_service.add_record(
-                TypeEnum.SPRITE,
-                record_id,
-                sprite["ImageFileId"],
-                int(sprite["SpriteId"]),
-                sprite["pixyship_xml_element"],
-                pixel_starships_api.server,
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        sprites = pixel_starships_api.iter_sprites()
+        rows = (
+            RecordRow(
+                type_id=int(sprite["SpriteId"]),
+                name=sprite["ImageFileId"],
+                sprite_id=int(sprite["SpriteId"]),
+                data=sprite["pixyship_record"],
+                attributes=sprite,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.SPRITE, still_presents_ids)
+            for sprite in sprites
+        )
+        self.record_service.add_records(TypeEnum.SPRITE, rows, pixel_starships_api.server)
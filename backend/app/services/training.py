@@ -1,10 +1,10 @@
 from functools import cached_property
-from xml.etree import ElementTree as ET
 
 from app.enums import TypeEnum
-from app.ext import cache
+from app.ext import dataset_cache
 from app.pixelstarshipsapi import PixelStarshipsApi
 from app.services.base import BaseService
+from app.services.record import RecordRow
 
 
 class TrainingService(BaseService):
@@ -16,24 +16,19 @@ class TrainingService(BaseService):
     @cached_property
     def trainings(self) -> dict[int, dict]:
         """Get trainings data."""
-        trainings = cache.get("trainings")
-        if trainings is None:
-            trainings = self.get_trainings_from_records()
-            cache.set("trainings", trainings)
-
-        return trainings
+        return dataset_cache.get_or_build("trainings", self.get_trainings_from_records)
 
     def update_cache(self) -> None:
         """Load trainings in cache."""
-        cache.set("trainings", self.get_trainings_from_records())
+        dataset_cache.set("trainings", self.get_trainings_from_records())
 
     def get_trainings_from_records(self) -> dict[int, dict]:
         """Load trainings from database."""
-        records = self.record_service.records[TypeEnum.TRAINING]
+        records = self.record_service.iter_records_from_type(TypeEnum.TRAINING)
 
         trainings = {}
-        for record in records.values():
-            training = PixelStarshipsApi.parse_training_node(ET.fromstring(record.data))
+        for record in records:
+            training = self.record_service.get_record_attributes(record, PixelStarshipsApi.parse_training_node)
 
             trainings[record.type_id] = {
                 "id": int(training["TrainingDesignId"]),
@@ -54,22 +49,18 @@ class TrainingService(BaseService):
 
         return trainings
 
-    def update_trainings(self) -> None:
+    def update_trainings(self, pixel_starships_api: PixelStarshipsApi | None = None) -> None:
         """Update data and save records."""
-        pixel_starships_api = PixelStarshipsApi()
-        trainings = pixel_starships_api.get_trainings()
-        still_presents_ids = []
-
-        for training in trainings:
-            record_id = int(training["TrainingDesignId"])
-            self.record_service.add_record(
-                TypeEnum.TRAINING,
-                record_id,
-                training["TrainingName"],
-                int(training["TrainingSpriteId"]),
-                training["pixyship_xml_element"],
-                pixel_starships_api.server,
+        pixel_starships_api = pixel_starships_api or PixelStarshipsApi()
+        trainings = pixel_starships_api.iter_trainings()
+        rows = (
+            RecordRow(
+                type_id=int(training["TrainingDesignId"]),
+                name=training["TrainingName"],
+                sprite_id=int(training["TrainingSpriteId"]),
+                data=training["pixyship_record"],
+                attributes=training,
             )
-            still_presents_ids.append(int(record_id))
-
-        self.record_service.purge_old_records(TypeEnum.TRAINING, still_presents_ids)
+            for training in trainings
+        )
+        self.record_service.add_records(TypeEnum.TRAINING, rows, pixel_starships_api.server)
@@ -1,17 +1,7 @@
-import time
-
-from flask import current_app
-
 from app.constants import RARITY_MAP
 from app.enums import TypeEnum
 
 
-def api_sleep(secs: float, force_sleep: bool = False) -> None:
-    """Sleep for a certain amount of time if the public API token is not set or if the staging API is used."""
-    if not current_app.config["SAVY_PUBLIC_API_TOKEN"] or current_app.config["USE_STAGING_API"] or force_sleep:
-        time.sleep(secs)
-
-
 def has_offstat(
     item_type: str,
     item_slot: str,
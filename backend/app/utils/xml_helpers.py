@@ -1,6 +1,16 @@
+from collections.abc import Iterator
+from typing import IO, NamedTuple
+from xml.etree import ElementTree as ET
 from xml.etree.ElementTree import Element
 
 
+class LeanRecord(NamedTuple):
+    """Serialized XML of an API row and its hash input, without the parsed tree."""
+
+    data: str
+    hash_input: str
+
+
 def sort_attributes(root: Element) -> None:
     """Sorts the attributes of all elements in the XML tree."""
     for el in root.iter():
@@ -9,3 +19,198 @@ def sort_attributes(root: Element) -> None:
             attribs = sorted(attrib.items())
             attrib.clear()
             attrib.update(attribs)
+
+
+def iter_children(source: IO[bytes], container_tag: str, release: bool = True) -> Iterator[Element]:
+    """Parse incrementally the XML source and yield each child of the first container_tag element once complete.
+
+    Yielded children are detached from the tree, and cleared when the next one is requested if release is set,
+    so only one child is kept in memory at a time.
+    """
+    container: Element | None = None
+    depth = 0
+
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if container is None:
+            if event == "start" and element.tag == container_tag:
+                container = element
+
+            continue
+
+        if event == "start":
+            depth += 1
+            continue
+
+        # end of the container, ignore the rest of the document
+        if element is container:
+            return
+
+        depth -= 1
+        if depth > 0:
+            continue
+
+        container.remove(element)
+        yield element
+
+        if release:
+            element.clear()
+
+    if container is None:
+        msg = f"{container_tag} not found in response"
+        raise ET.ParseError(msg)
+
+
+def copy_element(element: Element) -> Element:
+    """Copy an element with its own attributes, children are shared with the original element."""
+    copied = Element(element.tag, element.attrib)
+    copied.text = element.text
+    copied.tail = element.tail
+    copied.extend(element)
+
+    return copied
+
+
+def escape_text(text: str) -> str:
+    """Escape text content like ElementTree does."""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+
+    return text
+
+
+def escape_attribute(value: str) -> str:
+    """Escape an attribute value like ElementTree does."""
+    value = escape_text(value)
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    if "\r" in value:
+        value = value.replace("\r", "&#13;")
+    if "\n" in value:
+        value = value.replace("\n", "&#10;")
+    if "\t" in value:
+        value = value.replace("\t", "&#09;")
+
+    return value
+
+
+def serialize_attributes(attributes: list[tuple[str, str]]) -> str:
+    """Serialize sorted attributes of an element."""
+    return "".join(f' {name}="{escape_attribute(value)}"' for name, value in attributes)
+
+
+def serialize_content(element: Element, parts: list[str]) -> None:
+    """Serialize what follows the attributes of an element (text, children, closing tag and tail)."""
+    if element.text or len(element):
+        parts.append(">")
+        if element.text:
+            parts.append(escape_text(element.text))
+
+        for child in element:
+            parts.append(f"<{child.tag}{serialize_attributes(sorted(child.attrib.items()))}")
+            serialize_content(child, parts)
+
+        parts.append(f"</{element.tag}>")
+    else:
+        parts.append(" />")
+
+    if element.tail:
+        parts.append(escape_text(element.tail))
+
+
+def to_ascii(xml: str) -> str:
+    """Replace non ASCII characters by character references, like ElementTree default encoding."""
+    if xml.isascii():
+        return xml
+
+    return xml.encode("ascii", "xmlcharrefreplace").decode("ascii")
+
+
+def create_lean_record(element: Element, ignore_list: list[str] | None = None) -> LeanRecord:
+    """Serialize an element with sorted attributes, and get its hash input without the ignored attributes.
+
+    The tree is walked once and left untouched, the output is the same as ET.tostring after sort_attributes,
+    so hashes stay comparable with records saved before.
+    """
+    # since python 3.8, attrib order is now preserved, but we need a sorted order for legacy comparaisons
+    attributes = sorted(element.attrib.items())
+
+    # everything but the root attributes is shared by the data and the hash input
+    content: list[str] = []
+    serialize_content(element, content)
+    content_xml = "".join(content)
+
+    data = to_ascii(f"<{element.tag}{serialize_attributes(attributes)}{content_xml}")
+
+    ignored = set(ignore_list or ()) & element.attrib.keys()
+    if not ignored:
+        return LeanRecord(data, data.replace("\n", " "))
+
+    # ignore some fields for hashing
+    hash_attributes = [(name, value) for name, value in attributes if name not in ignored]
+    hash_input = to_ascii(f"<{element.tag}{serialize_attributes(hash_attributes)}{content_xml}")
+
+    return LeanRecord(data, hash_input.replace("\n", " "))
+
+
+def split_start_tag(data: str) -> tuple[str, str]:
+    """Split serialized XML after the tag name and attributes of the root element."""
+    # ">" is always escaped in attribute values, the first one closes the start tag
+    end = data.index(">")
+    if data[end - 1] == "/":
+        end -= 1
+
+    while data[end - 1] == " ":
+        end -= 1
+
+    return data[:end], data[end:]
+
+
+def create_data_delta(data: str, next_data: str) -> dict | None:
+    """Get the root attributes changes to rebuild the serialized XML of a record from its next version.
+
+    None is returned when the versions differ elsewhere than in root attributes, the full data must be kept.
+    """
+    if not data.startswith("<") or not next_data.startswith("<"):
+        return None
+
+    head, content = split_start_tag(data)
+    next_head, next_content = split_start_tag(next_data)
+    if content != next_content:
+        return None
+
+    try:
+        element = ET.fromstring(f"{head} />")
+        next_element = ET.fromstring(f"{next_head} />")
+    except ET.ParseError:
+        return None
+
+    if element.tag != next_element.tag:
+        return None
+
+    delta = {
+        "set": {name: value for name, value in element.attrib.items() if next_element.get(name) != value},
+        "unset": sorted(next_element.attrib.keys() - element.attrib.keys()),
+    }
+
+    # legacy data may not be serialized in the canonical way, keep it as is
+    if apply_data_delta(next_data, delta) != data:
+        return None
+
+    return delta
+
+
+def apply_data_delta(next_data: str, delta: dict) -> str:
+    """Rebuild the serialized XML of a record from its next version and its delta."""
+    next_head, content = split_start_tag(next_data)
+    element = ET.fromstring(f"{next_head} />")
+
+    for name in delta["unset"]:
+        element.attrib.pop(name, None)
+
+    element.attrib.update(delta["set"])
+
+    return to_ascii(f"<{element.tag}{serialize_attributes(sorted(element.attrib.items()))}") + content
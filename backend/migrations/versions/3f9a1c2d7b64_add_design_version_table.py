@@ -0,0 +1,30 @@
+"""Add design_version table
+
+Revision ID: 3f9a1c2d7b64
+Revises: c6df405d0ab3
+Create Date: 2026-10-18 09:12:37.514203
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3f9a1c2d7b64"
+down_revision = "c6df405d0ab3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "design_version",
+        sa.Column("type", postgresql.ENUM(name="type_enum", create_type=False), primary_key=True),
+        sa.Column("version", sa.TEXT, nullable=False),
+        sa.Column("imported_at", sa.TIMESTAMP, nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("design_version")
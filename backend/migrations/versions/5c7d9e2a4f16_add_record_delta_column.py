@@ -0,0 +1,34 @@
+"""Add Record delta column
+
+Revision ID: 5c7d9e2a4f16
+Revises: 8b2e5d41c9a7
+Create Date: 2026-10-18 16:21:07.532904
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "5c7d9e2a4f16"
+down_revision = "8b2e5d41c9a7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # previous versions of records can be stored as a delta against their next version, without data
+    op.add_column("record", sa.Column("delta", postgresql.JSONB(), nullable=True))
+    op.alter_column("record", "data", existing_type=sa.TEXT(), nullable=True)
+
+
+def downgrade():
+    # records stored as delta must be expanded first with `flask record expand-history`
+    connection = op.get_bind()
+    if connection.execute(sa.text("SELECT EXISTS (SELECT 1 FROM record WHERE data IS NULL)")).scalar():
+        msg = "Records stored as delta remain, run `flask record expand-history` before downgrading"
+        raise RuntimeError(msg)
+
+    op.alter_column("record", "data", existing_type=sa.TEXT(), nullable=False)
+    op.drop_column("record", "delta")
@@ -0,0 +1,27 @@
+"""Add Record attributes column
+
+Revision ID: 8b2e5d41c9a7
+Revises: 3f9a1c2d7b64
+Create Date: 2026-10-18 14:03:51.208417
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "8b2e5d41c9a7"
+down_revision = "3f9a1c2d7b64"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # add decoded attributes column to record table, filled by the next import
+    op.add_column("record", sa.Column("attributes", postgresql.JSONB(), nullable=True))
+
+
+def downgrade():
+    # remove decoded attributes column from record table
+    op.drop_column("record", "attributes")
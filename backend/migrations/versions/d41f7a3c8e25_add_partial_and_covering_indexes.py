@@ -0,0 +1,89 @@
+"""Add partial and covering indexes for records, listings and daily sales
+
+Revision ID: d41f7a3c8e25
+Revises: 5c7d9e2a4f16
+Create Date: 2026-10-18 17:42:19.803265
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d41f7a3c8e25"
+down_revision = "5c7d9e2a4f16"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # built concurrently, listing and record tables are large and written while the site is running
+    with op.get_context().autocommit_block():
+        # current records of a type, and joins of daily sales with current records
+        op.create_index(
+            "idx_record__type_type_id__current",
+            "record",
+            ["type", "type_id"],
+            postgresql_include=["name", "sprite_id"],
+            postgresql_where=sa.text("current"),
+            postgresql_concurrently=True,
+        )
+
+        # previous versions of a record, the most recent first
+        op.create_index(
+            "idx_record__type_type_id_created_at__not_current",
+            "record",
+            ["type", "type_id", sa.text("created_at DESC")],
+            postgresql_where=sa.text("NOT current"),
+            postgresql_concurrently=True,
+        )
+
+        # prices history and last sales of an item
+        op.create_index(
+            "idx_listing__item_id_sale_at__sold",
+            "listing",
+            ["item_id", sa.text("sale_at DESC")],
+            postgresql_include=["item_name", "currency", "amount", "price"],
+            postgresql_where=sa.text("amount > 0"),
+            postgresql_concurrently=True,
+        )
+
+        # prices summary of the last sales of all items
+        op.create_index(
+            "idx_listing__sale_at__sold",
+            "listing",
+            ["sale_at"],
+            postgresql_include=["item_id", "currency", "amount", "price"],
+            postgresql_where=sa.text("amount > 0"),
+            postgresql_concurrently=True,
+        )
+
+        # last known sale of an item, to only get new sales from API
+        op.create_index(
+            "idx_listing__item_id_id",
+            "listing",
+            ["item_id", sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+
+        # last sales of a shop, type and type_id lookups are served by uq_daily_sale
+        op.create_index(
+            "idx_daily_sale__sale_from_sale_at",
+            "daily_sale",
+            ["sale_from", sa.text("sale_at DESC")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("idx_daily_sale__sale_from_sale_at", table_name="daily_sale", postgresql_concurrently=True)
+        op.drop_index("idx_listing__item_id_id", table_name="listing", postgresql_concurrently=True)
+        op.drop_index("idx_listing__sale_at__sold", table_name="listing", postgresql_concurrently=True)
+        op.drop_index("idx_listing__item_id_sale_at__sold", table_name="listing", postgresql_concurrently=True)
+        op.drop_index(
+            "idx_record__type_type_id_created_at__not_current",
+            table_name="record",
+            postgresql_concurrently=True,
+        )
+        op.drop_index("idx_record__type_type_id__current", table_name="record", postgresql_concurrently=True)
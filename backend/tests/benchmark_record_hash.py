@@ -0,0 +1,80 @@
+"""Compare record serialization and hash algorithms on a sprite-list-sized input.
+
+Run from the backend directory: `python -m tests.benchmark_record_hash --rows 25000`.
+"""
+
+import random
+import time
+from collections.abc import Callable
+from xml.etree import ElementTree as ET
+from xml.etree.ElementTree import Element
+
+import click
+
+from app import create_app
+from app.services.record import RecordService
+from app.utils.xml_helpers import LeanRecord, copy_element, create_lean_record, sort_attributes
+
+
+def create_sprite_element(sprite_id: int) -> Element:
+    """Create a sprite design like the ones listed by PSS API."""
+    return Element(
+        "Sprite",
+        {
+            "SpriteId": str(sprite_id),
+            "ImageFileId": str(random.randint(1, 20000)),
+            "X": str(random.randint(0, 2048)),
+            "Y": str(random.randint(0, 2048)),
+            "Width": str(random.randint(1, 512)),
+            "Height": str(random.randint(1, 512)),
+            "SpriteKey": f"sprite_{sprite_id}_é",
+            "SpriteDesignId": str(sprite_id),
+            "ImageFileName": f"/images/sprite_{sprite_id}.png",
+            "ImageFileVersion": str(random.randint(1, 10)),
+            "PriceModifier": "0",
+            "MarketPrice": str(random.randint(1, 1000)),
+        },
+    )
+
+
+def create_legacy_lean_record(element: Element, ignore_list: list[str] | None = None) -> LeanRecord:
+    """Serialize an element the way records were hashed before the single-pass canonicalizer."""
+    sort_attributes(element)
+    data = ET.tostring(element).decode()
+
+    hash_element = copy_element(element)
+    for name in ignore_list or []:
+        hash_element.attrib.pop(name, None)
+
+    return LeanRecord(data, ET.tostring(hash_element).decode().replace("\n", " "))
+
+
+@click.command()
+@click.option("--rows", type=int, default=25000, help="Number of sprites, about the size of the PSS sprite list")
+def benchmark_record_hash(rows: int) -> None:
+    """Time the serialization and the hash of a sprite-list-sized input."""
+    elements = [create_sprite_element(sprite_id) for sprite_id in range(rows)]
+    ignore_list = ["MarketPrice"]
+
+    def run(name: str, func: Callable[[], object]) -> None:
+        start_time = time.perf_counter()
+        func()
+        elapsed_time = time.perf_counter() - start_time
+        click.echo(f"{name}: {elapsed_time:.3f}s ({rows / elapsed_time:.0f} rows/s)")
+
+    run("serialize (legacy)", lambda: [create_legacy_lean_record(element, ignore_list) for element in elements])
+    run("serialize (single pass)", lambda: [create_lean_record(element, ignore_list) for element in elements])
+
+    hash_inputs = [create_lean_record(element, ignore_list).hash_input for element in elements]
+    for algorithm in ("md5", "xxh128"):
+        # each algorithm gets its own app, the configuration of a running app is never changed
+        app = create_app({"TESTING": True, "CACHE_TYPE": "SimpleCache", "RECORD_HASH_ALGORITHM": algorithm})
+        with app.app_context():
+            try:
+                run(f"hash ({algorithm})", lambda: [RecordService.get_record_hash(value) for value in hash_inputs])
+            except ImportError:
+                click.echo(f"hash ({algorithm}): not available")
+
+
+if __name__ == "__main__":
+    benchmark_record_hash()
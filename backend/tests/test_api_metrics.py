@@ -0,0 +1,74 @@
+import io
+
+import pytest
+from requests import Response
+from urllib3 import HTTPResponse
+
+from app import create_app
+from app.ext import api_metrics
+from app.ext.api_metrics import InMemoryMetricsSink
+
+ENDPOINT_URL = "https://api.pixelstarships.com/ItemService/ListItemDesigns2?languageKey=en"
+
+
+@pytest.fixture
+def app():
+    """Create an app without Redis, metrics are kept in the process."""
+    return create_app({"TESTING": True, "CACHE_TYPE": "SimpleCache", "PSS_METRICS_LATENCY_BUCKETS": (0.1, 1)})
+
+
+def make_response(status_code: int, body: bytes = b"") -> Response:
+    response = Response()
+    response.url = ENDPOINT_URL
+    response.status_code = status_code
+    response.raw = HTTPResponse(body=io.BytesIO(body), status=status_code, preload_content=False)
+    return response
+
+
+def test_api_metrics_aggregate_by_endpoint(app):
+    with app.app_context():
+        api_metrics.reset()
+
+        response = make_response(200, b"<ItemService />")
+        response.raw.read()
+        api_metrics.observe_response(response, 0.05)
+        api_metrics.observe_response(make_response(429), 2.0, stream=True)
+        api_metrics.observe_parse_time(response, 0.01)
+        api_metrics.observe_token_retry(response)
+
+        stats = api_metrics.stats()["ItemService/ListItemDesigns2"]
+
+        assert stats["requests"] == 2
+        assert stats["statuses"] == {"200": 1, "429": 1}
+        assert stats["latency"]["max"] == 2.0
+        assert stats["latency_histogram"] == {"0.1": 1, "inf": 1}
+        assert stats["bytes"]["sum"] == len(b"<ItemService />")
+        assert stats["bytes"]["count"] == 1
+        assert stats["parse_time"]["sum"] == 0.01
+        assert stats["token_retries"] == 1
+
+
+def test_api_metrics_custom_sink(app):
+    with app.app_context():
+        sink = api_metrics.create_sink("app.ext.api_metrics:InMemoryMetricsSink")
+
+        assert isinstance(sink, InMemoryMetricsSink)
+
+
+def test_api_metrics_default_sink_without_redis(app):
+    with app.app_context():
+        assert isinstance(api_metrics.create_sink(None), InMemoryMetricsSink)
+
+
+def test_api_stats_command(app):
+    with app.app_context():
+        api_metrics.reset()
+        api_metrics.observe_response(make_response(200), 0.2)
+
+    result = app.test_cli_runner().invoke(args=["check", "api-stats", "--reset"])
+
+    assert "ItemService/ListItemDesigns2" in result.output
+    assert "requests = 1 (200: 1)" in result.output
+
+    with app.app_context():
+        assert api_metrics.stats() == {}
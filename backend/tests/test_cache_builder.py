@@ -0,0 +1,56 @@
+from concurrent.futures import Future
+
+import pytest
+
+from app.services.cache_builder import CACHE_TYPES, CacheBuilder
+
+
+def create_submit(updated: list[str], failing: str | None = None):
+    """Create a submit function updating types instantly, in the given list."""
+
+    def submit(name: str) -> Future:
+        future: Future = Future()
+        if name == failing:
+            future.set_exception(ValueError(name))
+        else:
+            updated.append(name)
+            future.set_result(1.0)
+
+        return future
+
+    return submit
+
+
+def test_get_types_with_unknown_type():
+    assert CacheBuilder.get_types(None) == list(CACHE_TYPES)
+    assert CacheBuilder.get_types(["item", "sprite"]) == ["item", "sprite"]
+
+    with pytest.raises(ValueError, match="weapon"):
+        CacheBuilder.get_types(["item", "weapon"])
+
+
+def test_schedule_updates_types_after_their_dependencies(app):
+    updated: list[str] = []
+
+    with app.app_context():
+        durations = CacheBuilder.schedule(list(CACHE_TYPES), create_submit(updated), None)
+
+    assert durations.keys() == CACHE_TYPES.keys()
+    for name, (_, dependencies) in CACHE_TYPES.items():
+        assert all(updated.index(dependency) < updated.index(name) for dependency in dependencies)
+
+
+def test_schedule_skips_types_built_from_a_failed_type(app):
+    updated: list[str] = []
+    reported: dict[str, float | None] = {}
+
+    with app.app_context(), pytest.raises(RuntimeError, match="room"):
+        CacheBuilder.schedule(
+            ["sprite", "research", "room", "ship", "craft"],
+            create_submit(updated, failing="room"),
+            reported.__setitem__,
+        )
+
+    assert updated == ["sprite", "research", "craft"]
+    assert reported["room"] is None
+    assert reported["ship"] is None
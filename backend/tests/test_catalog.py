@@ -0,0 +1,105 @@
+import gzip
+import json
+
+import pytest
+
+from app import create_app
+from app.blueprints.api import catalog_response
+from app.ext import dataset_cache
+from app.services.catalog import CatalogService
+
+
+@pytest.fixture
+def app():
+    """Create an app without Redis, catalogs are kept in the Flask cache."""
+    return create_app({"TESTING": True, "CACHE_TYPE": "SimpleCache"})
+
+
+@pytest.fixture
+def catalog_service(monkeypatch):
+    """Catalog service returning items without database."""
+    catalog_service = CatalogService()
+    monkeypatch.setitem(catalog_service.catalogs, "items", lambda: {"1": {"name": "Gun"}})
+    monkeypatch.setattr("app.blueprints.api.CatalogService", lambda: catalog_service)
+
+    return catalog_service
+
+
+def test_catalog_bodies_are_compressed(app, catalog_service):
+    with app.app_context():
+        bodies = catalog_service.create_response("items")["bodies"]
+
+    assert bodies.keys() == {"identity", "gzip"}
+    assert json.loads(bodies["identity"])["data"] == {"1": {"name": "Gun"}}
+    assert gzip.decompress(bodies["gzip"]) == bodies["identity"]
+
+
+def test_catalog_body_matches_serialized_response(app, catalog_service):
+    with app.app_context():
+        body = catalog_service.create_response("items")["bodies"]["identity"]
+        response = json.loads(body)
+
+        assert response["status"] == "success"
+        assert body == f"{app.json.dumps(response)}\n".encode()
+
+
+def test_catalog_bodies_with_unknown_encoding(app, catalog_service):
+    app.config["CATALOG_ENCODINGS"] = ("zstd",)
+
+    with app.app_context(), pytest.raises(ValueError, match="zstd"):
+        catalog_service.create_response("items")
+
+
+@pytest.mark.usefixtures("catalog_service")
+def test_catalog_response_encoding(app):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, deflate"}):
+        response = catalog_response("items")
+
+        assert response.content_encoding == "gzip"
+        assert "Accept-Encoding" in response.vary
+        assert json.loads(gzip.decompress(response.get_data()))["data"] == {"1": {"name": "Gun"}}
+
+    with app.test_request_context(headers={"Accept-Encoding": "gzip;q=0, identity"}):
+        response = catalog_response("items")
+
+        assert response.content_encoding is None
+        assert "Accept-Encoding" in response.vary
+        assert response.mimetype == "application/json"
+        assert json.loads(response.get_data())["data"] == {"1": {"name": "Gun"}}
+
+
+def test_catalog_response_is_kept_while_data_is_unchanged(app, catalog_service):
+    with app.app_context():
+        response = catalog_service.get_response("items")
+        dataset_cache.set("catalog:items", catalog_service.create_response("items"))
+
+        assert catalog_service.get_response("items") == response
+
+        catalog_service.catalogs["items"] = lambda: {"1": {"name": "Laser"}}
+        dataset_cache.set("catalog:items", catalog_service.create_response("items"))
+
+        assert catalog_service.get_response("items")["etag"] != response["etag"]
+
+
+@pytest.mark.usefixtures("catalog_service")
+def test_catalog_response_not_modified(client):
+    response = client.get("/api/items", headers={"Accept-Encoding": "gzip"})
+    etag, _ = response.get_etag()
+    last_modified = response.headers["Last-Modified"]
+
+    response = client.get("/api/items", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{etag}"'})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    # another encoding is another representation
+    assert client.get("/api/items", headers={"If-None-Match": f'"{etag}"'}).status_code == 200
+    assert client.get("/api/items", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+
+def test_json_response_not_modified(client):
+    response = client.get("/health")
+    etag, _ = response.get_etag()
+
+    assert etag is not None
+    assert client.get("/health", headers={"If-None-Match": f'"{etag}"'}).status_code == 304
+    assert client.get("/health", headers={"If-None-Match": '"other"'}).data == b'{"status":"ok"}\n'
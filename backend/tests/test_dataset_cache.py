@@ -0,0 +1,258 @@
+import threading
+import time
+
+import pytest
+import redis
+
+from app import create_app
+from app.ext import dataset_cache, redis_client
+from app.ext.dataset_cache import DatasetCache
+
+
+@pytest.fixture
+def app():
+    """Create an app without Redis, datasets are kept in the Flask cache."""
+    return create_app({"TESTING": True, "CACHE_TYPE": "SimpleCache", "DATASET_CACHE_MAX_BYTES": 100})
+
+
+@pytest.fixture
+def redis_app(monkeypatch):
+    """Create an app using an in-memory Redis server, invalidations are only listened to by the tests starting it."""
+    fakeredis = pytest.importorskip("fakeredis")
+    connection = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr(redis.Redis, "from_url", lambda _url, **_kwargs: connection)
+
+    return create_app({"TESTING": True, "CACHE_TYPE": "RedisCache", "DATASET_CACHE_INVALIDATIONS": False})
+
+
+def create_worker(app, **config) -> DatasetCache:
+    """Create the dataset cache of a worker process, sharing the Redis server of the app."""
+    app.config.update(config)
+    datasets = DatasetCache()
+    datasets.init_app(app)
+    return datasets
+
+
+def test_dataset_cache_without_redis_uses_flask_cache(app):
+    with app.app_context():
+        assert dataset_cache.get("items") is None
+
+        dataset_cache.set("items", {1: {"name": "Gun"}})
+
+        assert dataset_cache.get("items") == {1: {"name": "Gun"}}
+
+
+def test_dataset_cache_evicts_least_recently_used_datasets(app):
+    datasets = DatasetCache()
+    datasets.init_app(app)
+
+    datasets.set_local("items", 1, "items", 40)
+    datasets.set_local("sprites", 1, "sprites", 40)
+    assert datasets.get_local("items", 1) == "items"
+
+    datasets.set_local("characters", 1, "characters", 40)
+    datasets.set_local("changes", 1, "changes", 200)
+
+    assert datasets.get_local("items", 1) == "items"
+    assert datasets.get_local("characters", 1) == "characters"
+    assert datasets.get_local("sprites", 1) is None
+    assert datasets.get_local("changes", 1) is None
+
+
+def test_dataset_cache_ignores_previous_generation(app):
+    datasets = DatasetCache()
+    datasets.init_app(app)
+
+    datasets.set_local("items", 1, "items", 40)
+
+    assert datasets.get_local("items", 2) is None
+
+
+def test_dataset_cache_serves_previous_generation_until_new_one_is_loaded(app, monkeypatch):
+    datasets = DatasetCache()
+    datasets.init_app(app)
+    datasets.set_local("items", 1, "items v1", 40)
+
+    def load(key, generation):
+        # the new generation isn't ready yet
+        assert datasets.get_local(key, 1) == "items v1"
+        datasets.set_local(key, generation, "items v2", 40)
+
+    monkeypatch.setattr(datasets, "load", load)
+    datasets.handle_invalidation({"key": "items", "generation": 2})
+    datasets.handle_invalidation({"key": "items", "generation": 1})
+
+    assert datasets.get_local("items", 2) == "items v2"
+
+    datasets.set_local("items", 1, "items v1", 40)
+    assert datasets.get_local("items", 2) == "items v2"
+
+    datasets.handle_invalidation({"key": None})
+    assert datasets.get_local("items", 2) is None
+
+
+def test_dataset_cache_announced_generation_expires(app):
+    datasets = DatasetCache()
+    datasets.init_app(app)
+
+    datasets.set_local("items", 1, "items", 40)
+    datasets.set_generation("items", 1)
+    assert datasets.get_valid_entry("items").value == "items"
+
+    # no new generation announced, but the dataset expired and must be built again
+    datasets.set_local("items", 2, "items", 40, expires_at=time.monotonic() - 1)
+    datasets.set_generation("items", 2)
+    assert datasets.get_valid_entry("items") is None
+
+
+def test_dataset_cache_builds_missing_dataset_once(app):
+    builds = []
+    building = threading.Event()
+
+    def build():
+        builds.append(1)
+        building.set()
+        time.sleep(0.2)
+        return {1: {"name": "Gun"}}
+
+    with app.app_context():
+        builder = threading.Thread(target=lambda: dataset_cache.get_or_build("items", build))
+        builder.start()
+        building.wait()
+
+        assert dataset_cache.get_or_build("items", build) == {1: {"name": "Gun"}}
+        builder.join()
+
+        assert len(builds) == 1
+        assert dataset_cache.lock_stats()["items"] == {
+            "builds": 1,
+            "contended": 1,
+            "stale": 0,
+            "waited": 1,
+            "timeouts": 0,
+        }
+
+
+def test_dataset_cache_serves_stale_dataset_while_building(app):
+    building = threading.Event()
+    built = threading.Event()
+
+    def build():
+        building.set()
+        built.wait(5)
+        return "items v2"
+
+    with app.app_context():
+        dataset_cache.set_local("items", 1, "items v1", 40)
+
+        builder = threading.Thread(target=lambda: dataset_cache.get_or_build("items", build))
+        builder.start()
+        building.wait()
+
+        assert dataset_cache.get_or_build("items", build) == "items v1"
+        built.set()
+        builder.join()
+
+        assert dataset_cache.get("items") == "items v2"
+        assert dataset_cache.lock_stats()["items"]["stale"] == 1
+
+
+def test_dataset_cache_gets_entities_by_id(app):
+    with app.app_context():
+        assert dataset_cache.get_entities("items", [1]) is None
+
+        dataset_cache.set("items", {1: {"name": "Gun"}, 2: {"name": "Laser"}, 3: {"name": "Shield"}})
+
+        assert dataset_cache.get_entities("items", [3, 1, 4]) == {3: {"name": "Shield"}, 1: {"name": "Gun"}}
+
+
+def test_dataset_cache_switches_to_newer_generations_only(redis_app):
+    datasets = create_worker(redis_app)
+    connection = redis_client.connection
+
+    datasets.set("items", {1: {"name": "Gun"}})
+    datasets.set("items", {1: {"name": "Laser"}})
+
+    assert int(connection.get(DatasetCache.get_generation_key("items"))) == 2
+    assert 0 < connection.ttl(DatasetCache.get_generation_key("items")) <= redis_app.config["CACHE_DEFAULT_TIMEOUT"]
+    # the previous generation is kept a little longer for workers still loading it
+    assert 0 < connection.ttl(DatasetCache.get_data_key("items", 1)) <= 60
+    assert 0 < connection.ttl(DatasetCache.get_entities_key("items", 1)) <= 60
+
+    # an older generation stored late doesn't replace the current one
+    switched = datasets._switch_generation_script(  # noqa: SLF001
+        keys=[DatasetCache.get_generation_key("items")],
+        args=[1, f"{DatasetCache.KEY_PREFIX}items:", 60, 600],
+    )
+    assert switched == 0
+    assert int(connection.get(DatasetCache.get_generation_key("items"))) == 2
+
+    with redis_app.app_context():
+        assert create_worker(redis_app).get("items") == {1: {"name": "Laser"}}
+
+
+def test_dataset_cache_gets_entities_from_redis_hash(redis_app):
+    create_worker(redis_app).set("items", {1: {"name": "Gun"}, 2: {"name": "Laser"}, 3: {"name": "Shield"}})
+    worker = create_worker(redis_app)
+
+    assert worker.get_entities("items", [3, 1, 4]) == {3: {"name": "Shield"}, 1: {"name": "Gun"}}
+    # only the requested entities are read, the whole dataset isn't loaded
+    assert worker.get_local("items", 1) is None
+    assert worker.get_entities("characters", [1]) is None
+
+
+def test_dataset_cache_listener_loads_announced_generation(redis_app):
+    builder = create_worker(redis_app)
+    worker = create_worker(redis_app, DATASET_CACHE_INVALIDATIONS=True)
+
+    with redis_app.app_context():
+        builder.set("sprites", "sprites v1")
+        assert worker.get("sprites") == "sprites v1"
+
+        deadline = time.monotonic() + 5
+        while not worker._subscription and time.monotonic() < deadline:  # noqa: SLF001
+            time.sleep(0.01)
+
+        builder.set("sprites", "sprites v2")
+
+        while worker.get_local("sprites", 2) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # loaded in background, then served without checking Redis
+        assert worker.get_local("sprites", 2) == "sprites v2"
+        assert worker.get_valid_entry("sprites").generation == 2
+
+
+def test_dataset_cache_build_lock_is_shared_by_processes(redis_app):
+    builder = create_worker(redis_app)
+    worker = create_worker(redis_app)
+
+    token = builder.acquire_build_lock("items")
+    assert token is not None
+    assert redis_client.connection.ttl(DatasetCache.get_lock_key("items")) > 0
+
+    assert worker.acquire_build_lock("items") is None
+    assert worker.is_building("items")
+
+    # a lock taken over after expiring isn't released by its previous holder
+    redis_client.connection.set(DatasetCache.get_lock_key("items"), "other builder")
+    builder.release_build_lock("items", token)
+    assert worker.is_building("items")
+
+    redis_client.connection.delete(DatasetCache.get_lock_key("items"))
+    worker_token = worker.acquire_build_lock("items")
+    assert worker_token is not None
+    worker.release_build_lock("items", worker_token)
+    assert not worker.is_building("items")
+
+
+def test_dataset_cache_gets_stale_generation_from_counter(redis_app):
+    create_worker(redis_app).set("sprites", "sprites v1")
+    # the dataset expired, its last generation is still stored
+    redis_client.connection.delete(DatasetCache.get_generation_key("sprites"))
+    worker = create_worker(redis_app)
+
+    with redis_app.app_context():
+        assert worker.get("sprites") is None
+        assert worker.get_stale("sprites") == "sprites v1"
+        assert worker.get_stale("characters") is None
@@ -0,0 +1,23 @@
+from app.enums import TypeEnum
+from app.services.design_version import DesignVersionService
+
+
+def test_get_design_version_from_api_settings():
+    api_settings = {"ItemDesignVersion": "1289", "MissileDesignVersion": "23"}
+
+    version = DesignVersionService.get_design_version_from_api_settings(TypeEnum.MISSILE, api_settings)
+
+    assert version == "1289/23"
+
+
+def test_get_design_version_from_api_settings_with_missing_version():
+    api_settings = {"ItemDesignVersion": "1289"}
+
+    version = DesignVersionService.get_design_version_from_api_settings(TypeEnum.MISSILE, api_settings)
+
+    assert version is None
+
+
+def test_unknown_design_version_is_never_imported(app):
+    with app.app_context():
+        assert not DesignVersionService.is_design_version_imported(TypeEnum.ITEM, None)
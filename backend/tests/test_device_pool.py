@@ -0,0 +1,126 @@
+import datetime
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from app import create_app
+from app.ext.device_pool import DevicePool
+from app.pixelstarshipsapi import PixelStarshipsApi
+
+
+class FakePixelStarshipsApi:
+    """Fake API giving devices."""
+
+    base_url = "https://api.example.com"
+
+    @staticmethod
+    def get_devices() -> list:
+        """Get two devices with expired tokens."""
+        expired_at = datetime.datetime(2020, 1, 1)  # noqa: DTZ001
+        return [
+            SimpleNamespace(key=key, checksum="checksum", client_datetime=None, token=None, expires_at=expired_at)
+            for key in ("device-1", "device-2")
+        ]
+
+
+@pytest.fixture
+def app():
+    """Create an app without Redis, tokens are only kept in memory."""
+    return create_app({"TESTING": True, "CACHE_TYPE": "SimpleCache"})
+
+
+@pytest.fixture
+def logins(monkeypatch):
+    """Log devices in without the API, returning the logged in devices keys."""
+    logins = []
+
+    def login_device(_base_url: str, device_key: str, _client_datetime: datetime.datetime, _checksum: str) -> str:
+        logins.append(device_key)
+        return f"{device_key}-token-{len(logins)}"
+
+    monkeypatch.setattr(PixelStarshipsApi, "login_device", staticmethod(login_device))
+    return logins
+
+
+class FakeSession:
+    """Fake database session keeping the updated tokens."""
+
+    def __init__(self) -> None:
+        self.saved_tokens = []
+
+    def query(self, _model: type) -> "FakeSession":
+        """Query a model."""
+        return self
+
+    def filter_by(self, **_filters: str) -> "FakeSession":
+        """Filter the query."""
+        return self
+
+    def update(self, values: dict) -> None:
+        """Keep the updated token."""
+        self.saved_tokens.append(values["token"])
+
+    def commit(self) -> None:
+        """Commit nothing."""
+
+
+@pytest.fixture
+def saved_tokens(monkeypatch):
+    """Keep the tokens saved in database in a list."""
+    session = FakeSession()
+    monkeypatch.setattr(sys.modules[DevicePool.__module__], "db", SimpleNamespace(session=session))
+    return session.saved_tokens
+
+
+@pytest.fixture
+def device_pool(app, monkeypatch, saved_tokens):  # noqa: ARG001
+    """Create a device pool without database writes."""
+    monkeypatch.setattr(DevicePool, "start_renewal", lambda _self: None)
+
+    device_pool = DevicePool()
+    device_pool.init_app(app)
+    return device_pool
+
+
+@pytest.mark.usefixtures("logins")
+def test_lease_renews_expired_token(app, device_pool):
+    pixel_starships_api = FakePixelStarshipsApi()
+
+    with app.app_context(), device_pool.lease(pixel_starships_api) as device:
+        assert device.token == "device-1-token-1"
+        assert not device.expires_within(datetime.timedelta(hours=1))
+
+
+def test_lease_reuses_valid_tokens(app, device_pool, logins):
+    pixel_starships_api = FakePixelStarshipsApi()
+
+    with app.app_context():
+        leased_keys = []
+        for _ in range(4):
+            with device_pool.lease(pixel_starships_api) as device:
+                leased_keys.append(device.key)
+
+    assert leased_keys == ["device-1", "device-2", "device-1", "device-2"]
+    assert logins == ["device-1", "device-2"]
+
+
+@pytest.mark.usefixtures("logins")
+def test_concurrent_leases_get_different_devices(app, device_pool):
+    pixel_starships_api = FakePixelStarshipsApi()
+
+    with (
+        app.app_context(),
+        device_pool.lease(pixel_starships_api) as first_device,
+        device_pool.lease(pixel_starships_api) as second_device,
+    ):
+        assert first_device.key != second_device.key
+
+
+def test_failed_login_is_not_saved(app, device_pool, saved_tokens, monkeypatch):
+    monkeypatch.setattr(PixelStarshipsApi, "login_device", staticmethod(lambda *_args: None))
+
+    with app.app_context(), device_pool.lease(FakePixelStarshipsApi()) as device:
+        assert device.token is None
+
+    assert saved_tokens == []
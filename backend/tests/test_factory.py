@@ -24,3 +24,5 @@ def test_config(app):
     assert "USE_STAGING_API" in app.config
     assert "SAVY_PUBLIC_API_TOKEN" in app.config
     assert "DEVICE_LOGIN_CHECKSUM_KEY" in app.config
+    assert "PSS_HTTP_CONNECT_TIMEOUT" in app.config
+    assert "PSS_HTTP_READ_TIMEOUT" in app.config
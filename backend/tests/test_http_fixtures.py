@@ -0,0 +1,41 @@
+import requests
+
+from app.ext.http_fixtures import MISSING_FIXTURE_BODY, FixtureStore, ReplayAdapter, Replayer
+
+URL = "https://api.pixelstarships.com/ItemService/ListItemDesigns2?languageKey=en&accessToken=abc"
+
+
+def test_fixture_key_ignores_volatile_params(tmp_path):
+    store = FixtureStore(tmp_path)
+
+    assert store.get_path("GET", URL) == store.get_path("GET", URL.replace("abc", "def"))
+    assert store.get_path("GET", URL) != store.get_path("GET", URL.replace("en", "fr"))
+
+
+def test_replay_adapter_streams_recorded_response(tmp_path):
+    store = FixtureStore(tmp_path)
+    store.save("GET", URL, 200, "text/xml; charset=utf-8", "<ItemService><Item /></ItemService>")
+
+    session = requests.Session()
+    session.mount("https://", ReplayAdapter(Replayer(store)))
+
+    response = session.get(URL.replace("abc", "def"), stream=True)
+
+    assert response.status_code == 200
+    assert response.raw.read() == b"<ItemService><Item /></ItemService>"
+
+
+def test_replay_missing_fixture(tmp_path):
+    status, _content_type, body = Replayer(FixtureStore(tmp_path)).replay("GET", URL)
+
+    assert status == 404
+    assert body == MISSING_FIXTURE_BODY.encode()
+
+
+def test_replay_throttling(tmp_path):
+    store = FixtureStore(tmp_path)
+    store.save("GET", URL, 200, "text/xml", "<ItemService />")
+    replayer = Replayer(store, throttle_rate=0.001, throttle_status=429)
+
+    assert replayer.replay("GET", URL)[0] == 200
+    assert replayer.replay("GET", URL)[0] == 429
@@ -0,0 +1,32 @@
+from requests.adapters import HTTPAdapter
+
+from app.ext import http_session
+
+
+def test_http_session_is_reused(app):
+    with app.app_context():
+        session = http_session.session
+
+        assert http_session.session is session
+
+
+def test_http_session_adapter_configuration(app):
+    with app.app_context():
+        adapter = http_session.session.get_adapter("https://api.pixelstarships.com/")
+
+        assert isinstance(adapter, HTTPAdapter)
+        assert adapter._pool_maxsize == app.config["PSS_HTTP_POOL_MAXSIZE"]  # noqa: SLF001
+        assert adapter._pool_block == app.config["PSS_HTTP_POOL_BLOCK"]  # noqa: SLF001
+        assert adapter.max_retries.total == app.config["PSS_HTTP_RETRY_TOTAL"]
+        assert "POST" not in adapter.max_retries.allowed_methods
+        assert http_session.timeout == (
+            app.config["PSS_HTTP_CONNECT_TIMEOUT"],
+            app.config["PSS_HTTP_READ_TIMEOUT"],
+        )
+
+
+def test_http_session_stats_without_requests(app):
+    with app.app_context():
+        http_session.close()
+
+        assert http_session.stats() == {}
@@ -0,0 +1,40 @@
+import threading
+from types import SimpleNamespace
+
+from app.pixelstarshipsapi_async import AsyncPixelStarshipsApi
+
+
+def test_crawl_handles_results_in_calling_thread(app):
+    with app.app_context():
+        async_pixel_starships_api = AsyncPixelStarshipsApi(SimpleNamespace(), concurrency=4)
+
+        caller_thread = threading.current_thread()
+        results = {}
+
+        def save_result(item: int, result: int) -> None:
+            assert threading.current_thread() is caller_thread
+            results[item] = result
+
+        async_pixel_starships_api.crawl(lambda item: item * 2, range(20), save_result)
+
+        assert results == {item: item * 2 for item in range(20)}
+
+
+def test_crawl_continues_on_error(app):
+    with app.app_context():
+        async_pixel_starships_api = AsyncPixelStarshipsApi(SimpleNamespace(), concurrency=2)
+
+        def divide(item: int) -> float:
+            return 1 / item
+
+        results = []
+        errors = []
+        async_pixel_starships_api.crawl(
+            divide,
+            [0, 1, 2],
+            lambda item, _result: results.append(item),
+            lambda item, exception: errors.append((item, type(exception))),
+        )
+
+        assert sorted(results) == [1, 2]
+        assert errors == [(0, ZeroDivisionError)]
@@ -0,0 +1,47 @@
+from app.pixelstarshipsapi_snapshot import DesignSnapshot
+
+
+def test_index_keeps_first_design():
+    designs = [
+        {"ItemDesignId": "1", "CraftDesignId": "0"},
+        {"ItemDesignId": "2", "CraftDesignId": "5"},
+        {"ItemDesignId": "3", "CraftDesignId": "0"},
+    ]
+
+    designs_by_craft_design_id = DesignSnapshot.index(designs, "CraftDesignId")
+
+    assert designs_by_craft_design_id["0"]["ItemDesignId"] == "1"
+    assert designs_by_craft_design_id["5"]["ItemDesignId"] == "2"
+
+
+class StubApi:
+    """API streaming a few item designs, counting the calls."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def iter_items(self):
+        """Stream item designs."""
+        self.calls += 1
+        yield {"ItemDesignId": "1", "CraftDesignId": "0", "ReloadModifier": "10", "ItemType": "Equipment"}
+        yield {"ItemDesignId": "2", "CraftDesignId": "5", "ReloadModifier": "20", "ItemType": "Missile"}
+        yield {"ItemDesignId": "3", "CraftDesignId": "0", "ReloadModifier": "30", "ItemType": "Missile"}
+
+
+def test_items_are_indexed_while_streamed():
+    pixel_starships_api = StubApi()
+    snapshot = DesignSnapshot(pixel_starships_api)
+
+    assert [item["ItemDesignId"] for item in snapshot.iter_items()] == ["1", "2", "3"]
+    assert snapshot.item_reload_modifiers_by_craft_design_id == {"0": "10", "5": "20"}
+    assert [item["ItemDesignId"] for item in snapshot.missile_items] == ["2", "3"]
+    assert pixel_starships_api.calls == 1
+
+
+def test_items_are_streamed_once_when_not_imported():
+    pixel_starships_api = StubApi()
+    snapshot = DesignSnapshot(pixel_starships_api)
+
+    assert len(snapshot.missile_items) == 2
+    assert snapshot.item_reload_modifiers_by_craft_design_id["5"] == "20"
+    assert pixel_starships_api.calls == 1
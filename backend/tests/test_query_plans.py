@@ -0,0 +1,169 @@
+import datetime
+import json
+import uuid
+from collections.abc import Callable, Iterator
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from app.enums import TypeEnum
+from app.ext import db
+from app.models import DailySale, Listing, Record
+from app.services.changes import ChangesService
+from app.services.daily_offer import DailyOfferService
+from app.services.market import MarketService
+
+SEEDED_ITEM_ID = 999_999_001
+SEEDED_SALE_FROM = "pixyship_plan_check"
+
+
+@pytest.fixture
+def seeded_app(app) -> Iterator:
+    """App with a few rows seeded in the listing, daily_sale and record tables, rolled back after the test."""
+    with app.app_context():
+        try:
+            db.session.execute(text("SELECT 1"))
+        except OperationalError:
+            pytest.skip("PostgreSQL database not available")
+
+        now = datetime.datetime.now(tz=datetime.UTC).replace(tzinfo=None)
+        db.session.add_all(
+            Listing(
+                id=SEEDED_ITEM_ID + index,
+                sale_at=now - datetime.timedelta(hours=index),
+                item_name="Plan Check",
+                item_id=SEEDED_ITEM_ID,
+                amount=index % 3,
+                currency="Starbux",
+                price=index * 10,
+                user_id=1,
+                user_name="buyer",
+                seller_id=2,
+                seller_name="seller",
+            )
+            for index in range(200)
+        )
+        db.session.add_all(
+            DailySale(
+                type=TypeEnum.ITEM,
+                type_id=SEEDED_ITEM_ID,
+                sale_at=now - datetime.timedelta(days=index),
+                sale_from=SEEDED_SALE_FROM,
+                currency="Starbux",
+                price=index,
+            )
+            for index in range(50)
+        )
+        db.session.add_all(
+            Record(
+                type=TypeEnum.ITEM,
+                type_id=SEEDED_ITEM_ID,
+                current=index == 4,
+                md5_hash=uuid.UUID(int=index),
+                data=f'<ItemDesign ItemDesignId="{SEEDED_ITEM_ID}" Version="{index}" />',
+                url="plan-check",
+                name="Plan Check",
+            )
+            for index in range(5)
+        )
+        db.session.flush()
+
+        # the seeded tables are small enough to be read whole, sequential scans are only planned when no index can
+        # serve the query, the tests then check which index is chosen
+        db.session.execute(text("SET LOCAL enable_seqscan = off"))
+
+        yield app
+
+        db.session.rollback()
+
+
+def capture_plans(func: Callable[[], object]) -> list[tuple[str, dict]]:
+    """Run the function and get the JSON plan of each SELECT statement it sent."""
+    statements = []
+
+    def before_cursor_execute(_conn, _cursor, statement, parameters, _context, _executemany) -> None:
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db.session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    plans = []
+    for statement, parameters in statements:
+        plan = db.session.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        plans.append((statement, plan if isinstance(plan, list) else json.loads(plan)))
+
+    return plans
+
+
+def get_sequential_scans(plan: dict) -> list[str]:
+    """Get the relations read with a sequential scan in a plan."""
+    relations = []
+    if plan.get("Node Type") == "Seq Scan":
+        relations.append(plan["Relation Name"])
+
+    for child in plan.get("Plans", []):
+        relations.extend(get_sequential_scans(child))
+
+    return relations
+
+
+def get_index_names(plan: dict) -> set[str]:
+    """Get the indexes scanned in a plan."""
+    index_names = {plan["Index Name"]} if "Index Name" in plan else set()
+
+    for child in plan.get("Plans", []):
+        index_names |= get_index_names(child)
+
+    return index_names
+
+
+def assert_uses_indexes(func: Callable[[], object], *expected_index_names: str) -> None:
+    """Check that no query run by the function reads a whole table, and that the expected indexes are scanned."""
+    plans = capture_plans(func)
+    assert plans
+
+    index_names = set()
+    for statement, plan in plans:
+        assert get_sequential_scans(plan[0]["Plan"]) == [], statement
+        index_names |= get_index_names(plan[0]["Plan"])
+
+    assert set(expected_index_names) <= index_names
+
+
+@pytest.mark.usefixtures("seeded_app")
+def test_market_queries_use_indexes():
+    assert_uses_indexes(MarketService.get_prices_from_db, "idx_listing__sale_at__sold")
+    assert_uses_indexes(lambda: MarketService.get_item_prices(SEEDED_ITEM_ID), "idx_listing__item_id_sale_at__sold")
+    assert_uses_indexes(
+        lambda: MarketService.get_item_last_players_sales_from_db(SEEDED_ITEM_ID, 100),
+        "idx_listing__item_id_sale_at__sold",
+    )
+
+
+@pytest.mark.usefixtures("seeded_app")
+def test_daily_offer_queries_use_indexes():
+    daily_offer_service = DailyOfferService()
+
+    assert_uses_indexes(
+        lambda: daily_offer_service.get_last_sales_from_db(TypeEnum.ITEM, SEEDED_ITEM_ID, 100),
+        "uq_daily_sale",
+    )
+    # unknown sale_from, the plan is the same without building the sales
+    assert_uses_indexes(
+        lambda: daily_offer_service.get_last_sales_by_sale_from_from_db("pixyship_none", 100),
+        "idx_daily_sale__sale_from_sale_at",
+    )
+
+
+@pytest.mark.usefixtures("seeded_app")
+def test_changes_queries_use_indexes(monkeypatch):
+    changes_service = ChangesService()
+    monkeypatch.setattr(changes_service, "create_change_record", lambda _record: {})
+
+    assert_uses_indexes(changes_service.get_changes_from_db, "idx_record__type_type_id_created_at__not_current")
@@ -0,0 +1,76 @@
+import pytest
+from requests import Response
+
+from app import create_app
+from app.ext import api_metrics, http_session, rate_limiter
+from app.pixelstarshipsapi import PixelStarshipsApi
+
+
+@pytest.fixture
+def app():
+    """Create an app without Redis, the rate limiter keeps its state in the process."""
+    return create_app({"TESTING": True, "CACHE_TYPE": "SimpleCache", "PSS_RATE_LIMIT_THROTTLE_PAUSE": 0})
+
+
+def make_response(status_code: int) -> Response:
+    response = Response()
+    response.status_code = status_code
+    return response
+
+
+def test_rate_limiter_backs_off_when_throttled(app):
+    with app.app_context():
+        rate_limiter.reset()
+        initial_rate = rate_limiter.stats()["rate"]
+
+        rate_limiter.feedback(make_response(429))
+        stats = rate_limiter.stats()
+
+        assert stats["rate"] == initial_rate * app.config["PSS_RATE_LIMIT_DECREASE_FACTOR"]
+        assert stats["throttles"] == 1
+        assert stats["last_throttle_at"] is not None
+
+
+def test_rate_limiter_speeds_up_when_healthy(app):
+    with app.app_context():
+        rate_limiter.reset()
+        initial_rate = rate_limiter.stats()["rate"]
+
+        for _ in range(1000):
+            rate_limiter.feedback(make_response(200))
+
+        stats = rate_limiter.stats()
+        assert initial_rate < stats["rate"] <= app.config["PSS_RATE_LIMIT_MAX_RATE"]
+        assert stats["throttles"] == 0
+
+
+def test_rate_limiter_ignores_bad_requests(app):
+    with app.app_context():
+        rate_limiter.reset()
+
+        rate_limiter.feedback(make_response(400))
+
+        assert rate_limiter.stats()["throttles"] == 0
+
+
+def test_web_requests_are_not_rate_limited(app, monkeypatch):
+    acquired = []
+    monkeypatch.setattr(rate_limiter, "acquire", lambda: acquired.append(1))
+    monkeypatch.setattr(rate_limiter, "feedback", lambda _response: acquired.append(1))
+    monkeypatch.setattr(http_session, "get", lambda *_args, **_kwargs: make_response(200))
+    monkeypatch.setattr(api_metrics, "observe_response", lambda *_args: None)
+
+    with app.test_request_context():
+        PixelStarshipsApi.get_response("https://api.example.com/UserService/SearchUsers", {})
+    assert acquired == []
+
+    with app.app_context():
+        PixelStarshipsApi.get_response("https://api.example.com/UserService/SearchUsers", {})
+    assert acquired == [1, 1]
+
+
+def test_rate_limit_command(app):
+    result = app.test_cli_runner().invoke(args=["check", "rate-limit", "--reset"])
+
+    assert result.exit_code == 0
+    assert "throttles = 0" in result.output
@@ -0,0 +1,88 @@
+import pytest
+
+from app.enums import TypeEnum
+from app.models import Record
+from app.pixelstarshipsapi import PixelStarshipsApi
+from app.services.record import RecordEntry, RecordIndex, RecordService
+from app.utils.xml_helpers import apply_data_delta, create_data_delta
+
+
+def test_get_row_attributes_without_custom_fields():
+    row = {"ItemDesignId": "1", "ItemDesignName": "Gun", "pixyship_record": ("<ItemDesign />", "<ItemDesign />")}
+
+    assert RecordService.get_row_attributes(row) == {"ItemDesignId": "1", "ItemDesignName": "Gun"}
+    assert RecordService.get_row_attributes(None) is None
+
+
+def test_get_record_attributes_from_stored_attributes():
+    record = Record(data="<ItemDesign ItemDesignId='1' />", attributes={"ItemDesignId": "2"})
+
+    assert RecordService.get_record_attributes(record, PixelStarshipsApi.parse_item_node) == {"ItemDesignId": "2"}
+
+
+def test_get_record_attributes_from_xml_data():
+    record = Record(
+        data='<RoomDesign RoomDesignId="1"><MissileDesign MissileDesignId="3" /></RoomDesign>',
+        attributes=None,
+    )
+
+    room = RecordService.get_record_attributes(record, PixelStarshipsApi.parse_room_node)
+
+    assert room["RoomDesignId"] == "1"
+    assert room["MissileDesign"] == {"MissileDesignId": "3"}
+
+
+def test_get_record_hash_with_md5(app):
+    with app.app_context():
+        assert RecordService.get_record_hash("<ItemDesign />") == "36fc0ff08fabf2303a3d1d66f45917f3"
+
+
+def test_get_record_hash_with_unknown_algorithm(app):
+    app.config["RECORD_HASH_ALGORITHM"] = "sha0"
+    with app.app_context(), pytest.raises(ValueError, match="sha0"):
+        RecordService.get_record_hash("<ItemDesign />")
+
+
+def test_record_index_reloads_type_once_for_unknown_id(app, monkeypatch):
+    queries = []
+
+    def query_entries(record_type):
+        queries.append(record_type)
+        return {1: RecordEntry(record_type, 1, "Gun", 10)}
+
+    index = RecordIndex()
+    monkeypatch.setattr(index, "query_entries", query_entries)
+
+    with app.app_context():
+        assert index.get(TypeEnum.ITEM, 1).name == "Gun"
+        assert index.get(TypeEnum.ITEM, 2) is None
+        assert index.get(TypeEnum.ITEM, 2) is None
+        assert index.get(TypeEnum.ROOM, 1).type == TypeEnum.ROOM
+
+    assert queries == [TypeEnum.ITEM, TypeEnum.ITEM, TypeEnum.ROOM]
+
+
+def test_rebase_delta_against_new_data(app):
+    app.config["RECORD_HISTORY_MODE"] = "delta"
+    previous_data = '<ItemDesign ItemDesignId="1" MarketPrice="10" Rarity="Common" />'
+    data = '<ItemDesign ItemDesignId="1" MarketPrice="20" Rarity="Common" />'
+    new_data = '<ItemDesign ItemDesignId="1" MarketPrice="20" Rarity="Elite" />'
+
+    with app.app_context():
+        delta = create_data_delta(previous_data, data)
+        rebased = RecordService.rebase_delta(delta, data, new_data)
+
+    assert rebased["data"] is None
+    assert apply_data_delta(new_data, rebased["delta"]) == previous_data
+
+
+def test_rebase_delta_keeps_full_data_without_delta_mode(app):
+    app.config["RECORD_HISTORY_MODE"] = "full"
+    previous_data = '<ItemDesign ItemDesignId="1" MarketPrice="10" />'
+    data = '<ItemDesign ItemDesignId="1" MarketPrice="20" />'
+
+    with app.app_context():
+        delta = create_data_delta(previous_data, data)
+        rebased = RecordService.rebase_delta(delta, data, '<ItemDesign ItemDesignId="1" MarketPrice="30" />')
+
+    assert rebased == {"data": previous_data, "delta": None}
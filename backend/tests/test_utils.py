@@ -1,10 +1,21 @@
 import datetime
+import io
+from xml.etree import ElementTree as ET
 from xml.etree.ElementTree import Element
 
+import pytest
+
 from app.enums import TypeEnum
 from app.utils.calculation import float_range, format_delta_time, int_range
 from app.utils.pss import compute_pvp_ratio, get_type_enum_from_string, has_offstat, parse_assets_string
-from app.utils.xml_helpers import sort_attributes
+from app.utils.xml_helpers import (
+    apply_data_delta,
+    copy_element,
+    create_data_delta,
+    create_lean_record,
+    iter_children,
+    sort_attributes,
+)
 
 
 def test_get_type_enum_from_string_with_known_type(app):
@@ -86,6 +97,33 @@ def sort_attributes_handles_empty_attributes(app):
         assert root.attrib == {}
 
 
+def test_iter_children_yields_container_children():
+    source = io.BytesIO(
+        b'<ListItemDesigns><ItemDesigns><ItemDesign ItemDesignId="1"><Parts><Part Id="2" /></Parts></ItemDesign>'
+        b'<ItemDesign ItemDesignId="3" /></ItemDesigns></ListItemDesigns>',
+    )
+
+    children = list(iter_children(source, "ItemDesigns", release=False))
+
+    assert [child.attrib for child in children] == [{"ItemDesignId": "1"}, {"ItemDesignId": "3"}]
+    assert children[0].find(".//Part").attrib == {"Id": "2"}
+
+
+def test_iter_children_releases_children():
+    source = io.BytesIO(b'<List><Items><Item Id="1" /><Item Id="2" /></Items></List>')
+
+    ids = [child.attrib["Id"] for child in iter_children(source, "Items")]
+
+    assert ids == ["1", "2"]
+
+
+def test_iter_children_with_missing_container():
+    source = io.BytesIO(b'<List errorMessage="Failed" />')
+
+    with pytest.raises(ET.ParseError):
+        list(iter_children(source, "Items"))
+
+
 def test_parse_assets_string():
     """Test parse_assets_string function."""
     test_cases = [
@@ -294,3 +332,70 @@ def offstat_returns_true_for_valid_input(app):
     with app.app_context():
         result = has_offstat("Equipment", "Head", 5, 1.0, "Enhancement")
         assert result is True
+
+
+def test_copy_element_keeps_original_attributes():
+    element = Element("ItemDesign", {"ItemDesignId": "1", "FairPrice": "10"})
+    element.append(Element("MissileDesign"))
+
+    copied = copy_element(element)
+    copied.attrib.pop("FairPrice")
+    copied.append(Element("Other"))
+
+    assert element.attrib == {"ItemDesignId": "1", "FairPrice": "10"}
+    assert len(element) == 1
+    assert copied.attrib == {"ItemDesignId": "1"}
+    assert copied[0] is element[0]
+
+
+def test_create_lean_record_sorts_attributes():
+    element = ET.fromstring('<ItemDesign Name="Gun" Id="1" />')
+
+    lean_record = create_lean_record(element)
+
+    assert lean_record.data == '<ItemDesign Id="1" Name="Gun" />'
+    assert lean_record.hash_input == lean_record.data
+
+
+def test_create_lean_record_ignores_attributes_for_hash():
+    element = ET.fromstring('<ItemDesign Id="1" MarketPrice="10"><Part Id="2" /></ItemDesign>')
+
+    lean_record = create_lean_record(element, ["MarketPrice", "FairPrice"])
+
+    assert lean_record.data == '<ItemDesign Id="1" MarketPrice="10"><Part Id="2" /></ItemDesign>'
+    assert lean_record.hash_input == '<ItemDesign Id="1"><Part Id="2" /></ItemDesign>'
+    assert element.get("MarketPrice") == "10"
+
+
+def test_create_lean_record_matches_element_tree_serialization():
+    element = Element("ItemDesign", {"Name": 'Gun "A" & <B>', "Id": "1", "Description": "line\nnext\ttab\r"})
+    child = Element("Part", {"Name": "Épée"})
+    child.text = "text & <more>"
+    child.tail = "tail"
+    element.append(child)
+    element.text = "é"
+
+    lean_record = create_lean_record(element)
+
+    expected_element = copy_element(element)
+    sort_attributes(expected_element)
+    assert lean_record.data == ET.tostring(expected_element).decode()
+    assert list(element.attrib) == ["Name", "Id", "Description"]
+
+
+def test_create_data_delta_rebuilds_previous_version():
+    data = '<ItemDesign FairPrice="10" Id="1" Name="Gun &amp; &#233;"><Part Id="2" /></ItemDesign>'
+    next_data = '<ItemDesign FairPrice="12" Id="1" MarketPrice="5"><Part Id="2" /></ItemDesign>'
+
+    delta = create_data_delta(data, next_data)
+
+    assert delta == {"set": {"FairPrice": "10", "Name": "Gun & \u00e9"}, "unset": ["MarketPrice"]}
+    assert apply_data_delta(next_data, delta) == data
+
+
+def test_create_data_delta_keeps_data_when_children_changed():
+    data = '<RoomDesign Id="1"><MissileDesign Id="2" /></RoomDesign>'
+    next_data = '<RoomDesign Id="1"><MissileDesign Id="3" /></RoomDesign>'
+
+    assert create_data_delta(data, next_data) is None
+    assert create_data_delta('{"id": 1}', '{"id": 2}') is None